@@ -1,12 +1,16 @@
 from flask import Flask
 from flask_mail import Mail
 from .config import Config
+from . import database
+from .services import passwords
+from .services.uploads import StreamingRequest
 from .routes.main_routes import main_routes
 from .routes.auth_routes import auth_routes
 from .routes.student_routes import student_routes
 from .routes.teacher_routes import teacher_routes
 from .routes.parent_routes import parent_routes
 from .routes.admin_routes import admin_routes
+from .routes.job_routes import job_routes
 
 # Create Flask-Mail instance
 mail = Mail()
@@ -18,9 +22,17 @@ def create_app():
     # Load configuration
     app.config.from_object(Config)
 
+    # File uploads stream to disk as they arrive (app.services.uploads)
+    app.request_class = StreamingRequest
+
     # Initialize Flask-Mail with the app
     mail.init_app(app)
-    
+
+    # One pooled connection / transaction per request (app.database.get_db)
+    database.init_app(app)
+
+    # Password hashing runs in a process pool; a full queue answers 503
+    passwords.init_app(app)
 
     # Register Blueprints
     app.register_blueprint(main_routes)
@@ -29,5 +41,6 @@ def create_app():
     app.register_blueprint(teacher_routes, url_prefix='/teacher')
     app.register_blueprint(parent_routes, url_prefix='/parent')
     app.register_blueprint(admin_routes, url_prefix='/admin')
+    app.register_blueprint(job_routes, url_prefix='/jobs')
 
     return app
\ No newline at end of file
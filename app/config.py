@@ -24,6 +24,57 @@ class Config:
     DB_PASSWORD = os.getenv('DB_PASSWORD')
     DB_PORT = os.getenv('DB_PORT')
 
+    # Connection pool (per worker process)
+    DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))
+    DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))            # seconds to wait for a free connection
+    DB_POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', 3600))  # recycle connections older than this
+    DB_POOL_MAX_IDLE = float(os.getenv('DB_POOL_MAX_IDLE', 600))         # close connections idle longer than this
+    DB_POOL_PING_AFTER = float(os.getenv('DB_POOL_PING_AFTER', 30))      # ping idle connections before reuse
+
+    # SQL instrumentation
+    SQL_SLOW_QUERY_MS = float(os.getenv('SQL_SLOW_QUERY_MS', 200))  # log statements slower than this
+    SQL_TOP_N = int(os.getenv('SQL_TOP_N', 5))                       # slowest statements kept per request
+    SQL_SERVER_TIMING = os.getenv('SQL_SERVER_TIMING', 'True') == 'True'
+
+    # Admin dashboard counters
+    DASHBOARD_STATS_TTL = float(os.getenv('DASHBOARD_STATS_TTL', 30))        # seconds the counts are cached per process
+    DASHBOARD_COUNTERS = os.getenv('DASHBOARD_COUNTERS', 'False') == 'True'  # read entity_counters (migration 004)
+
+    # Password hashing (app/services/passwords.py)
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD') or None                 # None = werkzeug's default
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))  # 0 = hash in the request thread
+    PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', 64))                  # pending hash jobs per web worker
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', 5))  # wait for a slot, then 503
+
+    # Bulk user import
+    IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', 500))                     # rows per lookup / INSERT batch
+
+    # Student dashboard cache (app/services/student_dashboard.py)
+    STUDENT_DASHBOARD_TTL = float(os.getenv('STUDENT_DASHBOARD_TTL', 60))                 # seconds per student; own uploads refresh at once
+    STUDENT_DASHBOARD_CACHE_SIZE = int(os.getenv('STUDENT_DASHBOARD_CACHE_SIZE', 5000))   # students kept per process
+
+    # Teacher gradebook cache (app/services/gradebook.py)
+    GRADEBOOK_CACHE_TTL = float(os.getenv('GRADEBOOK_CACHE_TTL', 300))      # seconds per class; assessments refresh at once
+    GRADEBOOK_CACHE_SIZE = int(os.getenv('GRADEBOOK_CACHE_SIZE', 200))      # classes kept per process
+
+    # Report cards (app/services/report_cards.py)
+    REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', os.cpu_count() or 1))  # render processes per batch; 0 = render in the batch thread
+    REPORT_CHUNK_SIZE = int(os.getenv('REPORT_CHUNK_SIZE', 50))             # students per aggregation query / render job
+
+    # Competency progress charts (app/services/competency_analytics.py)
+    COMPETENCY_PROGRESS_MONTHS = int(os.getenv('COMPETENCY_PROGRESS_MONTHS', 12))            # default chart window
+    COMPETENCY_PROGRESS_TTL = float(os.getenv('COMPETENCY_PROGRESS_TTL', 120))               # seconds per student; assessments refresh at once
+    COMPETENCY_PROGRESS_CACHE_SIZE = int(os.getenv('COMPETENCY_PROGRESS_CACHE_SIZE', 5000))  # series kept per process
+
+    # Reference data cache (app/services/reference_cache.py)
+    REFERENCE_CACHE_TTL = float(os.getenv('REFERENCE_CACHE_TTL', 300))                 # seconds; NOTIFY invalidates sooner
+    REFERENCE_CACHE_LISTEN = os.getenv('REFERENCE_CACHE_LISTEN', 'True') == 'True'     # LISTEN for changes from other workers
+
+    # Admin search
+    SEARCH_MIN_LENGTH = int(os.getenv('SEARCH_MIN_LENGTH', 2))            # shorter typeahead input returns nothing
+    SEARCH_TYPEAHEAD_LIMIT = int(os.getenv('SEARCH_TYPEAHEAD_LIMIT', 10))  # max suggestions per request
+
     # SQLAlchemy configuration
     SQLALCHEMY_DATABASE_URI = f'postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -37,6 +88,33 @@ class Config:
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER')
 
+    # Project uploads (app/services/uploads.py)
+    UPLOAD_ROOT = os.getenv('UPLOAD_ROOT', 'projects')                                # blobs/ (content-addressed store) lives here
+    UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', 200 * 1024 * 1024))          # per file, enforced while streaming
+    UPLOAD_CHUNK_BYTES = int(os.getenv('UPLOAD_CHUNK_BYTES', 1024 * 1024))            # read size for raw-body uploads
+    RESUMABLE_CHUNK_BYTES = int(os.getenv('RESUMABLE_CHUNK_BYTES', 8 * 1024 * 1024))  # suggested PUT size for resumable uploads
+    RESUMABLE_UPLOAD_TTL_HOURS = float(os.getenv('RESUMABLE_UPLOAD_TTL_HOURS', 24))   # unfinished uploads idle this long are swept
+    BLOB_GC_GRACE_HOURS = float(os.getenv('BLOB_GC_GRACE_HOURS', 24))                 # unreferenced blobs kept this long before gc
+
+    # Submission downloads (app/services/downloads.py)
+    DOWNLOAD_OFFLOAD = os.getenv('DOWNLOAD_OFFLOAD', '')                               # '', 'x-sendfile' or 'x-accel'
+    DOWNLOAD_ACCEL_PREFIX = os.getenv('DOWNLOAD_ACCEL_PREFIX', '/protected-projects/')  # nginx internal location for UPLOAD_ROOT
+    DOWNLOAD_OFFLOAD_MIN_BYTES = int(os.getenv('DOWNLOAD_OFFLOAD_MIN_BYTES', 256 * 1024))  # smaller files are sent directly
+
+    # Email outbox worker (python -m app.services.outbox)
+    OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 50))                  # messages per SMTP connection
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 6))               # then the message is marked failed
+    OUTBOX_RETRY_BASE_SECONDS = float(os.getenv('OUTBOX_RETRY_BASE_SECONDS', 30))  # backoff: base * 2^attempts
+    OUTBOX_POLL_SECONDS = float(os.getenv('OUTBOX_POLL_SECONDS', 10))            # wake-up interval without NOTIFY
+    OUTBOX_CLAIM_TIMEOUT = float(os.getenv('OUTBOX_CLAIM_TIMEOUT', 300))         # re-send rows a dead worker claimed
+
+    # Background jobs (python -m app.services.jobs)
+    JOB_CONCURRENCY = int(os.getenv('JOB_CONCURRENCY', 2))                     # jobs run at once per worker process
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))                   # then the job is marked failed
+    JOB_RETRY_BASE_SECONDS = float(os.getenv('JOB_RETRY_BASE_SECONDS', 30))    # backoff: base * 2^(attempts - 1)
+    JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', 10))                # wake-up / heartbeat interval without NOTIFY
+    JOB_STALE_SECONDS = float(os.getenv('JOB_STALE_SECONDS', 120))             # re-run jobs whose worker stopped heartbeating
+
     # Flask environment
     FLASK_ENV = os.getenv('FLASK_ENV', 'development')
     DEBUG = os.getenv('DEBUG', 'True') == 'True'
\ No newline at end of file
@@ -1,13 +1,553 @@
 # app/database.py
+import heapq
+import importlib
+import json
+import logging
+import os
+import pkgutil
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
 import psycopg2   #type:ignore
+from flask import g, has_request_context, request
+from flask import before_render_template, template_rendered
+from psycopg2 import extensions   #type:ignore
 from app.config import Config
 
+sql_logger = logging.getLogger('app.sql')
+
+
+class PoolTimeoutError(psycopg2.OperationalError):
+    """Raised when no pooled connection became free within DB_POOL_TIMEOUT."""
+
+
+class PooledConnection:
+    """Thin proxy around a psycopg2 connection.
+
+    Behaves like the raw connection for everything the routes use (cursor,
+    commit, rollback, autocommit ...), except that close() hands the
+    connection back to the pool instead of tearing down the socket.
+    ``with conn:`` is psycopg2's transaction block: it commits, or rolls back
+    on an exception, and leaves the connection checked out.
+    """
+
+    def __init__(self, pool, raw, created_at):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_raw', raw)
+        object.__setattr__(self, '_created_at', created_at)
+        object.__setattr__(self, '_returned', False)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._raw, name, value)
+
+    def __enter__(self):
+        self._raw.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._raw.__exit__(exc_type, exc, tb)
+
+    @property
+    def closed(self):
+        return self._returned or self._raw.closed
+
+    def close(self):
+        if self._returned:
+            return
+        object.__setattr__(self, '_returned', True)
+        self._pool.release(self._raw, self._created_at)
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of psycopg2 connections.
+
+    - at most ``max_size`` connections are open at any time
+    - checkout blocks up to ``timeout`` seconds, then raises PoolTimeoutError
+    - idle connections are pinged before reuse once they have been idle for
+      ``ping_after`` seconds
+    - connections older than ``max_lifetime`` or idle longer than ``max_idle``
+      are closed instead of being reused
+    """
+
+    def __init__(self, connect_kwargs, min_size=1, max_size=10, timeout=30,
+                 max_lifetime=3600, max_idle=600, ping_after=30):
+        self.connect_kwargs = connect_kwargs
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.ping_after = ping_after
+
+        self._lock = threading.Condition()
+        self._idle = deque()    # (raw_conn, created_at, last_used)
+        self._size = 0          # open connections, idle + checked out
+        self._waiting = 0
+        self._stats = {
+            'checkouts': 0,
+            'connects': 0,
+            'timeouts': 0,
+            'recycled': 0,
+            'failed_health_checks': 0,
+            'peak_in_use': 0,
+            'total_wait_ms': 0.0,
+        }
+
+    # ----------------------------------------------------------------
+    # internals
+    # ----------------------------------------------------------------
+    def _connect(self):
+        raw = psycopg2.connect(**self.connect_kwargs)
+        with self._lock:
+            self._stats['connects'] += 1
+        return raw
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _is_expired(self, created_at, last_used, now):
+        if self.max_lifetime and now - created_at > self.max_lifetime:
+            return True
+        if self.max_idle and now - last_used > self.max_idle:
+            return True
+        return False
+
+    def _is_healthy(self, raw, last_used, now):
+        if raw.closed:
+            return False
+        if now - last_used < self.ping_after:
+            return True
+        try:
+            with raw.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            raw.rollback()
+            return True
+        except Exception:
+            return False
+
+    # ----------------------------------------------------------------
+    # public API
+    # ----------------------------------------------------------------
+    def fill(self):
+        """Open connections up to ``min_size`` (best effort)."""
+        while True:
+            with self._lock:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                raw = self._connect()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                    self._lock.notify()
+                return
+            now = time.monotonic()
+            with self._lock:
+                self._idle.append((raw, now, now))
+                self._lock.notify()
+
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            candidate = None
+            with self._lock:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {self.timeout}s waiting for a database "
+                            f"connection (pool max_size={self.max_size})"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._lock.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+                if self._idle:
+                    # LIFO keeps the hot connections hot and lets the rest age out
+                    candidate = self._idle.pop()
+                else:
+                    self._size += 1
+
+            if candidate is None:
+                try:
+                    raw = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+                created_at = time.monotonic()
+                break
+
+            raw, created_at, last_used = candidate
+            now = time.monotonic()
+            if self._is_expired(created_at, last_used, now):
+                reason = 'recycled'
+            elif self._is_healthy(raw, last_used, now):
+                break
+            else:
+                reason = 'failed_health_checks'
+            self._discard(raw)
+            with self._lock:
+                self._stats[reason] += 1
+                self._size -= 1
+                self._lock.notify()
+
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['total_wait_ms'] += (time.monotonic() - started) * 1000
+            in_use = self._size - len(self._idle)
+            if in_use > self._stats['peak_in_use']:
+                self._stats['peak_in_use'] = in_use
+        return PooledConnection(self, raw, created_at)
+
+    def release(self, raw, created_at):
+        """Return a connection to the pool, resetting any open transaction."""
+        keep = not raw.closed
+        if keep:
+            try:
+                if raw.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    raw.rollback()
+                if raw.autocommit:
+                    raw.autocommit = False
+            except Exception:
+                keep = False
+
+        now = time.monotonic()
+        expired = keep and self.max_lifetime and now - created_at > self.max_lifetime
+
+        with self._lock:
+            if expired:
+                self._stats['recycled'] += 1
+                keep = False
+            if keep:
+                self._idle.append((raw, created_at, now))
+            else:
+                self._size -= 1
+            self._lock.notify()
+        if not keep:
+            self._discard(raw)
+
+    def closeall(self):
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._lock.notify_all()
+        for raw, _created_at, _last_used in idle:
+            self._discard(raw)
+
+    def stats(self):
+        with self._lock:
+            idle = len(self._idle)
+            stats = dict(self._stats)
+            stats.update({
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': idle,
+                'in_use': self._size - idle,
+                'waiting': self._waiting,
+                'saturation': round((self._size - idle) / self.max_size, 3),
+            })
+        stats['total_wait_ms'] = round(stats['total_wait_ms'], 2)
+        return stats
+
+
+# ======================
+# SQL INSTRUMENTATION
+# ======================
+# Every pooled connection uses InstrumentedCursor, which times each statement
+# and adds it to the current request's g.sql_stats. Statements slower than
+# SQL_SLOW_QUERY_MS are logged as one JSON line on the "app.sql" logger.
+
+_query_names = None
+
+
+def _normalize_sql(sql):
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    elif not isinstance(sql, str):
+        sql = str(sql)    # psycopg2.sql.Composed etc.
+    return ' '.join(sql.split())
+
+
+def _load_query_names():
+    """Map normalized SQL text -> 'module.CONSTANT' for app/queries/*."""
+    names = {}
+    from app import queries
+    for module_info in pkgutil.iter_modules(queries.__path__):
+        module = importlib.import_module(f'app.queries.{module_info.name}')
+        for attr, value in vars(module).items():
+            if attr.isupper() and isinstance(value, str):
+                names.setdefault(_normalize_sql(value), f'{module_info.name}.{attr}')
+    return names
+
+
+def describe_sql(sql):
+    """Short, stable label for a statement: the query constant name if the
+    text comes from app/queries, otherwise the first 200 chars of the SQL."""
+    global _query_names
+    if _query_names is None:
+        _query_names = _load_query_names()
+    text = _normalize_sql(sql)
+    return _query_names.get(text) or text[:200]
+
+
+def _new_sql_stats():
+    return {'count': 0, 'total_ms': 0.0, 'rows': 0, 'slowest': []}
+
+
+def _record_statement(sql, duration_ms, rows):
+    slow = duration_ms >= Config.SQL_SLOW_QUERY_MS
+    if not slow and not has_request_context():
+        return
+
+    label = describe_sql(sql)
+    if has_request_context():
+        stats = g.get('sql_stats')
+        if stats is None:
+            stats = g.sql_stats = _new_sql_stats()
+        stats['count'] += 1
+        stats['total_ms'] += duration_ms
+        stats['rows'] += rows
+        # min-heap of the N slowest statements seen so far
+        entry = (duration_ms, stats['count'], label)
+        if len(stats['slowest']) < Config.SQL_TOP_N:
+            heapq.heappush(stats['slowest'], entry)
+        elif duration_ms > stats['slowest'][0][0]:
+            heapq.heapreplace(stats['slowest'], entry)
+
+    if slow:
+        sql_logger.warning(json.dumps({
+            'event': 'slow_query',
+            'duration_ms': round(duration_ms, 2),
+            'rows': rows,
+            'query': label,
+            'endpoint': request.endpoint if has_request_context() else None,
+        }))
+
+
+class InstrumentedCursor(extensions.cursor):
+    """psycopg2 cursor that reports statement timings (see _record_statement)."""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            rows = self.rowcount if self.description is not None and self.rowcount > 0 else 0
+            _record_statement(query, (time.perf_counter() - started) * 1000, rows)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _record_statement(query, (time.perf_counter() - started) * 1000, 0)
+
+
+def get_sql_stats():
+    """Statement count, DB time, rows and the slowest statements so far in
+    this request (slowest first)."""
+    stats = g.get('sql_stats') or _new_sql_stats()
+    return {
+        'count': stats['count'],
+        'total_ms': round(stats['total_ms'], 2),
+        'rows': stats['rows'],
+        'slowest': [
+            {'duration_ms': round(ms, 2), 'query': label}
+            for ms, _seq, label in sorted(stats['slowest'], reverse=True)
+        ],
+    }
+
+
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+def _on_before_render(sender, template, context, **extra):
+    if has_request_context():
+        g.render_started = time.perf_counter()
+
+
+def _on_rendered(sender, template, context, **extra):
+    if has_request_context() and 'render_started' in g:
+        g.render_ms = g.get('render_ms', 0.0) + (time.perf_counter() - g.pop('render_started')) * 1000
+
+
+def _add_server_timing(response):
+    started = g.get('request_started')
+    if started is None:
+        return response
+    total_ms = (time.perf_counter() - started) * 1000
+    stats = get_sql_stats()
+    render_ms = g.get('render_ms', 0.0)
+
+    if Config.SQL_SERVER_TIMING:
+        response.headers.add('Server-Timing', ', '.join([
+            f'db;dur={stats["total_ms"]:.2f};desc="{stats["count"]} queries"',
+            f'render;dur={render_ms:.2f}',
+            f'app;dur={max(total_ms - stats["total_ms"] - render_ms, 0):.2f}',
+            f'total;dur={total_ms:.2f}',
+        ]))
+
+    if stats['count'] and sql_logger.isEnabledFor(logging.DEBUG):
+        sql_logger.debug(json.dumps({
+            'event': 'request_sql',
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 2),
+            'render_ms': round(render_ms, 2),
+            'db': stats,
+        }))
+    return response
+
+
+# One pool per process; re-created after fork so workers never share sockets.
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = ConnectionPool(
+                    connect_kwargs=dict(
+                        host=Config.DB_HOST,
+                        database=Config.DB_NAME,
+                        user=Config.DB_USER,
+                        password=Config.DB_PASSWORD,
+                        port=Config.DB_PORT,
+                        cursor_factory=InstrumentedCursor
+                    ),
+                    min_size=Config.DB_POOL_MIN_SIZE,
+                    max_size=Config.DB_POOL_MAX_SIZE,
+                    timeout=Config.DB_POOL_TIMEOUT,
+                    max_lifetime=Config.DB_POOL_MAX_LIFETIME,
+                    max_idle=Config.DB_POOL_MAX_IDLE,
+                    ping_after=Config.DB_POOL_PING_AFTER,
+                )
+                _pool_pid = pid
+                _pool.fill()
+    return _pool
+
+
+def get_pool_stats():
+    """Saturation counters for the current process' pool."""
+    return get_pool().stats()
+
+
 def get_db_connection():
-    conn = psycopg2.connect(
-        host=Config.DB_HOST,
-        database=Config.DB_NAME,
-        user=Config.DB_USER,
-        password=Config.DB_PASSWORD,
-        port=Config.DB_PORT
-    )
-    return conn
\ No newline at end of file
+    # Draws from the pool; conn.close() hands the connection back.
+    return get_pool().getconn()
+
+
+# ======================
+# REQUEST-SCOPED UNIT OF WORK
+# ======================
+# Routes that use get_db()/db_cursor() share one pooled connection and one
+# transaction per request: it is checked out lazily on first use, committed
+# once in after_request and rolled back if the view raised (unhandled errors
+# still pass through after_request as a 500, so those are rolled back too).
+# Work that must only happen once the writes are visible to other requests
+# (dropping cached reads) is registered with after_commit().
+
+def get_db():
+    """The current request's connection, checked out on first use."""
+    if 'db_conn' not in g:
+        g.db_conn = get_db_connection()
+    return g.db_conn
+
+
+@contextmanager
+def db_cursor():
+    """Cursor on the request connection; closed on exit, never committed here."""
+    cursor = get_db().cursor()
+    try:
+        yield cursor
+    finally:
+        cursor.close()
+
+
+def after_commit(callback, *args):
+    """Call ``callback(*args)`` once the request's transaction has committed.
+
+    Clearing a cache before the commit lets a read in between put the old
+    rows back for the whole TTL. The callbacks are dropped when the request
+    rolls back; without a request transaction the callback runs at once.
+    """
+    if has_request_context() and 'db_conn' in g:
+        g.setdefault('db_after_commit', []).append((callback, args))
+    else:
+        callback(*args)
+
+
+def rollback_db():
+    """Discard the request's pending writes (e.g. after a handled error)."""
+    conn = g.get('db_conn')
+    if conn is not None:
+        conn.rollback()
+    g.pop('db_after_commit', None)
+
+
+def _commit_db(response):
+    conn = g.pop('db_conn', None)
+    callbacks = g.pop('db_after_commit', ())
+    if conn is None:
+        return response
+    try:
+        if response.status_code >= 500:
+            conn.rollback()
+            callbacks = ()
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    for callback, args in callbacks:
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"After-commit callback {callback.__qualname__} failed: {e}")
+    return response
+
+
+def _release_db(exc=None):
+    # Only reached with a connection still in g when the view raised.
+    g.pop('db_after_commit', None)
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        try:
+            conn.rollback()
+        finally:
+            conn.close()
+
+
+def init_app(app):
+    app.before_request(_start_request_timer)
+    # after_request hooks run in reverse order: commit first, then timing
+    app.after_request(_add_server_timing)
+    app.after_request(_commit_db)
+    app.teardown_request(_release_db)
+    before_render_template.connect(_on_before_render, app)
+    template_rendered.connect(_on_rendered, app)
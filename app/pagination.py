@@ -0,0 +1,159 @@
+# app/pagination.py
+"""Keyset pagination and server-side sorting for list pages.
+
+Instead of OFFSET (which re-reads every skipped row) each page continues from
+the sort key of the last row shown: ``WHERE (sort cols) > (last values)``.
+The key is handed to the browser as an opaque ``after`` / ``before`` token.
+
+Usage in a route::
+
+    page = paginate(cursor, GET_ALL_STUDENTS_QUERY, (),
+                    sort_options=STUDENT_SORTS, default_sort='id',
+                    estimate_table='students')
+    return render_template(..., students=page.items, page=page)
+
+``sort_options`` maps a sort name to the output column names of the query,
+the last one being unique (usually the primary key) so the order is total.
+"""
+import base64
+import json
+
+from flask import request, url_for
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), default=lambda v: v.isoformat() if hasattr(v, 'isoformat') else str(v))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, size):
+    """Key values from a token, or None if it is missing / malformed."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+class Page:
+    """One page of rows plus what the template needs to link around it."""
+
+    def __init__(self, items, per_page, sort, direction, next_cursor, prev_cursor, estimated_total):
+        self.items = items
+        self.per_page = per_page
+        self.sort = sort
+        self.direction = direction
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.estimated_total = estimated_total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def _url(self, **overrides):
+        args = request.args.to_dict()
+        args.pop('after', None)
+        args.pop('before', None)
+        args.update({key: value for key, value in overrides.items() if value is not None})
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+    def next_url(self):
+        return self._url(after=self.next_cursor)
+
+    def prev_url(self):
+        return self._url(before=self.prev_cursor)
+
+    def first_url(self):
+        return self._url()
+
+    def sort_url(self, sort):
+        """Link for a column header: toggles the direction on the active column."""
+        direction = 'desc' if sort == self.sort and self.direction == 'asc' else 'asc'
+        return self._url(sort=sort, dir=direction)
+
+
+def estimate_count(cursor, query=None, params=(), table=None):
+    """Cheap row count: pg_class.reltuples for a whole table, otherwise the
+    planner's row estimate for ``query``. Never runs COUNT(*)."""
+    if table:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+        row = cursor.fetchone()
+        # -1 means "never analyzed": fall through to the planner estimate
+        if row and row[0] is not None and row[0] >= 0:
+            return row[0]
+        if query is None:
+            query = f"SELECT 1 FROM {table}"
+    if query is None:
+        return None
+    cursor.execute("EXPLAIN (FORMAT JSON) " + query.strip().rstrip(';'), params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Plan Rows']
+
+
+def paginate(cursor, query, params, sort_options, default_sort, estimate_table=None):
+    """Run one keyset page of ``query`` based on request.args
+    (sort, dir, after, before, per_page)."""
+    args = request.args
+    sort = args.get('sort') if args.get('sort') in sort_options else default_sort
+    direction = 'desc' if args.get('dir') == 'desc' else 'asc'
+    per_page = args.get('per_page', DEFAULT_PER_PAGE, type=int) or DEFAULT_PER_PAGE
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    columns = sort_options[sort]
+
+    after = decode_cursor(args.get('after'), len(columns))
+    before = None if after else decode_cursor(args.get('before'), len(columns))
+
+    # Paging backwards walks the reversed order and flips the rows afterwards
+    ascending = (direction == 'asc') != (before is not None)
+    key = ', '.join(columns)
+    sql = f"SELECT * FROM ({query.strip().rstrip(';')}) AS page_src"
+    page_params = list(params)
+    boundary = after or before
+    if boundary:
+        placeholders = ', '.join(['%s'] * len(columns))
+        sql += f" WHERE ({key}) {'>' if ascending else '<'} ({placeholders})"
+        page_params.extend(boundary)
+    order = 'ASC' if ascending else 'DESC'
+    sql += " ORDER BY " + ', '.join(f"{column} {order}" for column in columns) + " LIMIT %s"
+    page_params.append(per_page + 1)
+
+    cursor.execute(sql, page_params)
+    rows = cursor.fetchall()
+    names = [col.name for col in cursor.description]
+    key_index = [names.index(column) for column in columns]
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if before:
+        rows.reverse()
+        has_prev, has_next = more, True
+    else:
+        has_prev, has_next = boundary is not None, more
+
+    def row_key(row):
+        return encode_cursor(row[i] for i in key_index)
+
+    next_cursor = row_key(rows[-1]) if rows and has_next else None
+    prev_cursor = row_key(rows[0]) if rows and has_prev else None
+
+    if estimate_table:
+        estimated_total = estimate_count(cursor, table=estimate_table)
+    else:
+        estimated_total = estimate_count(cursor, query, params)
+
+    return Page(rows, per_page, sort, direction, next_cursor, prev_cursor, estimated_total)
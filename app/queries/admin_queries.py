@@ -1,8 +1,14 @@
 # Queries for Admin Dashboard
-COUNT_TEACHERS_QUERY = "SELECT COUNT(*) FROM Teachers;"
-COUNT_PARENTS_QUERY = "SELECT COUNT(*) FROM Parents;"
-COUNT_STUDENTS_QUERY = "SELECT COUNT(*) FROM Students;"
-COUNT_COMPETENCIES_QUERY = "SELECT COUNT(*) FROM competencies;"
+# Dashboard counters in one round trip (teachers, parents, students, competencies)
+DASHBOARD_COUNTS_QUERY = """
+    SELECT (SELECT COUNT(*) FROM Teachers),
+           (SELECT COUNT(*) FROM Parents),
+           (SELECT COUNT(*) FROM Students),
+           (SELECT COUNT(*) FROM competencies)
+"""
+
+# Same counters from the trigger-maintained table (migrations/004_entity_counters.sql)
+DASHBOARD_COUNTERS_QUERY = "SELECT name, value FROM entity_counters WHERE name = ANY(%s)"
 
 
 # Queries for Managing Students
@@ -12,11 +18,11 @@ INSERT_NEW_STUDENT_QUERY = """
 """
 
 # Query to fetch all students
+# No ORDER BY: the list is paged and sorted by app.pagination.paginate
 GET_ALL_STUDENTS_QUERY = """
     SELECT u.UserID, u.FirstName, u.LastName, u.Email, s.StudentNumber, s.RegistrationDate
     FROM Users u
     JOIN Students s ON u.UserID = s.UserID
-    ORDER BY u.UserID ASC;
 """
 
 GET_PARENT_BY_EMAIL_QUERY = """
@@ -26,38 +32,118 @@ GET_PARENT_BY_EMAIL_QUERY = """
     WHERE u.Email = %s;
 """
 
-# Query to fetch all parents
-# Updated Query to fetch all parents
+# Query to fetch all parents (paged by app.pagination.paginate)
 GET_ALL_PARENTS_QUERY = """
     SELECT u.UserID, u.FirstName, u.LastName, u.Email, u.Phone, u.created_at
     FROM Parents p
     JOIN Users u ON p.UserID = u.UserID
-    ORDER BY u.UserID ASC;
 """
 
+# Query to fetch all teachers (paged by app.pagination.paginate)
+GET_ALL_TEACHERS_QUERY = """
+    SELECT u.UserID, u.FirstName, u.LastName, u.Email, t.HireDate
+    FROM Users u
+    JOIN Teachers t ON u.UserID = t.UserID
+    WHERE u.RoleID = 2
+"""
+
+# Query to fetch all classes with their teacher (paged by app.pagination.paginate)
+GET_ALL_CLASSES_QUERY = """
+    SELECT c.classid, c.classname, c.academicyear, c.createdat,
+           t.teacherid, u.firstname, u.lastname
+    FROM classes c
+    JOIN teachers t ON c.teacherid = t.teacherid
+    JOIN users u ON t.userid = u.userid
+"""
+
+# Admin search (needs migrations/003_user_search_trgm.sql)
+# Matching runs on user_search_text(...), the same expression as the trigram
+# index: a substring match (LIKE) or a fuzzy word match (<%), ranked by trigram
+# word distance (0 = exact). Placeholders take the values named in the matching
+# *_PARAMS tuple, see app.search.search_params.
+
 # Query to search teachers by name or email
+# Returns UserID first, like GET_ALL_TEACHERS_QUERY (the edit/delete modals key on it)
 SEARCH_TEACHERS_QUERY = """
-    SELECT t.TeacherID, u.FirstName, u.LastName, u.Email, t.HireDate
+    SELECT u.UserID, u.FirstName, u.LastName, u.Email, t.HireDate,
+           (search_normalize(%s) <<-> user_search_text(u.FirstName, u.LastName, u.Email))::float8 AS distance
     FROM Teachers t
     JOIN Users u ON t.UserID = u.UserID
-    WHERE u.FirstName LIKE %s OR u.LastName LIKE %s OR u.Email LIKE %s;
+    WHERE user_search_text(u.FirstName, u.LastName, u.Email) LIKE search_normalize(%s)
+       OR search_normalize(%s) <%% user_search_text(u.FirstName, u.LastName, u.Email)
 """
+SEARCH_TEACHERS_PARAMS = ('term', 'pattern', 'term')
 
 # Query to search students by name, email, or student number
 SEARCH_STUDENTS_QUERY = """
-    SELECT s.StudentID, u.FirstName, u.LastName, u.Email, s.StudentNumber, s.RegistrationDate
+    SELECT u.UserID, u.FirstName, u.LastName, u.Email, s.StudentNumber, s.RegistrationDate,
+           LEAST(search_normalize(%s) <<-> user_search_text(u.FirstName, u.LastName, u.Email),
+                 search_normalize(%s) <-> search_normalize(s.StudentNumber))::float8 AS distance
     FROM Students s
     JOIN Users u ON s.UserID = u.UserID
-    WHERE u.FirstName LIKE %s OR u.LastName LIKE %s OR u.Email LIKE %s OR s.StudentNumber LIKE %s;
+    WHERE user_search_text(u.FirstName, u.LastName, u.Email) LIKE search_normalize(%s)
+       OR search_normalize(%s) <%% user_search_text(u.FirstName, u.LastName, u.Email)
+       OR search_normalize(s.StudentNumber) LIKE search_normalize(%s)
 """
+SEARCH_STUDENTS_PARAMS = ('term', 'term', 'pattern', 'term', 'pattern')
 
 # Query to search parents by name or email
 SEARCH_PARENTS_QUERY = """
-    SELECT p.ParentID, u.FirstName, u.LastName, u.Email, u.Phone, u.created_at
+    SELECT u.UserID, u.FirstName, u.LastName, u.Email, u.Phone, u.created_at,
+           (search_normalize(%s) <<-> user_search_text(u.FirstName, u.LastName, u.Email))::float8 AS distance
     FROM Parents p
     JOIN Users u ON p.UserID = u.UserID
-    WHERE u.FirstName LIKE %s OR u.LastName LIKE %s OR u.Email LIKE %s;
+    WHERE user_search_text(u.FirstName, u.LastName, u.Email) LIKE search_normalize(%s)
+       OR search_normalize(%s) <%% user_search_text(u.FirstName, u.LastName, u.Email)
+"""
+SEARCH_PARENTS_PARAMS = ('term', 'pattern', 'term')
+
+# Typeahead: best matches for one role, closest first
+TYPEAHEAD_USERS_QUERY = """
+    SELECT u.UserID, u.FirstName, u.LastName, u.Email
+    FROM Users u
+    WHERE u.RoleID = %s
+      AND (user_search_text(u.FirstName, u.LastName, u.Email) LIKE search_normalize(%s)
+           OR search_normalize(%s) <%% user_search_text(u.FirstName, u.LastName, u.Email))
+    ORDER BY search_normalize(%s) <<-> user_search_text(u.FirstName, u.LastName, u.Email), u.UserID
+    LIMIT %s
 """
+TYPEAHEAD_USERS_PARAMS = ('role_id', 'pattern', 'term', 'term', 'limit')
 
 
+# Sort options for the paged admin tables: sort name -> output columns of the
+# list query (last column unique). See app.pagination.paginate.
+STUDENT_SORTS = {
+    'id': ('userid',),
+    'name': ('lastname', 'firstname', 'userid'),
+    'email': ('email', 'userid'),
+    'student_number': ('studentnumber', 'userid'),
+    'registered': ('registrationdate', 'userid'),
+}
+TEACHER_SORTS = {
+    'id': ('userid',),
+    'name': ('lastname', 'firstname', 'userid'),
+    'email': ('email', 'userid'),
+    'hire_date': ('hiredate', 'userid'),
+}
+PARENT_SORTS = {
+    'id': ('userid',),
+    'name': ('lastname', 'firstname', 'userid'),
+    'email': ('email', 'userid'),
+    'joined': ('created_at', 'userid'),
+}
+CLASS_SORTS = {
+    'id': ('classid',),
+    'name': ('classname', 'classid'),
+    'year': ('academicyear', 'classid'),
+    'teacher': ('lastname', 'firstname', 'classid'),
+}
+COMPETENCY_SORTS = {
+    'id': ('competencyid',),
+    'name': ('competencyname', 'competencyid'),
+}
 
+# Search results default to relevance; the other headers still work
+STUDENT_SEARCH_SORTS = dict(STUDENT_SORTS, relevance=('distance', 'userid'))
+TEACHER_SEARCH_SORTS = dict(TEACHER_SORTS, relevance=('distance', 'userid'))
+PARENT_SEARCH_SORTS = dict(PARENT_SORTS, relevance=('distance', 'userid'))
@@ -0,0 +1,36 @@
+# Competency Analytics Queries (app/services/competency_analytics.py, migrations/012)
+
+# A student's monthly rollups from a month on; one primary-key range per
+# competency of the student.
+# Params: student_id, from_month
+GET_COMPETENCY_SERIES_QUERY = """
+    SELECT m.competency_id, c.competencyname, m.month, m.mean_score, m.min_score, m.max_score,
+           m.assessments, m.latest_score, m.latest_at
+    FROM competency_monthly m
+    JOIN competencies c ON c.competencyid = m.competency_id
+    WHERE m.student_id = %s AND m.month >= %s
+    ORDER BY c.competencyname, m.competency_id, m.month
+"""
+
+# Params: student_id, parent_id
+GET_PARENT_CHILD_QUERY = """
+    SELECT s.studentid, u.firstname, u.lastname
+    FROM students s
+    JOIN users u ON s.userid = u.userid
+    WHERE s.studentid = %s AND s.parentid = %s
+"""
+
+# Full rebuild (the same statements as the migration's backfill)
+LOCK_COMPETENCY_ASSESSMENTS_QUERY = "LOCK TABLE competency_assessments IN SHARE MODE"
+TRUNCATE_COMPETENCY_MONTHLY_QUERY = "TRUNCATE competency_monthly"
+REBUILD_COMPETENCY_MONTHLY_QUERY = """
+    INSERT INTO competency_monthly (student_id, competency_id, month, mean_score, min_score, max_score,
+                                    assessments, latest_score, latest_at)
+    SELECT student_id, competency_id, date_trunc('month', assessed_at)::date,
+           ROUND(AVG(overall_score), 2), MIN(overall_score), MAX(overall_score), COUNT(*),
+           (ARRAY_AGG(overall_score ORDER BY assessed_at DESC, assessment_id DESC)
+                FILTER (WHERE overall_score IS NOT NULL))[1],
+           MAX(assessed_at)
+    FROM competency_assessments
+    GROUP BY student_id, competency_id, date_trunc('month', assessed_at)::date
+"""
@@ -0,0 +1,52 @@
+# Assessment Queries (app/services/assessments.py)
+# Writes are multi-row (psycopg2.extras.execute_values): one statement per
+# table however many students / criteria a request assesses.
+
+# Rows: (student_id, task_id, competency_id, overall_score, feedback)
+UPSERT_ASSESSMENTS_QUERY = """
+    INSERT INTO competency_assessments (
+        student_id, task_id, competency_id,
+        overall_score, feedback, assessed_at
+    ) VALUES %s
+    ON CONFLICT (student_id, task_id, competency_id)
+    DO UPDATE SET
+        overall_score = EXCLUDED.overall_score,
+        feedback = EXCLUDED.feedback,
+        assessed_at = EXCLUDED.assessed_at
+    RETURNING student_id, assessment_id
+"""
+UPSERT_ASSESSMENTS_TEMPLATE = "(%s, %s, %s, %s, %s, NOW())"
+
+# Rows: (assessment_id, criteria_id, performance_level_id, feedback)
+UPSERT_CRITERIA_RATINGS_QUERY = """
+    INSERT INTO criteria_ratings (
+        assessment_id, criteria_id,
+        performance_level_id, feedback
+    ) VALUES %s
+    ON CONFLICT (assessment_id, criteria_id)
+    DO UPDATE SET
+        performance_level_id = EXCLUDED.performance_level_id,
+        feedback = EXCLUDED.feedback
+"""
+
+# A submission is assessed once every member of its group (or its submitter,
+# for an individual task) has an assessment for the task's competency;
+# until then the rest can still be assessed. Returns a row when it was marked.
+# Params: project_id, competency_id, competency_id
+MARK_PROJECT_ASSESSED_QUERY = """
+    UPDATE projects p
+    SET is_assessed = TRUE, assessment_time = NOW()
+    WHERE p.projectid = %s
+      AND NOT EXISTS (
+          SELECT 1 FROM groupmembers gm
+          WHERE gm.groupid = p.groupid
+            AND NOT EXISTS (
+                SELECT 1 FROM competency_assessments ca
+                WHERE ca.student_id = gm.studentid AND ca.task_id = p.taskid
+                  AND ca.competency_id = %s))
+      AND (p.groupid IS NOT NULL OR EXISTS (
+          SELECT 1 FROM competency_assessments ca
+          WHERE ca.student_id = p.submitter_id AND ca.task_id = p.taskid
+            AND ca.competency_id = %s))
+    RETURNING p.projectid
+"""
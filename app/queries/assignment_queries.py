@@ -0,0 +1,70 @@
+# Task Assignment Queries
+# taskassignments records who a task targets (a student, a class or a group);
+# student_tasks (migrations/008) is the resolved student -> task mapping the
+# student pages read. It is maintained by triggers, so nothing here writes it.
+
+# Rows: (task_id, student_id, class_id, group_id), exactly one target set.
+# All targets of a new task go in with one statement.
+INSERT_TASK_ASSIGNMENTS_QUERY = """
+    INSERT INTO taskassignments (taskid, studentid, classid, groupid)
+    VALUES %s
+"""
+
+# A student's tasks with their precomputed status (migrations/009): an index
+# range scan on student_tasks (student_id, duedate, task_id), no projects join.
+# A Pending row past its due date reads as Overdue even before the nightly
+# sweep has flipped it. Paged with app.pagination.paginate on (duedate, taskid).
+# {filters} takes the STUDENT_TASKS_FILTER_* clauses.
+# Params: student_id (+ whatever the filters add)
+GET_STUDENT_TASKS_QUERY = """
+    SELECT
+        st.task_id AS taskid,
+        t.title,
+        t.taskdescription AS description,
+        st.duedate,
+        u.firstname,
+        u.lastname,
+        CASE
+            WHEN st.status = 'Pending' AND st.duedate < CURRENT_DATE THEN 'Overdue'
+            ELSE st.status
+        END AS task_status,
+        st.is_late
+    FROM student_tasks st
+    JOIN tasks t ON st.task_id = t.taskid
+    JOIN teachers te ON t.teacherid = te.teacherid
+    JOIN users u ON te.userid = u.userid
+    WHERE st.student_id = %s
+      {filters}
+"""
+
+STUDENT_TASK_SORTS = {
+    'due': ('duedate', 'taskid'),
+}
+
+# Filter clauses for GET_STUDENT_TASKS_QUERY
+STUDENT_TASKS_FILTER_DUE_FROM = "AND st.duedate >= %s"
+STUDENT_TASKS_FILTER_DUE_TO = "AND st.duedate <= %s"
+
+# Flip rows whose due date has passed (python -m app.services.task_status sweep)
+SWEEP_OVERDUE_QUERY = """
+    UPDATE student_tasks
+    SET overdue = TRUE
+    WHERE NOT overdue AND duedate < CURRENT_DATE
+"""
+
+# Params: student_id
+COUNT_STUDENT_TASKS_QUERY = """
+    SELECT COUNT(*) FROM student_tasks WHERE student_id = %s
+"""
+
+# The student's group among the groups a task is assigned to (None for
+# individual / class work). Params: student_id, task_id
+GET_STUDENT_TASK_GROUP_QUERY = """
+    SELECT sg.groupid, sg.groupname
+    FROM taskassignments ta
+    JOIN groupmembers gm ON gm.groupid = ta.groupid AND gm.studentid = %s
+    JOIN studentgroups sg ON sg.groupid = ta.groupid
+    WHERE ta.taskid = %s
+    ORDER BY sg.groupid
+    LIMIT 1
+"""
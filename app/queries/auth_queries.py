@@ -22,6 +22,14 @@ INSERT_NEW_USER_QUERY = """
     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW());
 """
 
+# Same insert, returning the new UserID (saves the follow-up SELECT by email)
+INSERT_NEW_USER_RETURNING_ID_QUERY = """
+    INSERT INTO Users 
+    (FirstName, LastName, Email, Phone, PasswordHash, RoleID, is_active, email_token, token_expiry, created_at) 
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+    RETURNING UserID;
+"""
+
 # Query to verify a user's email by setting is_active to TRUE
 # Requires: email_token
 VERIFY_EMAIL_QUERY = """
@@ -75,3 +83,10 @@ GET_STUDENT_BY_EMAIL_OR_NUMBER_QUERY = """
     WHERE u.Email = %s OR s.StudentNumber = %s;
 """
 
+# Store an upgraded hash after a successful login; only if the hash is still
+# the one that was checked (a concurrent password reset wins)
+REHASH_PASSWORD_QUERY = """
+    UPDATE Users
+    SET PasswordHash = %s
+    WHERE UserID = %s AND PasswordHash = %s
+"""
@@ -0,0 +1,49 @@
+# Blob Store Queries (app/services/blob_store.py, migration 007)
+# Reference counts are kept by triggers on projects; nothing here touches them.
+
+# Project rows whose file is still in the old by_student/by_group layout,
+# grouped by path (a path can be shared by several rows after a re-submit).
+# Params: blob path prefix (LIKE pattern)
+GET_UNINGESTED_FILES_QUERY = """
+    SELECT projectfilepath, array_agg(projectid ORDER BY projectid)
+    FROM projects
+    WHERE projectfilepath IS NOT NULL
+      AND projectfilepath NOT LIKE %s
+    GROUP BY projectfilepath
+    ORDER BY projectfilepath
+"""
+
+# Params: content_sha256, file_size, blob path, projectids (array)
+SET_PROJECT_BLOB_QUERY = """
+    UPDATE projects
+    SET content_sha256 = %s, file_size = %s, projectfilepath = %s
+    WHERE projectid = ANY(%s)
+"""
+
+# Unreferenced blobs past the grace period; the caller deletes the files
+# after committing. SKIP LOCKED: a blob an upload is re-referencing right
+# now is left for the next run. Params: grace seconds
+DELETE_RELEASED_BLOBS_QUERY = """
+    DELETE FROM blobs
+    WHERE sha256 IN (
+        SELECT sha256 FROM blobs
+        WHERE refcount = 0
+          AND released_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING sha256, size
+"""
+
+BLOB_STATS_QUERY = """
+    SELECT
+        COUNT(*) AS blobs,
+        COALESCE(SUM(size), 0) AS stored_bytes,
+        COALESCE(SUM(size * refcount), 0) AS referenced_bytes,
+        COUNT(*) FILTER (WHERE refcount = 0) AS unreferenced
+    FROM blobs
+"""
+
+# Which of these hashes have a row (orphan-file sweep). Params: sha256 array
+GET_KNOWN_BLOBS_QUERY = """
+    SELECT sha256 FROM blobs WHERE sha256 = ANY(%s)
+"""
@@ -0,0 +1,79 @@
+# Gradebook Queries (app/services/gradebook.py)
+
+# Params: class_id, teacher_id
+GET_GRADEBOOK_CLASS_QUERY = """
+    SELECT classname, academicyear FROM classes
+    WHERE classid = %s AND teacherid = %s
+"""
+
+# Gradebook columns: one per (task, competency) of this teacher's tasks that
+# reach at least one student of the class.
+# Params: teacher_id, class_id
+GET_GRADEBOOK_COLUMNS_QUERY = """
+    SELECT t.taskid, t.title, t.duedate, c.competencyid, c.competencyname
+    FROM tasks t
+    JOIN task_competencies tc ON tc.taskid = t.taskid
+    JOIN competencies c ON c.competencyid = tc.competencyid
+    WHERE t.teacherid = %s
+      AND EXISTS (
+          SELECT 1 FROM student_tasks st
+          JOIN class_students cs ON cs.studentid = st.student_id
+          WHERE st.task_id = t.taskid AND cs.classid = %s
+      )
+    ORDER BY t.duedate, t.taskid, c.competencyname
+"""
+
+# The pivot: one row per student of the class with their overall scores as an
+# array in column order (NULL = not assessed). The columns come in as two
+# parallel arrays; every cell is one probe of the
+# competency_assessments (student_id, task_id, competency_id) unique index.
+# Params: task_ids, competency_ids, class_id
+GET_GRADEBOOK_ROWS_QUERY = """
+    SELECT s.studentid, u.firstname, u.lastname, s.studentnumber,
+           array_agg(ca.overall_score ORDER BY col.ord) AS scores
+    FROM class_students cs
+    JOIN students s ON s.studentid = cs.studentid
+    JOIN users u ON u.userid = s.userid
+    CROSS JOIN unnest(%s::int[], %s::int[]) WITH ORDINALITY AS col(task_id, competency_id, ord)
+    LEFT JOIN competency_assessments ca
+           ON ca.student_id = cs.studentid
+          AND ca.task_id = col.task_id
+          AND ca.competency_id = col.competency_id
+    WHERE cs.classid = %s
+    GROUP BY s.studentid, u.firstname, u.lastname, s.studentnumber
+    ORDER BY u.lastname, u.firstname, s.studentid
+"""
+
+# Roster only, for a class without any gradebook columns yet
+# Params: class_id
+GET_GRADEBOOK_ROSTER_QUERY = """
+    SELECT s.studentid, u.firstname, u.lastname, s.studentnumber, ARRAY[]::numeric[]
+    FROM class_students cs
+    JOIN students s ON s.studentid = cs.studentid
+    JOIN users u ON u.userid = s.userid
+    WHERE cs.classid = %s
+    ORDER BY u.lastname, u.firstname, s.studentid
+"""
+
+# Drill-down of one gradebook cell group: a student's competency assessments
+# for a task with their criteria ratings. Limited to this teacher's task and
+# a student of this class.
+# Params: student_id, task_id, teacher_id, class_id
+GET_GRADEBOOK_CELL_QUERY = """
+    SELECT ca.competency_id, co.competencyname, ca.overall_score, ca.feedback, ca.assessed_at,
+           cr.criteria_id, cri.criterianame, pl.levelname, pl.scorevalue, cr.feedback
+    FROM competency_assessments ca
+    JOIN tasks t ON t.taskid = ca.task_id
+    JOIN competencies co ON co.competencyid = ca.competency_id
+    LEFT JOIN criteria_ratings cr ON cr.assessment_id = ca.assessment_id
+    LEFT JOIN criteria cri ON cri.criteriaid = cr.criteria_id
+    LEFT JOIN performance pl ON pl.performancelevelid = cr.performance_level_id
+    WHERE ca.student_id = %s
+      AND ca.task_id = %s
+      AND t.teacherid = %s
+      AND EXISTS (
+          SELECT 1 FROM class_students cs
+          WHERE cs.classid = %s AND cs.studentid = ca.student_id
+      )
+    ORDER BY co.competencyname, cri.criterianame
+"""
@@ -0,0 +1,33 @@
+# Bulk Import Queries
+# Used by app/services/bulk_import.py; every lookup takes whole chunks (= ANY)
+# and the inserts are multi-row (psycopg2.extras.execute_values).
+
+# Emails / phones in the chunk that are already taken
+FIND_EXISTING_USERS_QUERY = """
+    SELECT Email, Phone FROM Users
+    WHERE Email = ANY(%s) OR Phone = ANY(%s)
+"""
+
+FIND_EXISTING_STUDENT_NUMBERS_QUERY = """
+    SELECT StudentNumber FROM Students WHERE StudentNumber = ANY(%s)
+"""
+
+# Parent links for a chunk of students, by parent email
+GET_PARENTS_BY_EMAILS_QUERY = """
+    SELECT u.Email, p.ParentID
+    FROM Parents p
+    JOIN Users u ON p.UserID = u.UserID
+    WHERE u.Email = ANY(%s)
+"""
+
+# Imported accounts are created active (an admin vouches for them)
+BULK_INSERT_USERS_QUERY = """
+    INSERT INTO Users (FirstName, LastName, Email, Phone, PasswordHash, RoleID, is_active, created_at)
+    VALUES %s
+    RETURNING UserID, Email
+"""
+BULK_INSERT_USERS_TEMPLATE = "(%s, %s, %s, %s, %s, %s, TRUE, NOW())"
+
+BULK_INSERT_STUDENTS_QUERY = "INSERT INTO Students (UserID, ParentID, StudentNumber, RegistrationDate) VALUES %s"
+BULK_INSERT_TEACHERS_QUERY = "INSERT INTO Teachers (UserID, HireDate) VALUES %s"
+BULK_INSERT_PARENTS_QUERY = "INSERT INTO Parents (UserID) VALUES %s"
@@ -0,0 +1,105 @@
+# Background Job Queries (migrations/011_jobs.sql, app/services/jobs.py)
+
+# Params: kind, payload (JSON), max_attempts, delay seconds, created_by
+INSERT_JOB_QUERY = """
+    INSERT INTO jobs (kind, payload, max_attempts, run_after, created_by)
+    VALUES (%s, %s, %s, NOW() + make_interval(secs => %s), %s)
+    RETURNING job_id
+"""
+
+# Wakes a LISTENing worker when the inserting transaction commits
+NOTIFY_JOBS_QUERY = "NOTIFY jobs"
+LISTEN_JOBS_QUERY = "LISTEN jobs"
+
+GET_JOB_QUERY = """
+    SELECT job_id, kind, payload, status, attempts, max_attempts, run_after, result,
+           last_error, created_by, created_at, started_at, finished_at
+    FROM jobs
+    WHERE job_id = %s
+"""
+
+# Jobs whose worker stopped sending heartbeats on their last attempt: the job
+# itself may be what kills the worker (out of memory, a crash in a native
+# library), so it is failed rather than claimed again.
+# Params: kinds, stale seconds
+FAIL_STALE_JOBS_QUERY = """
+    UPDATE jobs
+    SET status = 'failed', finished_at = NOW(),
+        last_error = 'The worker stopped while running the last attempt'
+    WHERE job_id IN (
+        SELECT job_id FROM jobs
+        WHERE kind = ANY(%s)
+          AND status = 'running'
+          AND heartbeat_at < NOW() - make_interval(secs => %s)
+          AND attempts >= max_attempts
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING job_id, kind
+"""
+
+# Take up to %s due jobs of the given kinds; SKIP LOCKED lets several workers
+# share the queue. Jobs whose worker stopped sending heartbeats (it died mid
+# job) are taken again while they have attempts left; each claim counts as an
+# attempt.
+# Params: claimed_by, kinds, stale seconds, limit
+CLAIM_JOBS_QUERY = """
+    UPDATE jobs
+    SET status = 'running', attempts = attempts + 1, claimed_by = %s,
+        heartbeat_at = NOW(), started_at = NOW()
+    WHERE job_id IN (
+        SELECT job_id FROM jobs
+        WHERE kind = ANY(%s)
+          AND ((status = 'queued' AND run_after <= NOW())
+            OR (status = 'running' AND heartbeat_at < NOW() - make_interval(secs => %s)
+                AND attempts < max_attempts))
+        ORDER BY run_after, job_id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING job_id, kind, payload, attempts, max_attempts, created_by
+"""
+
+# Params: job_ids, claimed_by
+JOB_HEARTBEAT_QUERY = """
+    UPDATE jobs SET heartbeat_at = NOW()
+    WHERE job_id = ANY(%s) AND status = 'running' AND claimed_by = %s
+"""
+
+# Params: result (JSON), job_id, claimed_by
+MARK_JOB_DONE_QUERY = """
+    UPDATE jobs SET status = 'done', result = %s, last_error = NULL, finished_at = NOW()
+    WHERE job_id = %s AND claimed_by = %s
+"""
+
+# Back off exponentially: base * 2^(attempts - 1)
+# Params: error, base seconds, job_id, claimed_by
+MARK_JOB_RETRY_QUERY = """
+    UPDATE jobs
+    SET status = 'queued', last_error = %s,
+        run_after = NOW() + make_interval(secs => %s * power(2, attempts - 1))
+    WHERE job_id = %s AND claimed_by = %s
+"""
+
+# Params: error, job_id, claimed_by
+MARK_JOB_FAILED_QUERY = """
+    UPDATE jobs SET status = 'failed', last_error = %s, finished_at = NOW()
+    WHERE job_id = %s AND claimed_by = %s
+"""
+
+# Params: days
+DELETE_OLD_JOBS_QUERY = """
+    DELETE FROM jobs
+    WHERE status IN ('done', 'failed') AND finished_at < NOW() - make_interval(days => %s)
+"""
+
+JOB_STATS_QUERY = """
+    SELECT kind,
+           COUNT(*) FILTER (WHERE status = 'queued'),
+           COUNT(*) FILTER (WHERE status = 'running'),
+           COUNT(*) FILTER (WHERE status = 'failed'),
+           EXTRACT(EPOCH FROM NOW() - MIN(created_at) FILTER (WHERE status = 'queued'))
+    FROM jobs
+    WHERE status IN ('queued', 'running', 'failed')
+    GROUP BY kind
+    ORDER BY kind
+"""
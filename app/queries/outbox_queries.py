@@ -0,0 +1,57 @@
+# Email Outbox Queries (migrations/005_email_outbox.sql)
+
+INSERT_OUTBOX_EMAIL_QUERY = """
+    INSERT INTO email_outbox (sender, recipients, subject, body_text, body_html)
+    VALUES (%s, %s, %s, %s, %s)
+    RETURNING id
+"""
+
+# Wakes a LISTENing worker when the inserting transaction commits
+NOTIFY_OUTBOX_QUERY = "NOTIFY email_outbox"
+LISTEN_OUTBOX_QUERY = "LISTEN email_outbox"
+
+# Take up to %s due messages; SKIP LOCKED lets several workers share the queue.
+# Rows stuck in 'sending' (worker died mid-batch) are picked up again after
+# the claim timeout.
+CLAIM_OUTBOX_BATCH_QUERY = """
+    UPDATE email_outbox SET status = 'sending', claimed_at = NOW()
+    WHERE id IN (
+        SELECT id FROM email_outbox
+        WHERE (status = 'pending' AND next_attempt_at <= NOW())
+           OR (status = 'sending' AND claimed_at < NOW() - make_interval(secs => %s))
+        ORDER BY next_attempt_at
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, sender, recipients, subject, body_text, body_html, attempts
+"""
+
+MARK_OUTBOX_SENT_QUERY = """
+    UPDATE email_outbox SET status = 'sent', sent_at = NOW(), attempts = attempts + 1, last_error = NULL
+    WHERE id = ANY(%s)
+"""
+
+# Back off exponentially (base * 2^attempts), give up after max attempts
+MARK_OUTBOX_RETRY_QUERY = """
+    UPDATE email_outbox
+    SET attempts = attempts + 1,
+        last_error = %s,
+        status = CASE WHEN attempts + 1 >= %s THEN 'failed' ELSE 'pending' END,
+        next_attempt_at = NOW() + make_interval(secs => %s * power(2, attempts))
+    WHERE id = %s
+"""
+
+OUTBOX_STATS_QUERY = """
+    SELECT
+        COUNT(*) FILTER (WHERE status = 'pending'),
+        COUNT(*) FILTER (WHERE status = 'sending'),
+        COUNT(*) FILTER (WHERE status = 'failed'),
+        EXTRACT(EPOCH FROM NOW() - MIN(created_at) FILTER (WHERE status IN ('pending', 'sending'))),
+        (SELECT COUNT(*) FROM email_outbox WHERE status = 'sent' AND sent_at > NOW() - INTERVAL '1 hour'),
+        (SELECT EXTRACT(EPOCH FROM AVG(sent_at - created_at)) FROM email_outbox
+         WHERE status = 'sent' AND sent_at > NOW() - INTERVAL '1 hour'),
+        (SELECT EXTRACT(EPOCH FROM percentile_cont(0.95) WITHIN GROUP (ORDER BY sent_at - created_at))
+         FROM email_outbox WHERE status = 'sent' AND sent_at > NOW() - INTERVAL '1 hour')
+    FROM email_outbox
+    WHERE status IN ('pending', 'sending', 'failed')
+"""
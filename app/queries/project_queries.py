@@ -20,4 +20,21 @@ INSERT_PROJECT_QUERY = """
         taskid, studentid, groupid, submitter_id, 
         file_name, projectfilepath, status
     ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-"""
\ No newline at end of file
+"""
+# Store a submission once its file is on disk (content_sha256: migrations/006)
+INSERT_PROJECT_SUBMISSION_QUERY = """
+    INSERT INTO projects (
+        taskid,
+        studentid,
+        groupid,
+        submitter_id,
+        file_name,
+        projectfilepath,
+        is_late,
+        file_size,
+        file_type,
+        submission_time,
+        content_sha256
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    RETURNING projectid
+"""
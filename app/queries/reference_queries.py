@@ -0,0 +1,23 @@
+# Reference Data Queries (app/services/reference_cache.py)
+# Competencies, criteria and performance levels change rarely and are cached
+# per process; writers announce changes on the reference_data channel.
+
+GET_CRITERIA_BY_COMPETENCY_QUERY = """
+    SELECT competencyid, criteriaid, criterianame, criteriadescription
+    FROM criteria
+    ORDER BY competencyid, criteriaid
+"""
+
+GET_PERFORMANCE_LEVELS_BY_SCORE_QUERY = """
+    SELECT 
+        performancelevelid, 
+        levelname, 
+        scorevalue, 
+        leveldescription
+    FROM performance
+    ORDER BY scorevalue DESC
+"""
+
+# Payload: comma-separated table names. Delivered to listeners on commit.
+NOTIFY_REFERENCE_QUERY = "SELECT pg_notify('reference_data', %s)"
+LISTEN_REFERENCE_QUERY = "LISTEN reference_data"
@@ -0,0 +1,171 @@
+# Report Card Queries (app/services/report_cards.py, migrations/010)
+
+# Params: class_id, term_label, term_start, term_end, format, created_by
+INSERT_REPORT_BATCH_QUERY = """
+    INSERT INTO report_batches (class_id, term_label, term_start, term_end, format, created_by)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    RETURNING batch_id
+"""
+
+GET_REPORT_BATCH_QUERY = """
+    SELECT b.batch_id, b.class_id, c.classname, c.teacherid, b.term_label, b.term_start,
+           b.term_end, b.format, b.status, b.total, b.done, b.failed, b.error,
+           b.created_at, b.started_at, b.finished_at
+    FROM report_batches b
+    LEFT JOIN classes c ON c.classid = b.class_id
+    WHERE b.batch_id = %s
+"""
+
+GET_RECENT_REPORT_BATCHES_QUERY = """
+    SELECT b.batch_id, COALESCE(c.classname, 'Whole school'), b.term_label, b.format,
+           b.status, b.total, b.done, b.failed, b.created_at, b.finished_at
+    FROM report_batches b
+    LEFT JOIN classes c ON c.classid = b.class_id
+    ORDER BY b.created_at DESC
+    LIMIT %s
+"""
+
+# Class choices on the admin form
+GET_REPORT_CLASSES_QUERY = """
+    SELECT c.classid, c.classname, c.academicyear, COUNT(cs.studentid)
+    FROM classes c
+    LEFT JOIN class_students cs ON cs.classid = c.classid
+    GROUP BY c.classid, c.classname, c.academicyear
+    ORDER BY c.academicyear DESC, c.classname
+"""
+
+# Claim a queued batch, or a failed one being retried (a second runner for
+# the same batch gets nothing). A 'running' batch is only taken over by the
+# job that started it (claimed again after its worker died) or when forced.
+# Params: total, job_id, batch_id, job_id, force
+START_REPORT_BATCH_QUERY = """
+    UPDATE report_batches
+    SET status = 'running', total = %s, done = 0, failed = 0, error = NULL,
+        started_at = NOW(), finished_at = NULL, job_id = %s
+    WHERE batch_id = %s
+      AND (status IN ('queued', 'failed')
+           OR (status = 'running' AND (job_id = %s OR %s)))
+    RETURNING batch_id
+"""
+
+# Params: done, failed, batch_id
+REPORT_BATCH_PROGRESS_QUERY = """
+    UPDATE report_batches SET done = done + %s, failed = failed + %s
+    WHERE batch_id = %s
+"""
+
+# Params: status, error, batch_id
+FINISH_REPORT_BATCH_QUERY = """
+    UPDATE report_batches SET status = %s, error = %s, finished_at = NOW()
+    WHERE batch_id = %s
+"""
+
+# Students a batch covers. Params: class_id
+GET_CLASS_REPORT_STUDENTS_QUERY = """
+    SELECT studentid FROM class_students WHERE classid = %s ORDER BY studentid
+"""
+GET_SCHOOL_REPORT_STUDENTS_QUERY = """
+    SELECT studentid FROM students ORDER BY studentid
+"""
+
+# ==================================
+# Term aggregation, one chunk of students at a time
+# ==================================
+
+# Params: student_ids
+GET_REPORT_STUDENTS_QUERY = """
+    SELECT s.studentid, u.firstname, u.lastname, s.studentnumber,
+           STRING_AGG(DISTINCT c.classname, ', ') AS classes
+    FROM students s
+    JOIN users u ON u.userid = s.userid
+    LEFT JOIN class_students cs ON cs.studentid = s.studentid
+    LEFT JOIN classes c ON c.classid = cs.classid
+    WHERE s.studentid = ANY(%s)
+    GROUP BY s.studentid, u.firstname, u.lastname, s.studentnumber
+"""
+
+# Per student and competency: average overall score over the term's
+# assessments, how many tasks it is based on and the latest feedback.
+# Params: student_ids, term_start, term_end
+GET_REPORT_COMPETENCIES_QUERY = """
+    SELECT ca.student_id, co.competencyid, co.competencyname,
+           ROUND(AVG(ca.overall_score), 1) AS average_score,
+           COUNT(*) AS assessments,
+           (ARRAY_AGG(ca.feedback ORDER BY ca.assessed_at DESC)
+                FILTER (WHERE ca.feedback IS NOT NULL AND ca.feedback <> ''))[1] AS latest_feedback
+    FROM competency_assessments ca
+    JOIN competencies co ON co.competencyid = ca.competency_id
+    WHERE ca.student_id = ANY(%s)
+      AND ca.assessed_at >= %s
+      AND ca.assessed_at < %s::date + 1
+    GROUP BY ca.student_id, co.competencyid, co.competencyname
+    ORDER BY ca.student_id, co.competencyname
+"""
+
+# Per student, competency and criterion: average performance level score
+# Params: student_ids, term_start, term_end
+GET_REPORT_CRITERIA_QUERY = """
+    SELECT ca.student_id, ca.competency_id, cri.criterianame,
+           ROUND(AVG(pl.scorevalue), 1) AS average_score,
+           COUNT(*) AS ratings
+    FROM competency_assessments ca
+    JOIN criteria_ratings cr ON cr.assessment_id = ca.assessment_id
+    JOIN criteria cri ON cri.criteriaid = cr.criteria_id
+    JOIN performance pl ON pl.performancelevelid = cr.performance_level_id
+    WHERE ca.student_id = ANY(%s)
+      AND ca.assessed_at >= %s
+      AND ca.assessed_at < %s::date + 1
+    GROUP BY ca.student_id, ca.competency_id, cri.criterianame
+    ORDER BY ca.student_id, ca.competency_id, cri.criterianame
+"""
+
+# Rows: (student_id, teacher_id, report_file_path, term_label, term_start, term_end, format, batch_id)
+UPSERT_REPORTS_QUERY = """
+    INSERT INTO reports (studentid, teacherid, reportdate, reportfilepath,
+                         term_label, term_start, term_end, format, batch_id)
+    VALUES %s
+    ON CONFLICT (studentid, term_start, term_end, format) DO UPDATE
+        SET teacherid = EXCLUDED.teacherid,
+            reportdate = EXCLUDED.reportdate,
+            reportfilepath = EXCLUDED.reportfilepath,
+            term_label = EXCLUDED.term_label,
+            batch_id = EXCLUDED.batch_id
+"""
+UPSERT_REPORTS_TEMPLATE = "(%s, %s, CURRENT_DATE, %s, %s, %s, %s, %s, %s)"
+
+# ==================================
+# Student / parent report lists and downloads
+# ==================================
+
+# Params: student_id
+GET_STUDENT_REPORTS_QUERY = """
+    SELECT r.reportid, r.term_label, r.reportdate, r.format, r.term_start, r.term_end
+    FROM reports r
+    WHERE r.studentid = %s
+    ORDER BY r.reportdate DESC, r.reportid DESC
+"""
+
+# Params: parent_id
+GET_PARENT_REPORTS_QUERY = """
+    SELECT r.reportid, r.term_label, r.reportdate, r.format, r.term_start, r.term_end,
+           u.firstname || ' ' || u.lastname AS child_name
+    FROM students s
+    JOIN users u ON u.userid = s.userid
+    JOIN reports r ON r.studentid = s.studentid
+    WHERE s.parentid = %s
+    ORDER BY u.firstname, r.reportdate DESC, r.reportid DESC
+"""
+
+# A report file, if it belongs to this student / one of this parent's children
+# Params: report_id, student_id
+GET_STUDENT_REPORT_FILE_QUERY = """
+    SELECT reportfilepath, term_label, format FROM reports
+    WHERE reportid = %s AND studentid = %s
+"""
+# Params: report_id, parent_id
+GET_PARENT_REPORT_FILE_QUERY = """
+    SELECT r.reportfilepath, r.term_label, r.format
+    FROM reports r
+    JOIN students s ON s.studentid = r.studentid
+    WHERE r.reportid = %s AND s.parentid = %s
+"""
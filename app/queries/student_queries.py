@@ -0,0 +1,41 @@
+# Student Dashboard Queries (app/services/student_dashboard.py)
+
+# Everything the dashboard shows in one round trip. Returns one row per latest
+# project (up to 3, at least 1): the name and counts repeat on every row,
+# title / submission_time / file_type are NULL when nothing was submitted.
+# "mine" is the student's own and submitted-for-group projects; the UNION keeps
+# each branch on its own index (idx_projects_studentid / idx_projects_submitter).
+# Params: student_id
+STUDENT_DASHBOARD_QUERY = """
+    WITH me AS (
+        SELECT u.firstname, u.lastname
+        FROM students s
+        JOIN users u ON s.userid = u.userid
+        WHERE s.studentid = %(student_id)s
+    ), mine AS (
+        SELECT projectid, taskid, submission_time, file_type
+        FROM projects WHERE studentid = %(student_id)s
+        UNION
+        SELECT projectid, taskid, submission_time, file_type
+        FROM projects WHERE submitter_id = %(student_id)s
+    ), counts AS (
+        SELECT
+            (SELECT COUNT(*) FROM student_tasks WHERE student_id = %(student_id)s) AS task_count,
+            (SELECT COUNT(*) FROM mine) AS project_count,
+            (SELECT COUNT(DISTINCT tc.competencyid)
+             FROM mine m JOIN task_competencies tc ON tc.taskid = m.taskid) AS competencies_count
+    ), latest AS (
+        SELECT t.title, m.submission_time, m.file_type
+        FROM mine m
+        JOIN tasks t ON m.taskid = t.taskid
+        ORDER BY m.submission_time DESC NULLS LAST
+        LIMIT 3
+    )
+    SELECT me.firstname, me.lastname,
+           counts.task_count, counts.project_count, counts.competencies_count,
+           latest.title, latest.submission_time, latest.file_type
+    FROM counts
+    LEFT JOIN me ON TRUE
+    LEFT JOIN latest ON TRUE
+    ORDER BY latest.submission_time DESC NULLS LAST
+"""
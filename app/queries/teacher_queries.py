@@ -0,0 +1,78 @@
+# Teacher Submissions Queries
+
+# One page of a teacher's submissions, newest first.
+# {filters} is a list of extra "AND ..." clauses built by the route; the page is
+# cut down (keyset + LIMIT) before the name / class / assessment lookups run,
+# so the cost is bounded by the page size, not by the teacher's history.
+# Params: teacher_id, limit (+ whatever the filters add)
+GET_SUBMISSIONS_PAGE_QUERY = """
+    WITH page AS (
+        SELECT p.projectid, p.taskid, p.submission_time, p.submitter_id,
+               p.groupid, p.is_late, p.is_assessed, p.assessment_time, p.file_name
+        FROM projects p
+        JOIN tasks t ON p.taskid = t.taskid
+        WHERE t.teacherid = %(teacher_id)s
+          AND p.submission_time IS NOT NULL
+          {filters}
+        ORDER BY p.submission_time DESC, p.projectid DESC
+        LIMIT %(limit)s
+    )
+    SELECT
+        pg.projectid,
+        t.title AS task_title,
+        pg.submission_time,
+        u.firstname || ' ' || u.lastname AS submitter_name,
+        pg.is_late,
+        t.taskid,
+        cls.classname AS class_context,
+        pg.groupid,
+        sg.groupname AS group_name,
+        pg.is_assessed,
+        pg.assessment_time,
+        pg.file_name,
+        EXISTS (
+            SELECT 1 FROM competency_assessments ca
+            WHERE ca.task_id = pg.taskid AND ca.student_id = pg.submitter_id
+        ) AS has_assessment
+    FROM page pg
+    JOIN tasks t ON pg.taskid = t.taskid
+    LEFT JOIN students s ON pg.submitter_id = s.studentid
+    LEFT JOIN users u ON s.userid = u.userid
+    LEFT JOIN studentgroups sg ON pg.groupid = sg.groupid
+    LEFT JOIN LATERAL (
+        -- The submitter is always a member of the submitting group, so their
+        -- class is the class context for group work too; prefer this teacher's class.
+        SELECT c.classname
+        FROM class_students cs
+        JOIN classes c ON cs.classid = c.classid
+        WHERE cs.studentid = pg.submitter_id
+        ORDER BY (c.teacherid = %(teacher_id)s) DESC, c.classid
+        LIMIT 1
+    ) cls ON TRUE
+    ORDER BY pg.submission_time DESC, pg.projectid DESC
+"""
+
+# Filter clauses for GET_SUBMISSIONS_PAGE_QUERY
+SUBMISSIONS_FILTER_TASK = "AND p.taskid = %(task_id)s"
+SUBMISSIONS_FILTER_CLASS = """AND EXISTS (
+            SELECT 1 FROM class_students cs
+            WHERE cs.classid = %(class_id)s AND cs.studentid = p.submitter_id
+          )"""
+SUBMISSIONS_FILTER_ASSESSED = "AND COALESCE(p.is_assessed, FALSE) = %(assessed)s"
+SUBMISSIONS_FILTER_LATE = "AND p.is_late = %(late)s"
+# Keyset: continue strictly after the last row of the previous page
+SUBMISSIONS_FILTER_AFTER = """AND (p.submission_time, p.projectid) < (
+            SELECT submission_time, projectid FROM projects WHERE projectid = %(after)s
+          )"""
+
+GET_TEACHER_TASK_OPTIONS_QUERY = """
+    SELECT taskid, title FROM tasks
+    WHERE teacherid = %s
+    ORDER BY createdat DESC
+"""
+
+GET_TEACHER_CLASS_OPTIONS_QUERY = """
+    SELECT classid, classname FROM classes
+    WHERE teacherid = %s
+    ORDER BY classname
+"""
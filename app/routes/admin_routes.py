@@ -1,11 +1,23 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash,session
-from werkzeug.security import generate_password_hash
-from app.database import get_db_connection
-from app.queries.auth_queries import INSERT_NEW_USER_QUERY, GET_USER_BY_EMAIL_QUERY
-from app.queries.admin_queries import (COUNT_TEACHERS_QUERY, COUNT_PARENTS_QUERY,COUNT_STUDENTS_QUERY, 
-        COUNT_COMPETENCIES_QUERY,INSERT_NEW_STUDENT_QUERY, GET_ALL_STUDENTS_QUERY, GET_PARENT_BY_EMAIL_QUERY,GET_ALL_PARENTS_QUERY,
-        SEARCH_TEACHERS_QUERY,SEARCH_PARENTS_QUERY,SEARCH_STUDENTS_QUERY
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, current_app
+from app.database import get_db_connection, get_pool_stats, db_cursor, rollback_db, after_commit
+from app.queries.auth_queries import INSERT_NEW_USER_QUERY, INSERT_NEW_USER_RETURNING_ID_QUERY, GET_USER_BY_EMAIL_QUERY
+from app.queries.admin_queries import (INSERT_NEW_STUDENT_QUERY, GET_ALL_STUDENTS_QUERY, GET_PARENT_BY_EMAIL_QUERY,GET_ALL_PARENTS_QUERY,
+        GET_ALL_TEACHERS_QUERY, GET_ALL_CLASSES_QUERY,
+        SEARCH_TEACHERS_QUERY,SEARCH_PARENTS_QUERY,SEARCH_STUDENTS_QUERY,
+        SEARCH_TEACHERS_PARAMS, SEARCH_PARENTS_PARAMS, SEARCH_STUDENTS_PARAMS,
+        TYPEAHEAD_USERS_QUERY, TYPEAHEAD_USERS_PARAMS,
+        STUDENT_SORTS, TEACHER_SORTS, PARENT_SORTS, CLASS_SORTS, COMPETENCY_SORTS,
+        STUDENT_SEARCH_SORTS, TEACHER_SEARCH_SORTS, PARENT_SEARCH_SORTS
                                      )
+from app.pagination import paginate
+from app.search import search_params
+from app.services.dashboard_stats import get_dashboard_counts, invalidate_dashboard_counts
+from app.services.passwords import hash_password
+from app.services.outbox import outbox_stats
+from app.services.bulk_import import save_upload, ImportFileError, IMPORT_KINDS
+from app.services import reference_cache
+from app.services import report_cards, jobs
+from app.queries.report_queries import GET_REPORT_CLASSES_QUERY, GET_RECENT_REPORT_BATCHES_QUERY
 from datetime import datetime
 
 admin_routes = Blueprint('admin', __name__)
@@ -30,32 +42,43 @@ def admin_login_required(route_function):
 @admin_routes.route('/dashboard')
 @admin_login_required
 def admin_dashboard():
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # All four counters in one statement, cached for DASHBOARD_STATS_TTL seconds
+    with db_cursor() as cursor:
+        counts = get_dashboard_counts(cursor)
 
-    try:
-        # Fetch the count of teachers
-        cursor.execute(COUNT_TEACHERS_QUERY)
-        teacher_count = cursor.fetchone()[0]
+    # Pass the counts to the template
+    return render_template('admin/admin_dashboard.html', teacher_count=counts['teachers'], parent_count=counts['parents'],
+                           student_count=counts['students'], competency_count=counts['competencies'])
 
-        # Fetch the count of parents
-        cursor.execute(COUNT_PARENTS_QUERY)
-        parent_count = cursor.fetchone()[0]
 
-        #fetch the count of students
-        cursor.execute(COUNT_STUDENTS_QUERY)
-        student_count = cursor.fetchone()[0]
+# Connection pool saturation (JSON) for this worker process
+@admin_routes.route('/pool_stats', methods=['GET'])
+@admin_login_required
+def pool_stats():
+    return get_pool_stats()
 
-        # Fetch the count of competencies
-        cursor.execute(COUNT_COMPETENCIES_QUERY)
-        competency_count = cursor.fetchone()[0]
 
-    finally:
-        cursor.close()
-        conn.close()
+# Email outbox depth and send latency (JSON)
+@admin_routes.route('/outbox_stats', methods=['GET'])
+@admin_login_required
+def email_outbox_stats():
+    with db_cursor() as cursor:
+        return outbox_stats(cursor)
 
-    # Pass the counts to the template
-    return render_template('admin/admin_dashboard.html', teacher_count=teacher_count, parent_count=parent_count,student_count=student_count,competency_count=competency_count)
+
+# Background job queue depth per kind (JSON)
+@admin_routes.route('/job_stats', methods=['GET'])
+@admin_login_required
+def job_stats():
+    with db_cursor() as cursor:
+        return jobs.job_stats(cursor)
+
+
+# Reference data cache hit/miss counters for this worker process (JSON)
+@admin_routes.route('/reference_cache_stats', methods=['GET'])
+@admin_login_required
+def reference_cache_stats():
+    return reference_cache.stats()
 
 
 # Add Teacher Route
@@ -72,7 +95,7 @@ def add_teacher():
         hire_date = request.form['hire-date']
 
         # Hash the password
-        password_hash = generate_password_hash(password)
+        password_hash = hash_password(password)
 
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -111,6 +134,7 @@ def add_teacher():
             """, (user_id, hire_date))
             conn.commit()
 
+            invalidate_dashboard_counts()
             flash("Teacher added successfully!", "success")
             return redirect(url_for(ADMIN_MANAGE_TEACHERS_ROUTE))
 
@@ -130,28 +154,19 @@ def add_teacher():
 @admin_routes.route('/manage-teachers')
 @admin_login_required
 def manage_teachers():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
     try:
-        # Fetch all teachers (RoleID = 2) with their hire dates
-        cursor.execute("""
-            SELECT u.UserID, u.FirstName, u.LastName, u.Email, t.HireDate 
-            FROM Users u
-            JOIN Teachers t ON u.UserID = t.UserID
-            WHERE u.RoleID = 2 order by t.userID;
-        """)
-        teachers = cursor.fetchall()
+        with db_cursor() as cursor:
+            # Teachers (RoleID = 2) with their hire dates, one keyset page at a time
+            page = paginate(cursor, GET_ALL_TEACHERS_QUERY, (), TEACHER_SORTS, 'id',
+                            estimate_table='teachers')
 
     except Exception as e:
         print(f"Error fetching teachers: {e}")
-        teachers = []
+        rollback_db()
+        page = None
 
-    finally:
-        cursor.close()
-        conn.close()
-
-    return render_template('admin/manage_teachers.html', teachers=teachers)
+    return render_template('admin/manage_teachers.html',
+                           teachers=page.items if page else [], page=page)
 
 
 #search teachers route
@@ -159,113 +174,102 @@ def manage_teachers():
 @admin_login_required
 def search_teachers():
     search_query = request.args.get('query', '').strip()  # Get the search query from the URL
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    if not search_query:
+        # If no search query, show the full (paged) list
+        return manage_teachers()
 
-    try:
-        if search_query:
-            # Add wildcards for partial matching
-            search_term = f"%{search_query}%"
-            cursor.execute(SEARCH_TEACHERS_QUERY, (search_term, search_term, search_term))
-            teachers = cursor.fetchall()
-        else:
-            # If no search query, return all teachers
-            cursor.execute("""
-                SELECT t.TeacherID, u.FirstName, u.LastName, u.Email, t.HireDate
-                FROM Teachers t
-                JOIN Users u ON t.UserID = u.UserID;
-            """)
-            teachers = cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
+    # Ranked trigram match, best first unless another column is picked
+    with db_cursor() as cursor:
+        page = paginate(cursor, SEARCH_TEACHERS_QUERY, search_params(search_query, SEARCH_TEACHERS_PARAMS),
+                        TEACHER_SEARCH_SORTS, 'relevance')
 
-    return render_template('admin/manage_teachers.html', teachers=teachers)
+    return render_template('admin/manage_teachers.html', teachers=page.items, page=page)
 
 
 
 @admin_routes.route('/search_students', methods=['GET'])
+@admin_login_required
 def search_students():
     search_query = request.args.get('query', '').strip()  # Get the search query from the URL
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    if not search_query:
+        # If no search query, show the full (paged) list
+        return manage_students()
 
-    try:
-        if search_query:
-            # Add wildcards for partial matching
-            search_term = f"%{search_query}%"
-            cursor.execute(SEARCH_STUDENTS_QUERY, (search_term, search_term, search_term, search_term))
-            students = cursor.fetchall()
-        else:
-            # If no search query, return all students
-            cursor.execute("""
-                SELECT s.StudentID, u.FirstName, u.LastName, u.Email, s.StudentNumber, s.RegistrationDate
-                FROM Students s
-                JOIN Users u ON s.UserID = u.UserID;
-            """)
-            students = cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
+    # Ranked trigram match, best first unless another column is picked
+    with db_cursor() as cursor:
+        page = paginate(cursor, SEARCH_STUDENTS_QUERY, search_params(search_query, SEARCH_STUDENTS_PARAMS),
+                        STUDENT_SEARCH_SORTS, 'relevance')
 
-    return render_template('admin/manage_students.html', students=students)
+    return render_template('admin/manage_students.html', students=page.items, page=page)
+
+# Typeahead Route (JSON)
+TYPEAHEAD_ROLE_IDS = {'students': 1, 'teachers': 2, 'parents': 3}
+
+@admin_routes.route('/search/typeahead', methods=['GET'])
+@admin_login_required
+def search_typeahead():
+    """Name/email suggestions for the search boxes: ?type=students&q=jo"""
+    role_id = TYPEAHEAD_ROLE_IDS.get(request.args.get('type', 'students'))
+    if role_id is None:
+        return jsonify({'error': 'Unknown type'}), 400
+
+    text = request.args.get('q', '').strip()
+    if len(text) < current_app.config['SEARCH_MIN_LENGTH']:
+        return jsonify({'query': text, 'results': []})
+
+    max_limit = current_app.config['SEARCH_TYPEAHEAD_LIMIT']
+    limit = max(1, min(request.args.get('limit', max_limit, type=int) or max_limit, max_limit))
+    with db_cursor() as cursor:
+        cursor.execute(TYPEAHEAD_USERS_QUERY,
+                       search_params(text, TYPEAHEAD_USERS_PARAMS, role_id=role_id, limit=limit))
+        rows = cursor.fetchall()
+
+    return jsonify({
+        'query': text,
+        'results': [
+            {'id': row[0], 'name': f"{row[1]} {row[2]}", 'email': row[3]}
+            for row in rows
+        ]
+    })
 
 # Search Parents Route
 @admin_routes.route('/search_parents', methods=['GET'])
+@admin_login_required
 def search_parents():
     search_query = request.args.get('query', '').strip()  # Get the search query from the URL
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    if not search_query:
+        # If no search query, show the full (paged) list
+        return manage_parents()
 
-    try:
-        if search_query:
-            # Add wildcards for partial matching
-            search_term = f"%{search_query}%"
-            cursor.execute(SEARCH_PARENTS_QUERY, (search_term, search_term, search_term))
-            parents = cursor.fetchall()
-        else:
-            # If no search query, return all parents
-            cursor.execute("""
-                SELECT p.ParentID, u.FirstName, u.LastName, u.Email, u.Phone, u.created_at
-                FROM Parents p
-                JOIN Users u ON p.UserID = u.UserID;
-            """)
-            parents = cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
+    # Ranked trigram match, best first unless another column is picked
+    with db_cursor() as cursor:
+        page = paginate(cursor, SEARCH_PARENTS_QUERY, search_params(search_query, SEARCH_PARENTS_PARAMS),
+                        PARENT_SEARCH_SORTS, 'relevance')
 
-    return render_template('admin/manage_parents.html', parents=parents)
+    return render_template('admin/manage_parents.html', parents=page.items, page=page)
 
 
 # Manage Parents Route
 @admin_routes.route('/manage_parents')
 @admin_login_required
 def manage_parents():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
     try:
-        # Fetch all parents using the updated query
-        cursor.execute(GET_ALL_PARENTS_QUERY)
-        parents = cursor.fetchall()
+        with db_cursor() as cursor:
+            page = paginate(cursor, GET_ALL_PARENTS_QUERY, (), PARENT_SORTS, 'id',
+                            estimate_table='parents')
     except Exception as e:
         print(f"Error fetching parents: {e}")
-        parents = []
-    finally:
-        cursor.close()
-        conn.close()
+        rollback_db()
+        page = None
 
-    return render_template('admin/manage_parents.html', parents=parents)
+    return render_template('admin/manage_parents.html',
+                           parents=page.items if page else [], page=page)
 
 
 # Manage Students Route
 @admin_routes.route('/manage_students', methods=['GET', 'POST'])
 @admin_login_required
 def manage_students():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
     if request.method == 'POST':
         # Extract form data
         first_name = request.form['first-name']
@@ -278,72 +282,165 @@ def manage_students():
         parent_email = request.form['parent-email']  # Optional: Link to parent
 
         # Hash the password
-        password_hash = generate_password_hash(password)
+        password_hash = hash_password(password)
 
         try:
-            # Insert the new user into the Users table
-            cursor.execute(INSERT_NEW_USER_QUERY, (
-                first_name,
-                last_name,
-                email,
-                phone,
-                password_hash,
-                1,  # RoleID = 1 for students
-                True,  # is_active
-                None,  # email_token
-                None,  # token_expiry
-            ))
-            conn.commit()
-
-            # Get the newly created user's ID
-            cursor.execute("SELECT UserID FROM Users WHERE Email = %s;", (email,))
-            user_id = cursor.fetchone()[0]
-
-            # Get the ParentID if parent_email is provided
-            parent_id = None
-            if parent_email:
-                cursor.execute(GET_PARENT_BY_EMAIL_QUERY, (parent_email,))
-                parent = cursor.fetchone()
-                if parent:
-                    parent_id = parent[0]
-
-            # Insert the new student into the Students table
-            cursor.execute(INSERT_NEW_STUDENT_QUERY, (
-                user_id,
-                parent_id,
-                student_number,
-                registration_date
-            ))
-            conn.commit()
-
+            with db_cursor() as cursor:
+                # Insert the new user into the Users table
+                cursor.execute(INSERT_NEW_USER_RETURNING_ID_QUERY, (
+                    first_name,
+                    last_name,
+                    email,
+                    phone,
+                    password_hash,
+                    1,  # RoleID = 1 for students
+                    True,  # is_active
+                    None,  # email_token
+                    None,  # token_expiry
+                ))
+                user_id = cursor.fetchone()[0]
+
+                # Get the ParentID if parent_email is provided
+                parent_id = None
+                if parent_email:
+                    cursor.execute(GET_PARENT_BY_EMAIL_QUERY, (parent_email,))
+                    parent = cursor.fetchone()
+                    if parent:
+                        parent_id = parent[0]
+
+                # Insert the new student into the Students table
+                cursor.execute(INSERT_NEW_STUDENT_QUERY, (
+                    user_id,
+                    parent_id,
+                    student_number,
+                    registration_date
+                ))
+
+            # User + student rows are committed together at the end of the request
+            after_commit(invalidate_dashboard_counts)
             flash("Student added successfully! add to class", "success")
             return redirect(url_for('admin.manage_students'))
 
         except Exception as e:
             print(f"Error adding student: {e}")
-            conn.rollback()
+            rollback_db()
             flash("An error occurred while adding the student.", "danger")
 
-        
-            
-            
+    # Fetch one page of students to display in the table
+    with db_cursor() as cursor:
+        page = paginate(cursor, GET_ALL_STUDENTS_QUERY, (), STUDENT_SORTS, 'id',
+                        estimate_table='students')
 
-    # Fetch all students to display in the table
-    try:
-        cursor.execute(GET_ALL_STUDENTS_QUERY)
-        students = cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
+    return render_template('admin/manage_students.html', students=page.items, page=page)
 
-    return render_template('admin/manage_students.html', students=students)
 
-
-# Generate Reports
-@admin_routes.route('/generate_reports')
+# Bulk Import Route (CSV / XLSX of students, teachers or parents)
+# The file is imported by a 'bulk_import' job; ?job=<id> shows its progress / result
+@admin_routes.route('/bulk_import', methods=['GET', 'POST'])
+@admin_login_required
+def bulk_import():
+    if request.method == 'POST':
+        kind = request.form.get('kind', 'students')
+        upload = request.files.get('file')
+        job_id = None
+        error = None
+        if not upload or not upload.filename:
+            error = "Choose a CSV or XLSX file to import."
+        else:
+            try:
+                payload = save_upload(kind, upload)
+                with db_cursor() as cursor:
+                    job_id = jobs.enqueue(cursor, 'bulk_import', payload, created_by=session['admin_id'])
+            except ImportFileError as e:
+                error = str(e)
+            except Exception as e:
+                print(f"Error queueing {kind} import: {e}")
+                rollback_db()
+                error = "An error occurred while queueing the import."
+
+        if request.args.get('format') == 'json':
+            if error:
+                return jsonify({'error': error}), 400
+            return jsonify({'job_id': job_id, 'status_url': url_for('jobs.job_status', job_id=job_id)}), 202
+
+        if error:
+            flash(error, "danger")
+            return redirect(url_for('admin.bulk_import'))
+        flash(f"Import of {kind} queued; the results appear here when it finishes.", "info")
+        return redirect(url_for('admin.bulk_import', job=job_id))
+
+    job = None
+    report = None
+    job_id = request.args.get('job', type=int)
+    if job_id:
+        with db_cursor() as cursor:
+            job = jobs.get_job(cursor, job_id)
+        if job is None or job['kind'] != 'bulk_import':
+            flash("Import not found.", "warning")
+            job = None
+        elif job['status'] == 'done':
+            report = job['result']
+            if report['imported']:
+                invalidate_dashboard_counts()
+    return render_template('admin/bulk_import.html', report=report, job=job, kinds=IMPORT_KINDS)
+
+
+# Generate Reports (term report cards for a class or the whole school)
+@admin_routes.route('/generate_reports', methods=['GET', 'POST'])
 @admin_login_required
 def generate_reports():
-    return render_template('admin/generate_reports.html')
+    if request.method == 'POST':
+        form = request.form
+        try:
+            class_id = int(form['class_id']) if form.get('class_id') else None
+            term_start = datetime.strptime(form.get('term_start', ''), '%Y-%m-%d').date()
+            term_end = datetime.strptime(form.get('term_end', ''), '%Y-%m-%d').date()
+        except ValueError:
+            flash("Please choose a class and valid term dates.", "danger")
+            return redirect(url_for('admin.generate_reports'))
+        try:
+            with db_cursor() as cursor:
+                batch_id = report_cards.create_batch(
+                    cursor, form.get('term_label'), term_start, term_end, form.get('format', 'html'),
+                    class_id=class_id, created_by=session['admin_id'])
+                # The job worker picks it up once this request commits
+                jobs.enqueue(cursor, 'report_batch', {'batch_id': batch_id}, created_by=session['admin_id'])
+        except report_cards.ReportError as e:
+            rollback_db()
+            flash(str(e), "danger")
+            return redirect(url_for('admin.generate_reports'))
+        except Exception as e:
+            print(f"Error creating report batch: {e}")
+            rollback_db()
+            flash("An error occurred while queueing the report cards.", "danger")
+            return redirect(url_for('admin.generate_reports'))
+
+        flash("Report card generation queued.", "success")
+        return redirect(url_for('admin.generate_reports', batch=batch_id))
+
+    try:
+        with db_cursor() as cursor:
+            cursor.execute(GET_REPORT_CLASSES_QUERY)
+            classes = cursor.fetchall()
+            cursor.execute(GET_RECENT_REPORT_BATCHES_QUERY, (20,))
+            batches = cursor.fetchall()
+    except Exception as e:
+        print(f"Error loading report batches: {e}")
+        flash("An error occurred while loading report batches.", "danger")
+        classes, batches = [], []
+    return render_template('admin/generate_reports.html', classes=classes, batches=batches,
+                           active_batch=request.args.get('batch', type=int))
+
+
+# Progress of a report batch (polled by the generate reports page)
+@admin_routes.route('/report_batches/<int:batch_id>')
+@admin_login_required
+def report_batch_status(batch_id):
+    with db_cursor() as cursor:
+        batch = report_cards.get_batch(cursor, batch_id)
+    if batch is None:
+        return jsonify({'error': 'Report batch not found'}), 404
+    return jsonify(report_cards.batch_progress(batch))
 
 #Route to Fetch teacher Details
 @admin_routes.route('/get_teacher/<int:teacher_id>', methods=['GET'])
@@ -437,6 +534,7 @@ def delete_teacher():
             # Delete the user from the Users table
             cursor.execute("DELETE FROM Users WHERE UserID = %s;", (teacher_id,))
             conn.commit()
+            invalidate_dashboard_counts()
             flash("Teacher deleted successfully!", "success")  # Set flash message
         except Exception as e:
             print(f"Error deleting teacher: {e}")
@@ -527,6 +625,7 @@ def delete_parent():
             # Delete the user from the Users table
             cursor.execute("DELETE FROM Users WHERE UserID = %s;", (parent_id,))
             conn.commit()
+            invalidate_dashboard_counts()
             flash("Parent deleted successfully!", "success")  # Set flash message
         except Exception as e:
             print(f"Error deleting parent: {e}")
@@ -631,6 +730,7 @@ def delete_student():
             # Delete the user from the Users table
             cursor.execute("DELETE FROM Users WHERE UserID = %s;", (student_id,))
             conn.commit()
+            invalidate_dashboard_counts()
             flash("Student deleted successfully!", "success")
         except Exception as e:
             print(f"Error deleting student: {e}")
@@ -661,7 +761,6 @@ from app.queries.rubric_queries import (
 )
 from app.queries.criteria_queries import (
     GET_ALL_CRITERIA_QUERY,
-    GET_COMPETENCIES_FOR_DROPDOWN_QUERY,
     INSERT_CRITERIA_QUERY,
     GET_CRITERIA_BY_ID_QUERY,
     UPDATE_CRITERIA_QUERY,
@@ -677,20 +776,17 @@ from app.queries.criteria_queries import (
 @admin_routes.route('/manage_competencies')
 @admin_login_required
 def manage_competencies():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
     try:
-        cursor.execute(GET_ALL_COMPETENCIES_QUERY)
-        competencies = cursor.fetchall()
+        with db_cursor() as cursor:
+            page = paginate(cursor, GET_ALL_COMPETENCIES_QUERY, (), COMPETENCY_SORTS, 'id',
+                            estimate_table='competencies')
     except Exception as e:
         print(f"Error fetching competencies: {e}")
-        competencies = []
-    finally:
-        cursor.close()
-        conn.close()
+        rollback_db()
+        page = None
 
-    return render_template('admin/manage_competencies.html', competencies=competencies)
+    return render_template('admin/manage_competencies.html',
+                           competencies=page.items if page else [], page=page)
 
 @admin_routes.route('/add_competency', methods=['POST'])
 @admin_login_required
@@ -705,6 +801,8 @@ def add_competency():
         try:
             cursor.execute(INSERT_COMPETENCY_QUERY, (competency_name, competency_description))
             conn.commit()
+            invalidate_dashboard_counts()
+            reference_cache.invalidate(conn, 'competencies')
             flash("Competency added successfully!", "success")
         except Exception as e:
             print(f"Error adding competency: {e}")
@@ -752,6 +850,7 @@ def edit_competency():
         try:
             cursor.execute(UPDATE_COMPETENCY_QUERY, (competency_name, competency_description, competency_id))
             conn.commit()
+            reference_cache.invalidate(conn, 'competencies')
             flash("Competency updated successfully!", "success")
         except Exception as e:
             print(f"Error updating competency: {e}")
@@ -775,6 +874,8 @@ def delete_competency():
         try:
             cursor.execute(DELETE_COMPETENCY_QUERY, (competency_id,))
             conn.commit()
+            invalidate_dashboard_counts()
+            reference_cache.invalidate(conn, 'competencies', 'criteria')  # criteria cascade
             flash("Competency deleted successfully!", "success")
         except Exception as e:
             print(f"Error deleting competency: {e}")
@@ -801,8 +902,7 @@ def manage_criteria():
         cursor.execute(GET_ALL_CRITERIA_QUERY)
         criteria = cursor.fetchall()
 
-        cursor.execute(GET_COMPETENCIES_FOR_DROPDOWN_QUERY)
-        competencies = cursor.fetchall()
+        competencies = reference_cache.competency_options(cursor)
     except Exception as e:
         print(f"Error fetching criteria: {e}")
         criteria = []
@@ -829,6 +929,7 @@ def add_criteria():
         try:
             cursor.execute(INSERT_CRITERIA_QUERY, (competency_id, criteria_name, criteria_description))
             conn.commit()
+            reference_cache.invalidate(conn, 'criteria')
             flash("Criteria added successfully!", "success")
         except Exception as e:
             print(f"Error adding criteria: {e}")
@@ -878,6 +979,7 @@ def edit_criteria():
         try:
             cursor.execute(UPDATE_CRITERIA_QUERY, (competency_id, criteria_name, criteria_description, criteria_id))
             conn.commit()
+            reference_cache.invalidate(conn, 'criteria')
             flash("Criteria updated successfully!", "success")
         except Exception as e:
             print(f"Error updating criteria: {e}")
@@ -907,6 +1009,7 @@ def delete_criteria():
             else:
                 cursor.execute(DELETE_CRITERIA_QUERY, (criteria_id,))
                 conn.commit()
+                reference_cache.invalidate(conn, 'criteria', 'rubric')
                 flash("Criteria deleted successfully!", "success")
         except Exception as e:
             print(f"Error deleting criteria: {e}")
@@ -926,51 +1029,33 @@ def delete_criteria():
 @admin_login_required
 def manage_classes():
     """Display all classes with their assigned teachers"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        # Get all classes with teacher names
-        cursor.execute("""
-            SELECT 
-                c.classid, 
-                c.classname, 
-                c.academicyear, 
-                c.createdat,
-                t.teacherid,
-                u.firstname, 
-                u.lastname
-            FROM classes c
-            JOIN teachers t ON c.teacherid = t.teacherid
-            JOIN users u ON t.userid = u.userid
-            ORDER BY c.classname
-        """)
-        classes = cursor.fetchall()
-        
-        # Get active teachers for dropdown
-        cursor.execute("""
-            SELECT t.teacherid, u.firstname, u.lastname
-            FROM teachers t
-            JOIN users u ON t.userid = u.userid
-            WHERE u.is_active = TRUE
-            ORDER BY u.lastname, u.firstname
-        """)
-        teachers = cursor.fetchall()
-        
-        
-        
+        with db_cursor() as cursor:
+            # One page of classes with teacher names
+            page = paginate(cursor, GET_ALL_CLASSES_QUERY, (), CLASS_SORTS, 'name',
+                            estimate_table='classes')
+
+            # Get active teachers for dropdown
+            cursor.execute("""
+                SELECT t.teacherid, u.firstname, u.lastname
+                FROM teachers t
+                JOIN users u ON t.userid = u.userid
+                WHERE u.is_active = TRUE
+                ORDER BY u.lastname, u.firstname
+            """)
+            teachers = cursor.fetchall()
+
     except Exception as e:
         print(f"Error fetching classes: {str(e)}")
+        rollback_db()
         flash("Error loading classes data", "danger")
-        classes = []
+        page = None
         teachers = []
-    finally:
-        cursor.close()
-        conn.close()
-    
+
     return render_template('admin/manage_classes.html', 
-                         classes=classes,
-                         teachers=teachers)
+                         classes=page.items if page else [],
+                         teachers=teachers,
+                         page=page)
 
 @admin_routes.route('/add_class', methods=['POST'])
 @admin_login_required
@@ -1341,6 +1426,7 @@ def add_performance_level():
             cursor.execute(INSERT_PERFORMANCE_LEVEL_QUERY, 
                          (level_name, level_description, score_value))
             conn.commit()
+            reference_cache.invalidate(conn, 'performance')
             flash("Performance level added successfully!", "success")
         except Exception as e:
             print(f"Error adding performance level: {e}")
@@ -1392,6 +1478,7 @@ def edit_performance_level():
             cursor.execute(UPDATE_PERFORMANCE_LEVEL_QUERY, 
                          (level_name, level_description, score_value, level_id))
             conn.commit()
+            reference_cache.invalidate(conn, 'performance')
             flash("Performance level updated successfully!", "success")
         except Exception as e:
             print(f"Error updating performance level: {e}")
@@ -1426,6 +1513,7 @@ def delete_performance_level():
             else:
                 cursor.execute(DELETE_PERFORMANCE_LEVEL_QUERY, (level_id,))
                 conn.commit()
+                reference_cache.invalidate(conn, 'performance', 'rubric')
                 flash("Performance level deleted successfully!", "success")
         except Exception as e:
             print(f"Error deleting performance level: {e}")
@@ -1,7 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_mail import Mail, Message
 from app.database import get_db_connection
+from app.services.passwords import hash_password, verify_and_upgrade, HashingBusyError
+from app.services.outbox import queue_email
 from app.queries.auth_queries import (
     GET_USER_BY_EMAIL_QUERY, GET_USER_BY_PHONE_QUERY, INSERT_NEW_USER_QUERY,
     VERIFY_EMAIL_QUERY, CHECK_TOKEN_EXPIRY_QUERY, UPDATE_PASSWORD_QUERY,
@@ -39,7 +39,6 @@ TEACHER_RESET_PASSWORD_ROUTE = 'auth.teacher_reset_password'
 ADMIN_ROLE_ID = 4  # RoleID for admins
 
 auth_routes = Blueprint('auth', __name__)
-mail = Mail()
 
 # Function to generate a random email verification token
 def generate_token(length=50):
@@ -57,7 +56,7 @@ def parent_signup():
         email = request.form['email']
         phone = request.form['phone']
         password = request.form['password']
-        password_hash = generate_password_hash(password)
+        password_hash = hash_password(password)
 
         # Define role_id for parent users
         role_id = 3  # RoleID=3 is for parents
@@ -88,16 +87,14 @@ def parent_signup():
 
             # Insert into Parents table
             cursor.execute("INSERT INTO Parents (UserID) VALUES (%s);", (user_id,))
-            conn.commit()
 
-            # Send verification email with clickable link
+            # Queue the verification email with clickable link (sent by the outbox worker)
             verification_link = url_for('auth.verify_email_token', token=token, _external=True)
-            msg = Message("Email Verification", sender=Config.MAIL_USERNAME, recipients=[email])
-            msg.html = f"""
+            queue_email(cursor, "Email Verification", email, html=f"""
             <p>Click the link below to verify your email:</p>
             <p><a href="{verification_link}">Verify Your Email</a></p>
-            """
-            mail.send(msg)
+            """)
+            conn.commit()
 
             flash("Your account has been created. Please check your email for verification.", "success")
             return redirect(url_for(VERIFY_EMAIL_ROUTE))
@@ -167,16 +164,14 @@ def resend_verification():
                     SET email_token = %s, token_expiry = %s 
                     WHERE Email = %s;
                 """, (new_token, new_token_expiry, email))
-                conn.commit()
 
-                # Send the new verification email with clickable link
+                # Queue the new verification email with clickable link
                 verification_link = url_for('auth.verify_email_token', token=new_token, _external=True)
-                msg = Message("Email Verification", sender=Config.MAIL_USERNAME, recipients=[email])
-                msg.html = f"""
+                queue_email(cursor, "Email Verification", email, html=f"""
                 <p>Click the link below to verify your email:</p>
                 <p><a href="{verification_link}">Verify Your Email</a></p>
-                """
-                mail.send(msg)
+                """)
+                conn.commit()
 
                 flash("A new verification link has been sent to your email.", "success")
                 return redirect(url_for(VERIFY_EMAIL_ROUTE))
@@ -231,7 +226,8 @@ def parent_login():
                     flash("Your account is not verified. Please verify your email to log in.", "danger")
                     return redirect(url_for('auth.resend_verification'))
 
-                if check_password_hash(user[4], password):  # index 4 is passwordhash
+                if verify_and_upgrade(cursor, user[0], user[4], password):  # index 4 is passwordhash
+                    conn.commit()  # keep an upgraded hash, if any
                     # Store user_id, parent_id, and role in session
                     session['user_id'] = user[0]  # From users table
                     session['parent_id'] = user[7]  # From parents table
@@ -244,6 +240,9 @@ def parent_login():
             else:
                 flash("No parent account found with the provided credentials.", "danger")
 
+        except HashingBusyError as e:
+            flash(str(e), "warning")
+            return render_template('auth/parent_login.html'), 503
         except Exception as e:
             print(f"Login error: {str(e)}")  # Simple error logging
             flash("An error occurred during login", "danger")
@@ -276,13 +275,12 @@ def parent_forgot_password():
 
                 # Update the user's reset token and expiry in the database
                 cursor.execute(UPDATE_RESET_TOKEN_QUERY, (reset_token, reset_token_expiry, email))
-                conn.commit()
 
-                # Send the reset password email
+                # Queue the reset password email
                 reset_link = url_for('auth.parent_reset_password', token=reset_token, _external=True)
-                msg = Message("Reset Your Password-", sender=Config.MAIL_USERNAME, recipients=[email])
-                msg.body = f"Click the link to reset your password: {reset_link}"
-                mail.send(msg)
+                queue_email(cursor, "Reset Your Password-", email,
+                            body=f"Click the link to reset your password: {reset_link}")
+                conn.commit()
 
                 flash("A password reset link has been sent to your email!.", "success")
                 return redirect(url_for(PARENT_LOGIN_ROUTE))
@@ -322,7 +320,7 @@ def parent_reset_password(token):
                     return redirect(url_for('auth.parent_reset_password', token=token))
 
                 # Hash the new password
-                password_hash = generate_password_hash(password)
+                password_hash = hash_password(password)
 
                 # Update the user's password in the database
                 cursor.execute(UPDATE_PASSWORD_QUERY, (password_hash, user[0]))
@@ -370,7 +368,8 @@ def admin_login():
                 
                 # Check if the account is active and the role is Admin (RoleID = 4)
                 if admin[6] == ADMIN_ROLE_ID and admin[7] == True:  
-                    if check_password_hash(admin[5], password):  # Check password
+                    if verify_and_upgrade(cursor, admin[0], admin[5], password):  # Check password
+                        conn.commit()  # keep an upgraded hash, if any
                         session['admin_id'] = admin[0]  # Store admin ID in session
                         flash("Login successful!!", "success")
                         return redirect(url_for(ADMIN_DASHBOARD_ROUTE))
@@ -381,6 +380,9 @@ def admin_login():
             else:
                 flash("No admin account found with this email address.", "danger")
 
+        except HashingBusyError as e:
+            flash(str(e), "warning")
+            return render_template('admin/admin_login.html'), 503
         finally:
             cursor.close()
             conn.close()
@@ -412,16 +414,14 @@ def admin_request_reset():
                     SET reset_token = %s, reset_expiry = %s 
                     WHERE Email = %s;
                 """, (reset_token, reset_token_expiry, email))
-                conn.commit()
 
-                # Send the reset password email with clickable link
+                # Queue the reset password email with clickable link
                 reset_link = url_for(ADMIN_RESET_PASSWORD_ROUTE, token=reset_token, _external=True)
-                msg = Message("Reset Your Password", sender=Config.MAIL_USERNAME, recipients=[email])
-                msg.html = f"""
+                queue_email(cursor, "Reset Your Password", email, html=f"""
                 <p>Click the link below to reset your password:</p>
                 <p><a href="{reset_link}">Reset Your Password</a></p>
-                """
-                mail.send(msg)
+                """)
+                conn.commit()
 
                 flash("A password reset link has been sent to your email.", "success")
                 return redirect(url_for(ADMIN_LOGIN_ROUTE))
@@ -465,7 +465,7 @@ def admin_reset_password(token):
                     return redirect(url_for(ADMIN_RESET_PASSWORD_ROUTE, token=token))
 
                 # Hash the new password
-                password_hash = generate_password_hash(password)
+                password_hash = hash_password(password)
 
                 # Update the admin's password in the database
                 cursor.execute(UPDATE_PASSWORD_QUERY, (password_hash, admin[0]))
@@ -541,7 +541,8 @@ def teacher_login():
                     flash("Your account is not verified. Please verify your email to log in.", "danger")
                     return redirect(url_for('auth.resend_verification'))
 
-                if check_password_hash(user[4], password):  # index 4 is passwordhash
+                if verify_and_upgrade(cursor, user[0], user[4], password):  # index 4 is passwordhash
+                    conn.commit()  # keep an upgraded hash, if any
                     # Store both user_id and teacher_id in session
                     session['user_id'] = user[0]  # From users table
                     session['teacher_id'] = user[7]  # From teachers table
@@ -554,6 +555,9 @@ def teacher_login():
             else:
                 flash("No teacher account found with the provided credentials.", "danger")
 
+        except HashingBusyError as e:
+            flash(str(e), "warning")
+            return render_template('auth/teacher_login.html'), 503
         except Exception as e:
             print(f"Login error: {str(e)}")  # Simple print instead of logger
             flash("An error occurred during login", "danger")
@@ -588,16 +592,14 @@ def teacher_forgot_password():
                     SET reset_token = %s, reset_expiry = %s 
                     WHERE Email = %s;
                 """, (reset_token, reset_token_expiry, email))
-                conn.commit()
 
-                # Send the reset password email with clickable link
+                # Queue the reset password email with clickable link
                 reset_link = url_for(TEACHER_RESET_PASSWORD_ROUTE, token=reset_token, _external=True)
-                msg = Message("Reset Your Password", sender=Config.MAIL_USERNAME, recipients=[email])
-                msg.html = f"""
+                queue_email(cursor, "Reset Your Password", email, html=f"""
                 <p>Click the link below to reset your password:</p>
                 <p><a href="{reset_link}">Reset Your Password</a></p>
-                """
-                mail.send(msg)
+                """)
+                conn.commit()
 
                 flash("A password reset link has been sent to your email.", "success")
                 return redirect(url_for(TEACHER_LOGIN_ROUTE))
@@ -641,7 +643,7 @@ def teacher_reset_password(token):
                     return redirect(url_for(TEACHER_RESET_PASSWORD_ROUTE, token=token))
 
                 # Hash the new password
-                password_hash = generate_password_hash(password)
+                password_hash = hash_password(password)
 
                 # Update the user's password in the database
                 cursor.execute(UPDATE_PASSWORD_QUERY, (password_hash, user[0]))
@@ -703,7 +705,8 @@ def student_login():
                     flash("Your account is not active. Please contact support.", "danger")
                     return redirect(url_for('auth.student_login'))
 
-                if check_password_hash(student[1], password):  # PasswordHash
+                if verify_and_upgrade(cursor, student[0], student[1], password):  # PasswordHash
+                    conn.commit()  # keep an upgraded hash, if any
                     # Get StudentID from Students table
                     cursor.execute("""
                         SELECT StudentID FROM Students 
@@ -726,6 +729,9 @@ def student_login():
             else:
                 flash("No account found with the provided email or student number.", "danger")
 
+        except HashingBusyError as e:
+            flash(str(e), "warning")
+            return render_template('auth/student_login.html'), 503
         finally:
             cursor.close()
             conn.close()
@@ -0,0 +1,19 @@
+from flask import Blueprint, jsonify, session
+from app.database import db_cursor
+from app.services import jobs
+
+job_routes = Blueprint('jobs', __name__)
+
+
+# Job status (JSON), polled by pages that queued background work.
+# Admins may see every job; anyone else only the jobs they queued.
+@job_routes.route('/<int:job_id>')
+def job_status(job_id):
+    user_id = session.get('admin_id') or session.get('user_id')
+    if user_id is None:
+        return jsonify({'error': 'Please log in'}), 401
+    with db_cursor() as cursor:
+        job = jobs.get_job(cursor, job_id)
+    if job is None or ('admin_id' not in session and job['created_by'] != user_id):
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(jobs.job_status(job))
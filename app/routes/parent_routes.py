@@ -1,5 +1,8 @@
-from flask import Blueprint, render_template, session,request, redirect, url_for, flash
+from flask import Blueprint, render_template, session,request, redirect, url_for, flash, jsonify
 from app.database import get_db_connection
+from app.queries.report_queries import GET_PARENT_REPORTS_QUERY, GET_PARENT_REPORT_FILE_QUERY
+from app.queries.analytics_queries import GET_PARENT_CHILD_QUERY
+from app.services import competency_analytics, report_cards
 
 parent_routes = Blueprint('parent', __name__)
 
@@ -67,6 +70,22 @@ def parents_dashboard():
 
 
 
+# Competency progress series of one child (JSON for the dashboard chart)
+@parent_routes.route('/child-progress/<int:student_id>/data')
+@parent_login_required
+def child_progress_data(student_id):
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(GET_PARENT_CHILD_QUERY, (student_id, session['parent_id']))
+        if cursor.fetchone() is None:
+            return jsonify({'error': 'Child not found'}), 404
+        series = competency_analytics.get_series(cursor, student_id, request.args.get('months', type=int))
+    finally:
+        conn.close()
+    return jsonify(series)
+
+
 #===============================================================
 #COMPETETENCY OVERVIEW RESULTS
 #================================================================
@@ -287,11 +306,39 @@ def parent_profile():
 def parent_feedback():
     return render_template('parent/parent_feedback.html')
 
-# Parent Reports
+# Parent Reports (their children's report cards)
 @parent_routes.route('/reports')
 @parent_login_required
 def parent_reports():
-    return render_template('parent/parent_reports.html')
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(GET_PARENT_REPORTS_QUERY, (session['parent_id'],))
+        reports = cursor.fetchall()
+    except Exception as e:
+        reports = []
+        flash(f"Error loading reports: {str(e)}", "danger")
+    finally:
+        conn.close()
+    return render_template('parent/parent_reports.html', reports=reports)
+
+
+@parent_routes.route('/reports/<int:report_id>/download')
+@parent_login_required
+def download_report(report_id):
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(GET_PARENT_REPORT_FILE_QUERY, (report_id, session['parent_id']))
+        report = cursor.fetchone()
+    finally:
+        conn.close()
+
+    response = report_cards.send_report(*report) if report else None
+    if response is None:
+        flash("Report not found", "danger")
+        return redirect(url_for('parent.parent_reports'))
+    return response
 
 # Parent Notifications
 @parent_routes.route('/notifications')
@@ -1,10 +1,19 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, session
+from flask import Blueprint, render_template, request, flash, redirect, url_for, session, current_app, jsonify
 from werkzeug.utils import secure_filename
 from app.queries import project_queries as pq
+from app.queries import assignment_queries as aq
+from app.queries.report_queries import GET_STUDENT_REPORTS_QUERY, GET_STUDENT_REPORT_FILE_QUERY
 import os
 from datetime import datetime  
 from functools import wraps
 from app.database import get_db_connection
+from app.pagination import paginate
+from app.services.uploads import receive_stream, received_file, check_content_length, MULTIPART_OVERHEAD
+from app.services import blob_store
+from app.services import competency_analytics, report_cards
+from app.services import student_dashboard as dashboards  # the view below is named student_dashboard
+from app.services.resumable_uploads import ResumableUpload, UploadError
+from werkzeug.exceptions import RequestEntityTooLarge
 
 # Define the student blueprint
 student_routes = Blueprint('student', __name__)
@@ -32,77 +41,23 @@ def student_dashboard():
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
-        student_id = session['student_id']
-
-        # 1. Get student full name
-        cursor.execute("""
-            SELECT u.firstname, u.lastname 
-            FROM students s
-            JOIN users u ON s.userid = u.userid
-            WHERE s.studentid = %s
-        """, (student_id,))
-        student = cursor.fetchone()
-        student_name = f"{student[0]} {student[1]}" if student else "Student"
-
-        # 2. Get total task count assigned to student
-        cursor.execute("""
-            SELECT COUNT(DISTINCT t.taskid)
-            FROM tasks t
-            JOIN taskassignments ta ON t.taskid = ta.taskid
-            LEFT JOIN projects p ON t.taskid = p.taskid AND 
-                (p.studentid = %s OR p.submitter_id = %s)
-            WHERE ta.studentid = %s 
-               OR ta.classid IN (SELECT classid FROM class_students WHERE studentid = %s)
-               OR ta.groupid IN (SELECT groupid FROM groupmembers WHERE studentid = %s)
-        """, (student_id, student_id, student_id, student_id, student_id))
-        task_count = cursor.fetchone()[0]
-
-        # 3. Get total number of projects submitted or participated in
-        cursor.execute("""
-            SELECT COUNT(*)
-            FROM projects
-            WHERE studentid = %s OR submitter_id = %s
-        """, (student_id, student_id))
-        project_count = cursor.fetchone()[0]
-
-        # 4. Get the latest 3 submitted projects (with task name, date submitted, and file type)
-        cursor.execute("""
-            SELECT t.title AS task_title, p.submission_time, p.file_type
-            FROM projects p
-            JOIN tasks t ON p.taskid = t.taskid
-            WHERE p.studentid = %s OR p.submitter_id = %s
-            ORDER BY p.submission_time DESC
-            LIMIT 3
-        """, (student_id, student_id))
-        latest_projects = cursor.fetchall()
-
-        # 5. Get competencies demonstrated
-        cursor.execute("""
-            SELECT COUNT(DISTINCT c.competencyid)
-            FROM task_competencies tc
-            JOIN projects p ON tc.taskid = p.taskid
-            JOIN competencies c ON tc.competencyid = c.competencyid
-            WHERE p.studentid = %s OR p.submitter_id = %s
-        """, (student_id, student_id))
-        competencies_count = cursor.fetchone()[0]
+        # Name, counts and latest projects in one query, cached per student
+        dashboard = dashboards.get_dashboard(cursor, session['student_id'])
 
     except Exception as e:
-        task_count = 0
-        project_count = 0
-        student_name = "Student"
-        latest_projects = []
-        competencies_count = 0
+        dashboard = {
+            'student_name': "Student",
+            'task_count': 0,
+            'project_count': 0,
+            'competencies_count': 0,
+            'latest_projects': [],
+        }
         flash(f"Error loading dashboard data: {str(e)}", "danger")
 
     finally:
         conn.close()
 
-    return render_template('student/student_dashboard.html',
-                           student_name=student_name,
-                           task_count=task_count,
-                           project_count=project_count,
-                           competencies_count=competencies_count,
-                           latest_projects=latest_projects)
+    return render_template('student/student_dashboard.html', **dashboard)
 
 
 # Student Profile Route
@@ -111,17 +66,59 @@ def student_dashboard():
 def student_profile():
     return render_template('student/student_profile.html')  # Updated path
 
-# Student Progress Charts Route
+# Student Progress Charts Route (series from app.services.competency_analytics)
 @student_routes.route('/progress-charts')
 @student_login_required
 def progress_charts():
-    return render_template('student/progress_charts.html')  # Updated path
+    months = competency_analytics.clamp_months(request.args.get('months', type=int))
+    return render_template('student/progress_charts.html', months=months)
+
+
+@student_routes.route('/progress-charts/data')
+@student_login_required
+def progress_chart_data():
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        series = competency_analytics.get_series(cursor, session['student_id'],
+                                                 request.args.get('months', type=int))
+    finally:
+        conn.close()
+    return jsonify(series)
 
-# Student Reports Route
+# Student Reports Route (generated report cards)
 @student_routes.route('/reports')
 @student_login_required
 def reports():
-    return render_template('student/reports.html')  # Updated path
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(GET_STUDENT_REPORTS_QUERY, (session['student_id'],))
+        student_reports = cursor.fetchall()
+    except Exception as e:
+        student_reports = []
+        flash(f"Error loading reports: {str(e)}", "danger")
+    finally:
+        conn.close()
+    return render_template('student/reports.html', reports=student_reports)
+
+
+@student_routes.route('/reports/<int:report_id>/download')
+@student_login_required
+def download_report(report_id):
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(GET_STUDENT_REPORT_FILE_QUERY, (report_id, session['student_id']))
+        report = cursor.fetchone()
+    finally:
+        conn.close()
+
+    response = report_cards.send_report(*report) if report else None
+    if response is None:
+        flash("Report not found", "danger")
+        return redirect(url_for('student.reports'))
+    return response
 
 # Student Notifications Route
 @student_routes.route('/notifications')
@@ -138,6 +135,14 @@ def settings():
 
 # implementation of student tasks view
 
+def _parse_date(value):
+    """A YYYY-MM-DD query argument as a date, or None if missing / invalid."""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+
 @student_routes.route('/tasks')
 @student_login_required
 def student_tasks():
@@ -146,65 +151,35 @@ def student_tasks():
         return redirect(url_for('auth.student_login'))
 
     student_id = session['student_id']
+    filters, params = [], [student_id]
+    due_from = _parse_date(request.args.get('due_from'))
+    due_to = _parse_date(request.args.get('due_to'))
+    if due_from:
+        filters.append(aq.STUDENT_TASKS_FILTER_DUE_FROM)
+        params.append(due_from)
+    if due_to:
+        filters.append(aq.STUDENT_TASKS_FILTER_DUE_TO)
+        params.append(due_to)
+
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        # Verify student exists
-        cursor.execute("SELECT * FROM students WHERE studentid = %s", (student_id,))
-        student = cursor.fetchone()
-        
-        if not student:
-            flash("Student record not found", "danger")
-            return redirect(url_for('student.student_dashboard'))
-
-        # Get class IDs
-        cursor.execute("SELECT classid FROM class_students WHERE studentid = %s", (student_id,))
-        class_ids = [row[0] for row in cursor.fetchall()]
-        
-        # Get group IDs
-        cursor.execute("SELECT groupid FROM groupmembers WHERE studentid = %s", (student_id,))
-        group_ids = [row[0] for row in cursor.fetchall()]
-        
-        # Fetch tasks with submission status
-        query = """
-            SELECT 
-                t.taskid, 
-                t.title, 
-                t.taskdescription as description, 
-                t.duedate,
-                u.firstname, 
-                u.lastname,
-                CASE
-                    WHEN p.projectid IS NOT NULL THEN 'Submitted'
-                    WHEN t.duedate < CURRENT_DATE THEN 'Overdue'
-                    ELSE 'Pending'
-                END AS task_status,
-                p.is_late as is_late
-            FROM tasks t
-            JOIN teachers te ON t.teacherid = te.teacherid
-            JOIN users u ON te.userid = u.userid
-            JOIN taskassignments ta ON t.taskid = ta.taskid
-            LEFT JOIN projects p ON t.taskid = p.taskid AND 
-                (p.studentid = %s OR p.submitter_id = %s OR 
-                 (ta.groupid IS NOT NULL AND p.groupid = ta.groupid))
-            WHERE 
-                ta.studentid = %s OR
-                (ta.classid IS NOT NULL AND ta.classid = ANY(%s::int[])) OR
-                (ta.groupid IS NOT NULL AND ta.groupid = ANY(%s::int[]))
-            GROUP BY t.taskid, u.firstname, u.lastname, p.projectid, p.is_late
-        """
-        cursor.execute(query, (student_id, student_id, student_id, class_ids, group_ids))
-        tasks = cursor.fetchall()
+        # One keyset page of the precomputed per-student status (migrations/009)
+        query = aq.GET_STUDENT_TASKS_QUERY.format(filters='\n      '.join(filters))
+        page = paginate(cursor, query, params, aq.STUDENT_TASK_SORTS, 'due')
+        tasks = page.items
         
     except Exception as e:
+        page = None
         tasks = []
         flash(f"Error loading tasks: {str(e)}", "danger")
     finally:
         cursor.close()
         conn.close()
     
-    return render_template('student/student_tasks.html', tasks=tasks)
+    return render_template('student/student_tasks.html', tasks=tasks, page=page,
+                           due_from=due_from, due_to=due_to)
 
 
 
@@ -212,152 +187,265 @@ def student_tasks():
 #STUDENT UPLOADING FUNCTIONALITY
 #==============================================
 
+def _receive_upload():
+    """Stream the submitted file to disk (no DB connection held meanwhile).
+    Returns an IncomingFile, or None when no file was sent."""
+    if request.mimetype == 'application/octet-stream':
+        # Raw body upload: file name in a header
+        filename = request.headers.get('X-File-Name', '')
+        if not filename:
+            return None
+        return receive_stream(request.stream, filename, request.content_length)
+
+    check_content_length(request.content_length, overhead=MULTIPART_OVERHEAD)
+    file = request.files.get('project_file')
+    if not file or file.filename == '':
+        return None
+    return received_file(file)
+
+
+def _submission_context(cursor, task_id, student_id):
+    """Task details, the student's group for a group task (or None) and
+    whether a submission already exists. ``task`` is None for unknown tasks."""
+    # Get task details
+    cursor.execute("""
+        SELECT 
+            t.taskid, 
+            t.title, 
+            t.taskdescription, 
+            t.duedate,
+            u.firstname, 
+            u.lastname 
+        FROM tasks t
+        JOIN teachers te ON t.teacherid = te.teacherid
+        JOIN users u ON te.userid = u.userid
+        WHERE t.taskid = %s
+    """, (task_id,))
+    task = cursor.fetchone()
+    if not task:
+        return None, None, False
+
+    # Group task: the student's own group among the task's assigned groups
+    cursor.execute(aq.GET_STUDENT_TASK_GROUP_QUERY, (student_id, task_id))
+    group = cursor.fetchone()
+
+    # Check submission status
+    if group:
+        cursor.execute("""
+            SELECT 1 FROM projects 
+            WHERE taskid = %s AND groupid = %s
+            LIMIT 1
+        """, (task_id, group[0]))
+    else:
+        cursor.execute("""
+            SELECT 1 FROM projects 
+            WHERE taskid = %s AND studentid = %s
+            LIMIT 1
+        """, (task_id, student_id))
+
+    return task, group, cursor.fetchone() is not None
+
+
+def _store_submission(conn, cursor, task_id, task, group, student_id, incoming):
+    """Store a received file in the blob store, write its row and commit.
+    Returns (project_id, is_late). ``incoming`` itself is left alone, so the
+    caller discards it afterwards (or can retry when this raises)."""
+    filename = secure_filename(incoming.filename)
+    file_ext = os.path.splitext(filename)[1].lower()
+    current_time = datetime.now()
+    is_late = current_time.date() > task[3]
+
+    # Linked + fsynced into the store before the row is written; identical
+    # files (a shared template, a re-submission) are stored once
+    filepath = blob_store.store_file(incoming)
+    file_type = file_ext[1:] if file_ext else 'unknown'
+
+    # PROPER DB STORAGE (size and hash were computed while streaming)
+    cursor.execute(pq.INSERT_PROJECT_SUBMISSION_QUERY, (
+        task_id,
+        None if group else student_id,
+        group[0] if group else None,
+        student_id,
+        filename,
+        blob_store.db_path(filepath),
+        is_late,
+        incoming.size,
+        file_type,
+        current_time,
+        incoming.sha256
+    ))
+    project_id = cursor.fetchone()[0]
+    conn.commit()
+    dashboards.invalidate(student_id)
+    return project_id, is_late
+
+
 @student_routes.route('/upload-project/<int:task_id>', methods=['GET', 'POST'])
 @student_login_required
 def upload_project(task_id):
+    max_upload_mb = current_app.config['UPLOAD_MAX_BYTES'] // (1024 * 1024)
+    incoming = None
+    if request.method == 'POST':
+        try:
+            incoming = _receive_upload()
+        except RequestEntityTooLarge:
+            flash(f"File is too large (max {max_upload_mb} MB)", "danger")
+            return redirect(request.url)
+        if incoming is None:
+            flash("No file selected", "danger")
+            return redirect(request.url)
+
+    # Only now that the file is on disk do we take a connection
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
-        
-        # Get task details
-        cursor.execute("""
-            SELECT 
-                t.taskid, 
-                t.title, 
-                t.taskdescription, 
-                t.duedate,
-                u.firstname, 
-                u.lastname 
-            FROM tasks t
-            JOIN teachers te ON t.teacherid = te.teacherid
-            JOIN users u ON te.userid = u.userid
-            WHERE t.taskid = %s
-        """, (task_id,))
-        task = cursor.fetchone()
+        task, group, already_submitted = _submission_context(cursor, task_id, session['student_id'])
 
         if not task:
             flash("Task not found", "danger")
             return redirect(url_for('student.student_tasks'))
 
-        # FIRST check if this is a group task by looking at taskassignments
-        cursor.execute("""
-            SELECT ta.groupid, sg.groupname
-            FROM taskassignments ta
-            LEFT JOIN studentgroups sg ON ta.groupid = sg.groupid
-            WHERE ta.taskid = %s AND ta.groupid IS NOT NULL
-            LIMIT 1
-        """, (task_id,))
-        group_assignment = cursor.fetchone()
-
-        # THEN check if student is in this group (if it's a group task)
-        group = None
-        if group_assignment:
-            cursor.execute("""
-                SELECT 1 FROM groupmembers 
-                WHERE groupid = %s AND studentid = %s
-            """, (group_assignment[0], session['student_id']))
-            if cursor.fetchone():
-                group = group_assignment
-
-        # Check submission status
-        if group:
-            cursor.execute("""
-                SELECT 1 FROM projects 
-                WHERE taskid = %s AND groupid = %s
-                LIMIT 1
-            """, (task_id, group[0]))
-        else:
-            cursor.execute("""
-                SELECT 1 FROM projects 
-                WHERE taskid = %s AND studentid = %s
-                LIMIT 1
-            """, (task_id, session['student_id']))
-
-        if cursor.fetchone():
+        if already_submitted:
             flash("Submission already exists for this task", "warning")
             return redirect(url_for('student.student_tasks'))
 
-        if request.method == 'POST':
-            if 'project_file' not in request.files:
-                flash("No file selected", "danger")
-                return redirect(request.url)
-                
-            file = request.files['project_file']
-            if file.filename == '':
-                flash("No file selected", "danger")
-                return redirect(request.url)
-
-            if file:
-                filename = secure_filename(file.filename)
-                file_ext = os.path.splitext(filename)[1].lower()
-                current_time = datetime.now()
-                is_late = current_time.date() > task[3]
-                
-                # PROPER FOLDER STRUCTURE
-                if group:
-                    base_dir = os.path.join("projects", "by_group", str(group[0]))
-                    save_name = f"task_{task_id}_{int(current_time.timestamp())}{file_ext}"
-                else:
-                    base_dir = os.path.join("projects", "by_student", str(session['student_id']))
-                    save_name = f"task_{task_id}{file_ext}"
-
-                os.makedirs(base_dir, exist_ok=True)
-                filepath = os.path.join(base_dir, save_name)
-                file.save(filepath)
-
-                # Normalize slashes for DB storage
-                db_filepath = filepath.replace(os.sep, '/')
-                
-                file_size = os.path.getsize(filepath)
-                file_type = file_ext[1:] if file_ext else 'unknown'
-
-                # PROPER DB STORAGE
-                cursor.execute("""
-                    INSERT INTO projects (
-                        taskid, 
-                        studentid, 
-                        groupid, 
-                        submitter_id, 
-                        file_name, 
-                        projectfilepath, 
-                        is_late,
-                        file_size,
-                        file_type,
-                        submission_time
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    task_id,
-                    None if group else session['student_id'],
-                    group[0] if group else None,
-                    session['student_id'],
-                    filename,
-                    db_filepath,  # ✅ fixed slashes
-                    is_late,
-                    file_size,
-                    file_type,
-                    current_time
-                ))
-                conn.commit()
-
-                flash_message = "File uploaded successfully!"
-                if is_late:
-                    flash_message += " (Late submission)"
-                if group:
-                    flash_message += f" (Group: {group[1]})"
-                flash(flash_message, "success")
-                return redirect(url_for('student.student_tasks'))
+        if incoming is not None:
+            _, is_late = _store_submission(conn, cursor, task_id, task, group,
+                                           session['student_id'], incoming)
+
+            flash_message = "File uploaded successfully!"
+            if is_late:
+                flash_message += " (Late submission)"
+            if group:
+                flash_message += f" (Group: {group[1]})"
+            flash(flash_message, "success")
+            return redirect(url_for('student.student_tasks'))
 
         return render_template('student/student_upload_project.html', 
                             task=task, 
                             group=group,
-                            current_datetime=datetime.now())
+                            current_datetime=datetime.now(),
+                            max_upload_mb=max_upload_mb,
+                            resumable_chunk_bytes=current_app.config['RESUMABLE_CHUNK_BYTES'])
 
     except Exception as e:
         conn.rollback()
         flash(f"Upload failed: {str(e)}", "danger")
         return redirect(url_for('student.student_tasks'))
+    finally:
+        if incoming is not None:
+            incoming.discard()  # the stored blob is a separate link
+        conn.close()
+
+
+#===============================================
+# RESUMABLE UPLOADS (app/services/resumable_uploads.py)
+#===============================================
+
+def _upload_error(e):
+    body = {'error': str(e)}
+    if e.offset is not None:
+        body['offset'] = e.offset
+    return jsonify(body), e.status
+
+
+def _upload_status(upload):
+    return {
+        'upload_id': upload.upload_id,
+        'offset': upload.offset,
+        'size': upload.size,
+        'chunk_size': current_app.config['RESUMABLE_CHUNK_BYTES'],
+        'upload_url': url_for('student.resumable_upload_chunk', upload_id=upload.upload_id),
+        'finalize_url': url_for('student.resumable_upload_finalize', upload_id=upload.upload_id),
+    }
+
+
+@student_routes.route('/upload-project/<int:task_id>/resumable', methods=['POST'])
+@student_login_required
+def resumable_upload_start(task_id):
+    data = request.get_json(silent=True) or {}
+    student_id = session['student_id']
+
+    # Refuse early (task exists, not yet submitted) so nobody uploads 200 MB for nothing
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        task, _, already_submitted = _submission_context(cursor, task_id, student_id)
     finally:
         conn.close()
+    if not task:
+        return jsonify({'error': "Task not found"}), 404
+    if already_submitted:
+        return jsonify({'error': "Submission already exists for this task"}), 409
+
+    try:
+        upload = ResumableUpload.create(student_id, task_id,
+                                        secure_filename(data.get('filename') or ''),
+                                        data.get('size'))
+    except UploadError as e:
+        return _upload_error(e)
+    return jsonify(_upload_status(upload)), 201
+
+
+@student_routes.route('/upload-project/resumable/<upload_id>', methods=['GET', 'PUT', 'DELETE'])
+@student_login_required
+def resumable_upload_chunk(upload_id):
+    try:
+        upload = ResumableUpload.load(upload_id, session['student_id'])
+        if request.method == 'PUT':
+            offset = request.args.get('offset', type=int)
+            if offset is None:
+                raise UploadError("offset is required")
+            upload.write_chunk(offset, request.stream, request.content_length)
+        elif request.method == 'DELETE':
+            upload.discard()
+            return '', 204
+    except UploadError as e:
+        return _upload_error(e)
+    return jsonify(_upload_status(upload))
+
+
+@student_routes.route('/upload-project/resumable/<upload_id>/finalize', methods=['POST'])
+@student_login_required
+def resumable_upload_finalize(upload_id):
+    student_id = session['student_id']
+    try:
+        upload = ResumableUpload.load(upload_id, student_id)
+        if not upload.complete:
+            raise UploadError("Upload is incomplete", status=409, offset=upload.offset)
+    except UploadError as e:
+        return _upload_error(e)
+
+    task_id = upload.state['task_id']
+    upload.compute_hash()  # before taking a connection
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        task, group, already_submitted = _submission_context(cursor, task_id, student_id)
+        if not task:
+            upload.discard()
+            return jsonify({'error': "Task not found"}), 404
+        if already_submitted:
+            upload.discard()
+            return jsonify({'error': "Submission already exists for this task"}), 409
+
+        project_id, is_late = _store_submission(conn, cursor, task_id, task, group, student_id, upload)
+    except Exception as e:
+        conn.rollback()
+        # The assembled file is still there: finalize can simply be retried
+        print(f"Finalizing upload {upload_id} failed: {e}")
+        return jsonify({'error': "Upload failed, please retry"}), 500
+    finally:
+        conn.close()
+
+    upload.discard()
+    return jsonify({
+        'project_id': project_id,
+        'is_late': is_late,
+        'group': group[1] if group else None,
+        'redirect': url_for('student.student_tasks'),
+    })
 
 
 #======================================================================================
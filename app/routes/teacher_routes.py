@@ -1,11 +1,22 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, Response
 from functools import wraps
+from psycopg2.extras import execute_values
 from datetime import datetime
 import os
-from app.database import get_db_connection
+from app.database import get_db_connection, db_cursor, rollback_db, after_commit
+from app.queries import teacher_queries as tq
+from app.queries import assignment_queries as aq
+from app.services import assessments, blob_store, competency_analytics, gradebook, reference_cache, student_dashboard
+from app.services.downloads import send_stored_file
+from werkzeug.exceptions import HTTPException
+from werkzeug.utils import secure_filename
 
 teacher_routes = Blueprint('teacher', __name__)
 
+# Page size for the submissions list (?per_page= is clamped to 1..max)
+SUBMISSIONS_PER_PAGE = 50
+SUBMISSIONS_MAX_PER_PAGE = 200
+
 def teacher_login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -130,6 +141,58 @@ def class_details(class_id):
         if cursor: cursor.close()
         if conn: conn.close()
 
+#===============================================
+# GRADEBOOK
+#===============================================
+
+@teacher_routes.route('/gradebook/<int:class_id>')
+@teacher_login_required
+def class_gradebook(class_id):
+    """Students x (task, competency) scores of a class: HTML, or streamed
+    with ?format=json / ?format=csv"""
+    output = request.args.get('format', 'html')
+    try:
+        with db_cursor() as cursor:
+            book = gradebook.get_gradebook(cursor, class_id, session['teacher_id'])
+    except Exception as e:
+        rollback_db()
+        if output in ('json', 'csv'):
+            return jsonify({'error': str(e)}), 500
+        flash(f'Error loading gradebook: {str(e)}', 'danger')
+        return redirect(url_for('teacher.view_classes'))
+
+    if book is None:
+        if output in ('json', 'csv'):
+            return jsonify({'error': 'Class not found'}), 404
+        flash('You do not have access to this class', 'danger')
+        return redirect(url_for('teacher.view_classes'))
+
+    if output == 'json':
+        return Response(gradebook.iter_json(book), mimetype='application/json')
+    if output == 'csv':
+        filename = secure_filename(f"gradebook_{book['class_name']}.csv") or 'gradebook.csv'
+        return Response(gradebook.iter_csv(book), mimetype='text/csv',
+                        headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+    return render_template('teacher/gradebook.html', book=book, class_id=class_id)
+
+
+@teacher_routes.route('/gradebook/<int:class_id>/cell')
+@teacher_login_required
+def gradebook_cell(class_id):
+    """Criteria ratings behind one student's scores for one task (JSON)"""
+    student_id = request.args.get('student_id', type=int)
+    task_id = request.args.get('task_id', type=int)
+    if not student_id or not task_id:
+        return jsonify({'error': 'student_id and task_id are required'}), 400
+    try:
+        with db_cursor() as cursor:
+            assessed = gradebook.cell(cursor, class_id, session['teacher_id'], student_id, task_id)
+    except Exception as e:
+        rollback_db()
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'student_id': student_id, 'task_id': task_id, 'competencies': assessed})
+
+
 @teacher_routes.route('/logout')
 @teacher_login_required
 def teacher_logout():
@@ -140,6 +203,24 @@ def teacher_logout():
     return redirect(url_for('auth.teacher_login'))
 
 
+def _assignment_targets(form, students, classes, groups):
+    """(student_id, class_id, group_id) tuples for the selected targets,
+    ignoring ids that are not among the teacher's options."""
+    allowed = [
+        (form.getlist('student_id'), {str(row[0]) for row in students}),
+        (form.getlist('class_id'), {str(row[0]) for row in classes}),
+        (form.getlist('group_id'), {str(row[0]) for row in groups}),
+    ]
+    targets = []
+    for position, (selected, options) in enumerate(allowed):
+        for value in dict.fromkeys(selected):
+            if value in options:
+                target = [None, None, None]
+                target[position] = int(value)
+                targets.append(tuple(target))
+    return targets
+
+
 @teacher_routes.route('/create_task', methods=['GET', 'POST'])
 @teacher_login_required
 def create_task():
@@ -147,157 +228,117 @@ def create_task():
         flash('Please log in to access this page', 'warning')
         return redirect(url_for('auth.teacher_login'))
 
-    conn = None
-    cursor = None
-    
+    competencies, classes, groups, students = [], [], [], []
+
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get dropdown options filtered by this teacher
-        cursor.execute("SELECT competencyid, competencyname FROM competencies")
-        competencies = cursor.fetchall()
+        with db_cursor() as cursor:
+            # Get dropdown options filtered by this teacher
+            competencies = reference_cache.competency_options(cursor)
         
-        cursor.execute("SELECT classid, classname FROM classes WHERE teacherid = %s", 
-                      (session['teacher_id'],))
-        classes = cursor.fetchall()
+            cursor.execute("SELECT classid, classname FROM classes WHERE teacherid = %s", 
+                          (session['teacher_id'],))
+            classes = cursor.fetchall()
         
-        cursor.execute("""
-            SELECT sg.groupid, sg.groupname 
-            FROM studentgroups sg
-            JOIN groupmembers gm ON sg.groupid = gm.groupid
-            JOIN class_students cs ON gm.studentid = cs.studentid
-            JOIN classes c ON cs.classid = c.classid
-            WHERE c.teacherid = %s
-            GROUP BY sg.groupid
-        """, (session['teacher_id'],))
-        groups = cursor.fetchall()
+            cursor.execute("""
+                SELECT sg.groupid, sg.groupname 
+                FROM studentgroups sg
+                JOIN groupmembers gm ON sg.groupid = gm.groupid
+                JOIN class_students cs ON gm.studentid = cs.studentid
+                JOIN classes c ON cs.classid = c.classid
+                WHERE c.teacherid = %s
+                GROUP BY sg.groupid
+            """, (session['teacher_id'],))
+            groups = cursor.fetchall()
         
-        cursor.execute("""
-            SELECT s.studentid, u.firstname, u.lastname 
-            FROM students s
-            JOIN users u ON s.userid = u.userid
-            JOIN class_students cs ON s.studentid = cs.studentid
-            JOIN classes c ON cs.classid = c.classid
-            WHERE c.teacherid = %s
-        """, (session['teacher_id'],))
-        students = cursor.fetchall()
+            cursor.execute("""
+                SELECT s.studentid, u.firstname, u.lastname 
+                FROM students s
+                JOIN users u ON s.userid = u.userid
+                JOIN class_students cs ON s.studentid = cs.studentid
+                JOIN classes c ON cs.classid = c.classid
+                WHERE c.teacherid = %s
+            """, (session['teacher_id'],))
+            students = cursor.fetchall()
 
-        if request.method == 'POST':
-            # Get form data
-            title = request.form['title'].strip()
-            description = request.form['description'].strip()
-            due_date = request.form['due_date']
-            competency_id = request.form.get('competency_id', None)
+            if request.method == 'POST':
+                # Get form data
+                title = request.form['title'].strip()
+                description = request.form['description'].strip()
+                due_date = request.form['due_date']
+                competency_id = request.form.get('competency_id', None)
             
-            # Validate required fields
-            if not all([title, description, due_date]):
-                flash('All required fields must be filled', 'danger')
-                return render_template('teacher/create_task.html',
-                                    competencies=competencies,
-                                    classes=classes,
-                                    groups=groups,
-                                    students=students,
-                                    form_data=request.form)
-
-            # Validate due date is in the future
-            try:
-                from datetime import datetime
-                due_date_obj = datetime.strptime(due_date, '%Y-%m-%d').date()
-                today = datetime.now().date()
-                if due_date_obj <= today:
-                    flash('Due date must be in the future', 'danger')
+                # Validate required fields
+                if not all([title, description, due_date]):
+                    flash('All required fields must be filled', 'danger')
                     return render_template('teacher/create_task.html',
                                         competencies=competencies,
                                         classes=classes,
                                         groups=groups,
                                         students=students,
                                         form_data=request.form)
-            except ValueError:
-                flash('Invalid date format', 'danger')
-                return render_template('teacher/create_task.html',
-                                    competencies=competencies,
-                                    classes=classes,
-                                    groups=groups,
-                                    students=students,
-                                    form_data=request.form)
-
-            # Validate at least one assignment target
-            student_id = request.form.get('student_id', None)
-            class_id = request.form.get('class_id', None)
-            group_id = request.form.get('group_id', None)
-            
-            if not any([student_id, class_id, group_id]):
-                flash('Please select at least one assignment target', 'danger')
-                return render_template('teacher/create_task.html',
-                                    competencies=competencies,
-                                    classes=classes,
-                                    groups=groups,
-                                    students=students,
-                                    form_data=request.form)
-
-            # Create the task
-            cursor.execute("""
-                INSERT INTO tasks (teacherid, title, taskdescription, duedate, createdat)
-                VALUES (%s, %s, %s, %s, NOW())
-                RETURNING taskid
-            """, (session['teacher_id'], title, description, due_date))
-            task_id = cursor.fetchone()[0]
-            
-            # Link competency if selected
-            if competency_id:
-                cursor.execute("""
-                    INSERT INTO task_competencies (taskid, competencyid)
-                    VALUES (%s, %s)
-                """, (task_id, competency_id))
-            
-            # MODIFIED: Handle assignment based on selected option
-            if student_id:
-                # Individual student assignment
-                cursor.execute("""
-                    INSERT INTO taskassignments (taskid, studentid)
-                    VALUES (%s, %s)
-                """, (task_id, student_id))
-            elif class_id:
-                # Class assignment - record classid
-                cursor.execute("""
-                    INSERT INTO taskassignments (taskid, classid)
-                    VALUES (%s, %s)
-                """, (task_id, class_id))
-                
-                # Also assign to all students in class
-                cursor.execute("""
-                    INSERT INTO taskassignments (taskid, studentid)
-                    SELECT %s, studentid FROM class_students 
-                    WHERE classid = %s
-                """, (task_id, class_id))
-            elif group_id:
-                # Group assignment - record groupid
-                cursor.execute("""
-                    INSERT INTO taskassignments (taskid, groupid)
-                    VALUES (%s, %s)
-                """, (task_id, group_id))
-                
-                # Also assign to all students in group
+
+                # Validate due date is in the future
+                try:
+                    from datetime import datetime
+                    due_date_obj = datetime.strptime(due_date, '%Y-%m-%d').date()
+                    today = datetime.now().date()
+                    if due_date_obj <= today:
+                        flash('Due date must be in the future', 'danger')
+                        return render_template('teacher/create_task.html',
+                                            competencies=competencies,
+                                            classes=classes,
+                                            groups=groups,
+                                            students=students,
+                                            form_data=request.form)
+                except ValueError:
+                    flash('Invalid date format', 'danger')
+                    return render_template('teacher/create_task.html',
+                                        competencies=competencies,
+                                        classes=classes,
+                                        groups=groups,
+                                        students=students,
+                                        form_data=request.form)
+
+                # Assignment targets: any number of students, classes and groups,
+                # limited to the ones offered to this teacher above
+                targets = _assignment_targets(request.form, students, classes, groups)
+                if not targets:
+                    flash('Please select at least one assignment target', 'danger')
+                    return render_template('teacher/create_task.html',
+                                        competencies=competencies,
+                                        classes=classes,
+                                        groups=groups,
+                                        students=students,
+                                        form_data=request.form)
+
+                # Create the task
                 cursor.execute("""
-                    INSERT INTO taskassignments (taskid, studentid)
-                    SELECT %s, studentid FROM groupmembers 
-                    WHERE groupid = %s
-                """, (task_id, group_id))
+                    INSERT INTO tasks (teacherid, title, taskdescription, duedate, createdat)
+                    VALUES (%s, %s, %s, %s, NOW())
+                    RETURNING taskid
+                """, (session['teacher_id'], title, description, due_date))
+                task_id = cursor.fetchone()[0]
             
-            conn.commit()
-            flash('Task created successfully!', 'success')
-            return redirect(url_for('teacher.manage_tasks'))
+                # Link competency if selected
+                if competency_id:
+                    cursor.execute("""
+                        INSERT INTO task_competencies (taskid, competencyid)
+                        VALUES (%s, %s)
+                    """, (task_id, competency_id))
             
+                # One row per target; the student_tasks triggers resolve
+                # classes and groups to their members
+                execute_values(cursor, aq.INSERT_TASK_ASSIGNMENTS_QUERY,
+                               [(task_id,) + target for target in targets],
+                               page_size=len(targets))
+
+                # Committed once with the rest of the request (app.database)
+                flash('Task created successfully!', 'success')
+                return redirect(url_for('teacher.manage_tasks'))
+
     except Exception as e:
-        if conn:
-            conn.rollback()
+        rollback_db()
         flash(f'Error: {str(e)}', 'danger')
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
     
     # Show the form with dropdown options
     return render_template('teacher/create_task.html',
@@ -328,7 +369,7 @@ def manage_tasks():
                 t.taskdescription, 
                 t.duedate, 
                 t.createdat,
-                COUNT(DISTINCT ta.assignmentid) as assignment_count,
+                (SELECT COUNT(*) FROM student_tasks st WHERE st.task_id = t.taskid) as assignment_count,
                 COUNT(DISTINCT p.projectid) as submission_count,
                 CASE 
                     WHEN t.duedate < CURRENT_DATE THEN 'Overdue'
@@ -336,7 +377,6 @@ def manage_tasks():
                 END as status,
                 STRING_AGG(DISTINCT c.competencyname, ', ') as competencies
             FROM tasks t
-            LEFT JOIN taskassignments ta ON t.taskid = ta.taskid
             LEFT JOIN projects p ON t.taskid = p.taskid AND p.submission_time IS NOT NULL
             LEFT JOIN task_competencies tc ON t.taskid = tc.taskid
             LEFT JOIN competencies c ON tc.competencyid = c.competencyid
@@ -508,77 +548,69 @@ def view_group(group_id):
 @teacher_routes.route('/submissions')
 @teacher_login_required
 def view_submissions():
-    """View submissions with assessment status tracking"""
-    conn = get_db_connection()
+    """View submissions with assessment status tracking.
+
+    Keyset-paginated (newest first) with optional filters:
+    ?task_id=&class_id=&status=assessed|unassessed&late=late|ontime&after=<projectid>
+    """
+    teacher_id = session['teacher_id']
+    params = {
+        'teacher_id': teacher_id,
+        'per_page': max(1, min(request.args.get('per_page', SUBMISSIONS_PER_PAGE, type=int) or SUBMISSIONS_PER_PAGE,
+                               SUBMISSIONS_MAX_PER_PAGE)),
+        'task_id': request.args.get('task_id', type=int),
+        'class_id': request.args.get('class_id', type=int),
+        'assessed': {'assessed': True, 'unassessed': False}.get(request.args.get('status')),
+        'late': {'late': True, 'ontime': False}.get(request.args.get('late')),
+        'after': request.args.get('after', type=int),
+    }
+
+    filters = []
+    if params['task_id']:
+        filters.append(tq.SUBMISSIONS_FILTER_TASK)
+    if params['class_id']:
+        filters.append(tq.SUBMISSIONS_FILTER_CLASS)
+    if params['assessed'] is not None:
+        filters.append(tq.SUBMISSIONS_FILTER_ASSESSED)
+    if params['late'] is not None:
+        filters.append(tq.SUBMISSIONS_FILTER_LATE)
+    if params['after']:
+        filters.append(tq.SUBMISSIONS_FILTER_AFTER)
+    # One extra row tells us whether there is a next page
+    params['limit'] = params['per_page'] + 1
+
     try:
-        cursor = conn.cursor()
-        teacher_id = session['teacher_id']
-        
-        cursor.execute("""
-            SELECT 
-                p.projectid,
-                t.title as task_title,
-                p.submission_time,
-                CASE
-                    WHEN p.groupid IS NULL THEN u.firstname || ' ' || u.lastname
-                    ELSE (
-                        SELECT u2.firstname || ' ' || u2.lastname 
-                        FROM students s2
-                        JOIN users u2 ON s2.userid = u2.userid
-                        WHERE s2.studentid = p.submitter_id
-                    )
-                END as submitter_name,
-                p.is_late,
-                t.taskid,
-                CASE
-                    WHEN p.groupid IS NOT NULL THEN (
-                        SELECT c.classname 
-                        FROM class_students cs
-                        JOIN classes c ON cs.classid = c.classid
-                        WHERE cs.studentid IN (
-                            SELECT studentid FROM groupmembers WHERE groupid = p.groupid
-                        )
-                        LIMIT 1
-                    )
-                    ELSE (
-                        SELECT c.classname 
-                        FROM class_students cs
-                        JOIN classes c ON cs.classid = c.classid
-                        WHERE cs.studentid = p.submitter_id
-                    )
-                END as class_context,
-                p.groupid,
-                CASE 
-                    WHEN p.groupid IS NOT NULL THEN sg.groupname
-                    ELSE NULL
-                END as group_name,
-                p.is_assessed,
-                p.assessment_time,
-                p.file_name,
-                EXISTS (
-                    SELECT 1 FROM competency_assessments ca
-                    WHERE ca.task_id = t.taskid
-                    AND ca.student_id = p.submitter_id
-                ) as has_assessment
-            FROM projects p
-            JOIN tasks t ON p.taskid = t.taskid
-            LEFT JOIN students s ON p.submitter_id = s.studentid
-            LEFT JOIN users u ON s.userid = u.userid
-            LEFT JOIN studentgroups sg ON p.groupid = sg.groupid
-            WHERE t.teacherid = %s
-            AND p.submission_time IS NOT NULL
-            ORDER BY p.submission_time DESC
-        """, (teacher_id,))
-        
-        submissions = cursor.fetchall()
+        with db_cursor() as cursor:
+            cursor.execute(tq.GET_SUBMISSIONS_PAGE_QUERY.format(filters='\n          '.join(filters)), params)
+            submissions = cursor.fetchall()
+
+            cursor.execute(tq.GET_TEACHER_TASK_OPTIONS_QUERY, (teacher_id,))
+            task_options = cursor.fetchall()
+            cursor.execute(tq.GET_TEACHER_CLASS_OPTIONS_QUERY, (teacher_id,))
+            class_options = cursor.fetchall()
+
+        next_after = None
+        if len(submissions) > params['per_page']:
+            submissions = submissions[:params['per_page']]
+            next_after = submissions[-1][0]
+
+        # Filters carried over to the "next page" link
+        current_filters = {key: request.args[key]
+                           for key in ('task_id', 'class_id', 'status', 'late', 'per_page')
+                           if request.args.get(key)}
+
         return render_template('teacher/view_submissions.html',
-                           submissions=submissions)
-    
+                           submissions=submissions,
+                           task_options=task_options,
+                           class_options=class_options,
+                           current_filters=current_filters,
+                           next_after=next_after,
+                           is_first_page=not params['after'])
+
     except Exception as e:
+        rollback_db()
         flash(f"Error loading submissions: {str(e)}", "danger")
         return redirect(url_for('teacher.teachers_dashboard'))
-    finally:
-        conn.close()
 
 
 
@@ -587,253 +619,220 @@ def view_submissions():
 #ASSESSMENT 
 # ======================
 
-@teacher_routes.route('/assess/<int:project_id>', methods=['GET', 'POST'])
-@teacher_login_required
-def assess_submission(project_id):
-    """Complete assessment route with file download and session fixes"""
-    conn = None
-    cursor = None
-    try:
-        # Validate session outside transaction
-        if 'teacher_id' not in session:
-            flash("Please login to access this page", "danger")
-            return redirect(url_for('auth.teacher_login'))
-        
-        teacher_id = session['teacher_id']
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # First check if already assessed
+def _load_assessment(cursor, project_id, teacher_id):
+    """Everything needed to assess a submission of this teacher:
+    ((submission, students, criteria_list, performance_levels), None), or
+    (None, (message, category)) when it cannot be assessed."""
+    # First check if already assessed
+    cursor.execute("""
+        SELECT p.is_assessed FROM projects p
+        JOIN tasks t ON p.taskid = t.taskid
+        WHERE p.projectid = %s AND t.teacherid = %s
+    """, (project_id, teacher_id))
+    assessment_status = cursor.fetchone()
+
+    if assessment_status and assessment_status[0]:
+        return None, ("This submission has already been assessed", "info")
+
+    # Get submission details (as tuple)
+    cursor.execute("""
+        SELECT 
+            p.projectid, t.taskid, t.title, 
+            p.submission_time, p.is_late,
+            u.firstname || ' ' || u.lastname as submitter_name,
+            c.competencyid, c.competencyname,
+            p.groupid, sg.groupname,
+            p.submitter_id, p.projectfilepath,
+            p.file_name, p.is_assessed, p.content_sha256
+        FROM projects p
+        JOIN tasks t ON p.taskid = t.taskid
+        JOIN task_competencies tc ON t.taskid = tc.taskid
+        JOIN competencies c ON tc.competencyid = c.competencyid
+        JOIN students s ON p.submitter_id = s.studentid
+        JOIN users u ON s.userid = u.userid
+        LEFT JOIN studentgroups sg ON p.groupid = sg.groupid
+        WHERE p.projectid = %s AND t.teacherid = %s
+    """, (project_id, teacher_id))
+    submission = cursor.fetchone()
+
+    if not submission:
+        return None, ("Submission not found or you don't have permission", "danger")
+
+    # Get students to assess (as list of tuples)
+    students_to_assess = []
+    if submission[8]:  # Group project (groupid at index 8)
         cursor.execute("""
-            SELECT p.is_assessed FROM projects p
-            JOIN tasks t ON p.taskid = t.taskid
-            WHERE p.projectid = %s AND t.teacherid = %s
-        """, (project_id, teacher_id))
-        assessment_status = cursor.fetchone()
-        
-        if assessment_status and assessment_status[0]:
-            flash("This submission has already been assessed", "info")
-            return redirect(url_for('teacher.view_submissions'))
-
-        # Get submission details (as tuple)
+            SELECT s.studentid, u.firstname || ' ' || u.lastname as student_name
+            FROM groupmembers gm
+            JOIN students s ON gm.studentid = s.studentid
+            JOIN users u ON s.userid = u.userid
+            WHERE gm.groupid = %s
+            ORDER BY student_name
+        """, (submission[8],))
+        students_to_assess = cursor.fetchall()
+    else:  # Individual project
         cursor.execute("""
-            SELECT 
-                p.projectid, t.taskid, t.title, 
-                p.submission_time, p.is_late,
-                u.firstname || ' ' || u.lastname as submitter_name,
-                c.competencyid, c.competencyname,
-                p.groupid, sg.groupname,
-                p.submitter_id, p.projectfilepath,
-                p.file_name, p.is_assessed
-            FROM projects p
-            JOIN tasks t ON p.taskid = t.taskid
-            JOIN task_competencies tc ON t.taskid = tc.taskid
-            JOIN competencies c ON tc.competencyid = c.competencyid
-            JOIN students s ON p.submitter_id = s.studentid
+            SELECT s.studentid, u.firstname || ' ' || u.lastname as student_name
+            FROM students s
             JOIN users u ON s.userid = u.userid
-            LEFT JOIN studentgroups sg ON p.groupid = sg.groupid
-            WHERE p.projectid = %s AND t.teacherid = %s
-        """, (project_id, teacher_id))
-        submission = cursor.fetchone()
-
-        if not submission:
-            flash("Submission not found or you don't have permission", "danger")
-            return redirect(url_for('teacher.view_submissions'))
+            WHERE s.studentid = %s
+        """, (submission[10],))  # submitter_id at index 10
+        students_to_assess = cursor.fetchall()
 
-        # Get students to assess (as list of tuples)
-        students_to_assess = []
-        if submission[8]:  # Group project (groupid at index 8)
-            cursor.execute("""
-                SELECT s.studentid, u.firstname || ' ' || u.lastname as student_name
-                FROM groupmembers gm
-                JOIN students s ON gm.studentid = s.studentid
-                JOIN users u ON s.userid = u.userid
-                WHERE gm.groupid = %s
-                ORDER BY student_name
-            """, (submission[8],))
-            students_to_assess = cursor.fetchall()
-        else:  # Individual project
-            cursor.execute("""
-                SELECT s.studentid, u.firstname || ' ' || u.lastname as student_name
-                FROM students s
-                JOIN users u ON s.userid = u.userid
-                WHERE s.studentid = %s
-            """, (submission[10],))  # submitter_id at index 10
-            students_to_assess = cursor.fetchall()
+    if not students_to_assess:
+        return None, ("No students found for assessment", "warning")
 
-        if not students_to_assess:
-            flash("No students found for assessment", "warning")
-            return redirect(url_for('teacher.view_submissions'))
+    # Assessment criteria and performance levels come from the reference cache
+    criteria_list = reference_cache.criteria_for(cursor, submission[6])  # competencyid at index 6
 
-        # Get assessment criteria (as list of tuples)
-        cursor.execute("""
-            SELECT criteriaid, criterianame, criteriadescription
-            FROM criteria
-            WHERE competencyid = %s
-            ORDER BY criteriaid
-        """, (submission[6],))  # competencyid at index 6
-        criteria_list = cursor.fetchall()
-
-        if not criteria_list:
-            flash("No assessment criteria configured for this competency", "danger")
-            return redirect(url_for('teacher.view_submissions'))
+    if not criteria_list:
+        return None, ("No assessment criteria configured for this competency", "danger")
 
-        # Get ALL performance levels (as list of tuples)
-        cursor.execute("""
-            SELECT 
-                performancelevelid, 
-                levelname, 
-                scorevalue, 
-                leveldescription
-            FROM performance
-            ORDER BY scorevalue DESC
-        """)
-        performance_levels = cursor.fetchall()
-
-        if not performance_levels:
-            flash("No performance levels configured in the system", "danger")
-            return redirect(url_for('teacher.view_submissions'))
+    performance_levels = reference_cache.performance_levels(cursor)
 
-        # Handle form submission
-        if request.method == 'POST':
-            try:
-                # Commit any pending transaction before starting new one
-                if conn:
-                    conn.commit()
+    if not performance_levels:
+        return None, ("No performance levels configured in the system", "danger")
 
-                student_id = int(request.form.get('student_id', 0))
-                if not any(student[0] == student_id for student in students_to_assess):
-                    raise ValueError("Invalid student selected")
+    return (submission, students_to_assess, criteria_list, performance_levels), None
 
-                # Validate at least one criteria is selected
-                if not any(request.form.get(f'criteria_{criteria[0]}') for criteria in criteria_list):
-                    raise ValueError("Please select at least one performance level")
 
-                # Begin new transaction
-                conn.autocommit = False
+@teacher_routes.route('/assess/<int:project_id>', methods=['GET', 'POST'])
+@teacher_login_required
+def assess_submission(project_id):
+    """Complete assessment route with file download and session fixes"""
+    # Validate session before touching the database
+    if 'teacher_id' not in session:
+        flash("Please login to access this page", "danger")
+        return redirect(url_for('auth.teacher_login'))
 
-                # Create/update assessment
-                cursor.execute("""
-                    INSERT INTO competency_assessments (
-                        student_id, task_id, competency_id, 
-                        overall_score, feedback, assessed_at
-                    ) VALUES (%s, %s, %s, %s, %s, NOW())
-                    ON CONFLICT (student_id, task_id, competency_id) 
-                    DO UPDATE SET
-                        overall_score = EXCLUDED.overall_score,
-                        feedback = EXCLUDED.feedback,
-                        assessed_at = NOW()
-                    RETURNING assessment_id
-                """, (
-                    student_id,
-                    submission[1],  # taskid
-                    submission[6],  # competencyid
-                    None,  # Temporary null
-                    request.form.get('general_feedback', '').strip()
-                ))
-                assessment_id = cursor.fetchone()[0]
-
-                # Process criteria assessments
-                total_score = 0
-                criteria_count = 0
-                for criteria in criteria_list:
-                    level_id = request.form.get(f'criteria_{criteria[0]}')
-                    if level_id:
-                        # Verify performance level exists
-                        cursor.execute("""
-                            SELECT scorevalue 
-                            FROM performance 
-                            WHERE performancelevelid = %s
-                        """, (int(level_id),))
-                        result = cursor.fetchone()
-                        if not result:
-                            raise ValueError(f"Invalid performance level selected")
-                        
-                        score = result[0]
-                        total_score += score
-                        criteria_count += 1
+    teacher_id = session['teacher_id']
+    try:
+        with db_cursor() as cursor:
+            context, problem = _load_assessment(cursor, project_id, teacher_id)
+            if problem:
+                flash(*problem)
+                return redirect(url_for('teacher.view_submissions'))
+            submission, students_to_assess, criteria_list, performance_levels = context
+
+            # Handle form submission
+            if request.method == 'POST':
+                try:
+                    student_id = int(request.form.get('student_id', 0))
+                    student_ids = [student[0] for student in students_to_assess]
+                    criteria_ids = [criteria[0] for criteria in criteria_list]
+
+                    # Scores come from the levels loaded above: no per-criterion lookups,
+                    # and the overall score goes in with the assessment row itself
+                    score_by_level = {level[0]: level[2] for level in performance_levels}
+                    entries = assessments.rating_from_form(request.form, student_id, criteria_ids)
+                    assessments.score_entries(entries, student_ids, criteria_ids, score_by_level)
+                    assessments.save_assessments(cursor, project_id, submission[1], submission[6], entries)
+                    # Cached reads are dropped once the request has committed
+                    after_commit(student_dashboard.invalidate, student_id)
+                    after_commit(gradebook.invalidate_students, student_id)
+                    after_commit(competency_analytics.invalidate, student_id)
+
+                    # Committed once with the rest of the request (app.database)
+                    flash("Assessment saved successfully!", "success")
+                    return redirect(url_for('teacher.view_submissions'))
+
+                except ValueError as ve:
+                    rollback_db()
+                    flash(f"Validation error: {str(ve)}", "danger")
+                except Exception as e:
+                    rollback_db()
+                    flash(f"Assessment failed: {str(e)}", "danger")
+                return redirect(url_for('teacher.assess_submission', project_id=project_id))
+
+            # For template - use same performance levels for all criteria
+            performance_levels_dict = {criteria[0]: performance_levels for criteria in criteria_list}
+
+            # Prepare file download URL - modified to handle Windows paths
+            file_url = None
+            if submission[11]:  # projectfilepath at index 11, content_sha256 at 14
+                system_path = blob_store.project_file_path(submission[14], submission[11])
+            
+                # Verify file exists before creating download link
+                if os.path.exists(system_path):
+                    # Create download endpoint URL
+                    file_url = url_for('teacher.download_project', project_id=project_id)
+                else:
+                    flash("Submission file not found on server", "warning")
+
+            return render_template('teacher/assessment_form.html',
+                               submission=submission,  # Pass raw tuple
+                               students=students_to_assess,
+                               criteria_list=criteria_list,
+                               performance_levels=performance_levels_dict,
+                               file_url=file_url,
+                               filename=submission[12] if submission[12] else "submission")
 
-                        # Insert criteria rating
-                        cursor.execute("""
-                            INSERT INTO criteria_ratings (
-                                assessment_id, criteria_id, 
-                                performance_level_id, feedback
-                            ) VALUES (%s, %s, %s, %s)
-                            ON CONFLICT (assessment_id, criteria_id) 
-                            DO UPDATE SET
-                                performance_level_id = EXCLUDED.performance_level_id,
-                                feedback = EXCLUDED.feedback
-                        """, (
-                            assessment_id,
-                            criteria[0],
-                            level_id,
-                            request.form.get(f'feedback_{criteria[0]}', '').strip()
-                        ))
-
-                # Calculate and update overall score
-                if criteria_count > 0:
-                    overall_score = round(total_score / criteria_count, 2)
-                    cursor.execute("""
-                        UPDATE competency_assessments
-                        SET overall_score = %s
-                        WHERE assessment_id = %s
-                    """, (overall_score, assessment_id))
+    except Exception as e:
+        rollback_db()
+        flash(f"System error: {str(e)}", "danger")
+        return redirect(url_for('teacher.view_submissions'))
 
-                # Mark project as assessed
-                cursor.execute("""
-                    UPDATE projects 
-                    SET is_assessed = TRUE, assessment_time = NOW()
-                    WHERE projectid = %s
-                """, (project_id,))
+@teacher_routes.route('/assess/<int:project_id>/batch', methods=['POST'])
+@teacher_login_required
+def assess_group_batch(project_id):
+    """Assess every member of a group submission in one request.
+
+    Accepts the batch form on the assessment page or a JSON body (see
+    assessments.ratings_from_json); all ratings are written in one
+    transaction with one upsert per table."""
+    teacher_id = session['teacher_id']
+    wants_json = request.is_json
+
+    def fail(message, category="danger", status=400):
+        rollback_db()
+        if wants_json:
+            return jsonify({'error': message}), status
+        flash(message, category)
+        return redirect(url_for('teacher.assess_submission', project_id=project_id))
 
-                conn.commit()
-                flash("Assessment saved successfully!", "success")
+    try:
+        with db_cursor() as cursor:
+            context, problem = _load_assessment(cursor, project_id, teacher_id)
+            if problem:
+                if wants_json:
+                    return jsonify({'error': problem[0]}), 409 if problem[1] == 'info' else 404
+                flash(*problem)
                 return redirect(url_for('teacher.view_submissions'))
+            submission, students_to_assess, criteria_list, performance_levels = context
 
-            except ValueError as ve:
-                if conn:
-                    conn.rollback()
-                flash(f"Validation error: {str(ve)}", "danger")
-            except Exception as e:
-                if conn:
-                    conn.rollback()
-                flash(f"Assessment failed: {str(e)}", "danger")
-            return redirect(url_for('teacher.assess_submission', project_id=project_id))
-
-        # For template - use same performance levels for all criteria
-        performance_levels_dict = {criteria[0]: performance_levels for criteria in criteria_list}
-
-        # Prepare file download URL - modified to handle Windows paths
-        file_url = None
-        if submission[11]:  # projectfilepath at index 11
-            # Convert DB path (with forward slashes) to system path
-            system_path = os.path.normpath(submission[11])
-            
-            # Verify file exists before creating download link
-            if os.path.exists(system_path):
-                # Create download endpoint URL
-                file_url = url_for('teacher.download_project', project_id=project_id)
-            else:
-                flash("Submission file not found on server", "warning")
+            student_ids = [student[0] for student in students_to_assess]
+            criteria_ids = [criteria[0] for criteria in criteria_list]
+            score_by_level = {level[0]: level[2] for level in performance_levels}
 
-        return render_template('teacher/assessment_form.html',
-                           submission=submission,  # Pass raw tuple
-                           students=students_to_assess,
-                           criteria_list=criteria_list,
-                           performance_levels=performance_levels_dict,
-                           file_url=file_url,
-                           filename=submission[12] if submission[12] else "submission")
+            if wants_json:
+                entries = assessments.ratings_from_json(request.get_json(silent=True))
+            else:
+                entries = assessments.ratings_from_form(request.form, student_ids, criteria_ids)
+            assessments.score_entries(entries, student_ids, criteria_ids, score_by_level)
+            _, assessed = assessments.save_assessments(cursor, project_id, submission[1], submission[6], entries)
+            assessed_ids = [entry['student_id'] for entry in entries]
+            after_commit(student_dashboard.invalidate, *assessed_ids)
+            after_commit(gradebook.invalidate_students, *assessed_ids)
+            after_commit(competency_analytics.invalidate, *assessed_ids)
+
+        # Committed once with the rest of the request (app.database)
+        if wants_json:
+            return jsonify({
+                'project_id': project_id,
+                'assessed': {entry['student_id']: entry['overall_score'] for entry in entries},
+                'project_assessed': assessed,
+            })
+        message = f"Assessment saved for {len(entries)} of {len(student_ids)} students"
+        if not assessed:
+            message += "; the rest of the group can be assessed later"
+        flash(message, "success")
+        return redirect(url_for('teacher.view_submissions'))
 
+    except ValueError as ve:
+        return fail(f"Validation error: {str(ve)}")
     except Exception as e:
-        if conn:
-            conn.rollback()
-        flash(f"System error: {str(e)}", "danger")
-        return redirect(url_for('teacher.view_submissions'))
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+        print(f"Batch assessment of project {project_id} failed: {e}")
+        return fail(f"Assessment failed: {str(e)}", status=500)
 
 #================================
 #Download the file
@@ -842,37 +841,41 @@ def assess_submission(project_id):
 @teacher_routes.route('/download-project/<int:project_id>')
 @teacher_login_required
 def download_project(project_id):
-    """Endpoint for downloading project files with proper path handling"""
+    """Download a submission: ETag / 304, Range and optional X-Sendfile offload"""
+    conn = None
+    cursor = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
         # Get project file path
         cursor.execute("""
-            SELECT projectfilepath, file_name 
+            SELECT projectfilepath, file_name, content_sha256
             FROM projects 
             WHERE projectid = %s
         """, (project_id,))
         project = cursor.fetchone()
+        # Nothing below needs the database: hand the connection back first
+        cursor.close()
+        conn.close()
+        cursor = conn = None
         
         if not project or not project[0]:
             flash("File not found", "danger")
             return redirect(url_for('teacher.view_submissions'))
 
-        # Convert DB path (with forward slashes) to system path
-        system_path = os.path.normpath(project[0])
+        # The blob for its hash, or the stored path for files not ingested yet
+        system_path = blob_store.project_file_path(project[2], project[0])
         
         if not os.path.exists(system_path):
             flash("File not found on server", "danger")
             return redirect(url_for('teacher.view_submissions'))
 
         # Send file with original filename
-        return send_file(
-            system_path,
-            as_attachment=True,
-            download_name=project[1] if project[1] else "submission"
-        )
+        return send_stored_file(system_path, project[1] if project[1] else "submission", project[2])
 
+    except HTTPException:
+        raise  # 416 for an unsatisfiable Range
     except Exception as e:
         flash(f"Download failed: {str(e)}", "danger")
         return redirect(url_for('teacher.view_submissions'))
@@ -0,0 +1,21 @@
+# app/search.py
+"""Parameter building for the trigram admin search.
+
+The SQL lives in app/queries/admin_queries.py (SEARCH_*_QUERY and
+TYPEAHEAD_USERS_QUERY); each query lists the values it expects in a matching
+*_PARAMS tuple, and search_params() fills them in. Normalisation (lower case,
+accents stripped) happens in SQL through search_normalize(), the same function
+the indexes in migrations/003_user_search_trgm.sql are built on.
+"""
+
+
+def like_pattern(text):
+    """'%text%' with LIKE wildcards in the user's input escaped."""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def search_params(text, names, **extra):
+    """Positional parameters for a search query, in the order given by ``names``."""
+    values = {'term': text, 'pattern': like_pattern(text), **extra}
+    return tuple(values[name] for name in names)
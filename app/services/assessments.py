@@ -0,0 +1,130 @@
+# app/services/assessments.py
+"""Scoring and saving competency assessments.
+
+A request assesses one or more students of a submission against the criteria
+of the task's competency. Levels are scored from the performance levels the
+route already loaded, the overall score (mean of the selected levels) is
+computed here, and everything is written with one multi-row upsert into
+competency_assessments and one into criteria_ratings, in the request's
+transaction.
+"""
+from psycopg2.extras import execute_values  #type:ignore
+
+from app.queries.assessment_queries import (
+    UPSERT_ASSESSMENTS_QUERY, UPSERT_ASSESSMENTS_TEMPLATE,
+    UPSERT_CRITERIA_RATINGS_QUERY, MARK_PROJECT_ASSESSED_QUERY,
+)
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def ratings_from_json(body):
+    """Entries from a JSON batch body::
+
+        {"students": [{"student_id": 7, "feedback": "...",
+                       "ratings": [{"criteria_id": 3, "level_id": 2, "feedback": "..."}]}]}
+
+    Each entry is {'student_id', 'feedback', 'ratings': [(criteria_id, level_id, feedback)]};
+    students without any rating are left out.
+    """
+    entries = []
+    for item in (body or {}).get('students') or []:
+        ratings = [
+            (_int(r.get('criteria_id')), _int(r.get('level_id')), (r.get('feedback') or '').strip())
+            for r in item.get('ratings') or []
+        ]
+        entries.append({
+            'student_id': _int(item.get('student_id')),
+            'feedback': (item.get('feedback') or '').strip(),
+            'ratings': ratings,
+        })
+    return [entry for entry in entries if entry['ratings']]
+
+
+def ratings_from_form(form, student_ids, criteria_ids):
+    """Entries from the batch form: criteria_<student>_<criteria>,
+    feedback_<student>_<criteria> and general_feedback_<student>."""
+    entries = []
+    for student_id in student_ids:
+        ratings = []
+        for criteria_id in criteria_ids:
+            level_id = form.get(f'criteria_{student_id}_{criteria_id}')
+            if level_id:
+                ratings.append((criteria_id, _int(level_id),
+                                form.get(f'feedback_{student_id}_{criteria_id}', '').strip()))
+        if ratings:
+            entries.append({
+                'student_id': student_id,
+                'feedback': form.get(f'general_feedback_{student_id}', '').strip(),
+                'ratings': ratings,
+            })
+    return entries
+
+
+def rating_from_form(form, student_id, criteria_ids):
+    """The single-student form (criteria_<criteria>, feedback_<criteria>,
+    general_feedback) as a list of at most one entry."""
+    ratings = [
+        (criteria_id, _int(form.get(f'criteria_{criteria_id}')),
+         form.get(f'feedback_{criteria_id}', '').strip())
+        for criteria_id in criteria_ids
+        if form.get(f'criteria_{criteria_id}')
+    ]
+    if not ratings:
+        return []
+    return [{
+        'student_id': student_id,
+        'feedback': form.get('general_feedback', '').strip(),
+        'ratings': ratings,
+    }]
+
+
+def score_entries(entries, student_ids, criteria_ids, score_by_level):
+    """Validate the entries and add their 'overall_score'. Raises ValueError."""
+    if not entries:
+        raise ValueError("Please select at least one performance level")
+    allowed_students = set(student_ids)
+    allowed_criteria = set(criteria_ids)
+    seen = set()
+    for entry in entries:
+        if entry['student_id'] not in allowed_students:
+            raise ValueError("Invalid student selected")
+        if entry['student_id'] in seen:
+            raise ValueError("Each student can only be assessed once per request")
+        seen.add(entry['student_id'])
+
+        total = 0
+        rated = set()
+        for criteria_id, level_id, _ in entry['ratings']:
+            if criteria_id not in allowed_criteria or criteria_id in rated:
+                raise ValueError("Invalid criteria selected")
+            if level_id not in score_by_level:
+                raise ValueError("Invalid performance level selected")
+            rated.add(criteria_id)
+            total += score_by_level[level_id]
+        entry['overall_score'] = round(total / len(entry['ratings']), 2)
+    return entries
+
+
+def save_assessments(cursor, project_id, task_id, competency_id, entries):
+    """Upsert the scored entries and mark the project assessed once every
+    student on it has been (3 statements). Returns (assessment_ids, assessed)."""
+    rows = execute_values(cursor, UPSERT_ASSESSMENTS_QUERY, [
+        (entry['student_id'], task_id, competency_id, entry['overall_score'], entry['feedback'])
+        for entry in entries
+    ], template=UPSERT_ASSESSMENTS_TEMPLATE, page_size=len(entries), fetch=True)
+    assessment_ids = dict(rows)
+
+    ratings = [
+        (assessment_ids[entry['student_id']], criteria_id, level_id, feedback)
+        for entry in entries
+        for criteria_id, level_id, feedback in entry['ratings']
+    ]
+    execute_values(cursor, UPSERT_CRITERIA_RATINGS_QUERY, ratings, page_size=len(ratings))
+    cursor.execute(MARK_PROJECT_ASSESSED_QUERY, (project_id, competency_id, competency_id))
+    return assessment_ids, cursor.fetchone() is not None
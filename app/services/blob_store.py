@@ -0,0 +1,262 @@
+# app/services/blob_store.py
+"""Content-addressed, deduplicated storage for submitted files.
+
+Every file is stored once, named by its SHA-256, under
+UPLOAD_ROOT/blobs/<2 hex>/<2 hex>/<sha256>. projects.content_sha256 names
+the blob and projects.projectfilepath holds its path. How many projects rows
+use a blob is counted in the blobs table by triggers on projects (migration
+007), so the application never updates reference counts itself.
+
+Writes are ordered so a crash can only leave an unreferenced file, never a
+row without its file: the blob is linked into place and fsynced before the
+projects row is inserted. Unreferenced blobs and orphan files are removed by
+the ``gc`` command once they are older than BLOB_GC_GRACE_HOURS; a dedup hit
+touches the blob so a file that is being re-used is never collected.
+
+Command line (needs an app context, created from the environment):
+    python -m app.services.blob_store ingest [--dry-run]   # move the old tree in
+    python -m app.services.blob_store gc
+    python -m app.services.blob_store stats
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+from flask import current_app
+
+from app.queries.blob_queries import (GET_UNINGESTED_FILES_QUERY, SET_PROJECT_BLOB_QUERY,
+                                      DELETE_RELEASED_BLOBS_QUERY, BLOB_STATS_QUERY,
+                                      GET_KNOWN_BLOBS_QUERY)
+from app.services.uploads import fsync_dir
+
+
+def blob_root():
+    return os.path.join(current_app.config['UPLOAD_ROOT'], 'blobs')
+
+
+def blob_path(sha256):
+    return os.path.join(blob_root(), sha256[:2], sha256[2:4], sha256)
+
+
+def db_path(path):
+    """Path as stored in projects.projectfilepath (forward slashes)."""
+    return path.replace(os.sep, '/')
+
+
+def project_file_path(content_sha256, projectfilepath):
+    """Where a submission's file is on disk: its blob when the hash is known
+    and the blob exists, otherwise the stored path (files not ingested yet)."""
+    if content_sha256:
+        path = blob_path(content_sha256.strip())
+        if os.path.exists(path):
+            return path
+    return os.path.normpath(projectfilepath) if projectfilepath else None
+
+
+def _link_into_store(source, sha256):
+    """Make ``source`` the blob for ``sha256``. Returns (path, already_stored).
+    ``source`` itself is left in place; the caller removes it when done."""
+    path = blob_path(sha256)
+    shard = os.path.dirname(path)
+    os.makedirs(shard, exist_ok=True)
+    while True:
+        try:
+            os.link(source, path)
+        except FileExistsError:
+            # Same content is already stored: keep it young for gc and drop ours
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                continue  # gc removed it in between: link ours after all
+            return path, True
+        except OSError:
+            # No hard links on this filesystem: copy, then rename into place
+            fd, tmp = tempfile.mkstemp(dir=shard, prefix='.blob-')
+            with os.fdopen(fd, 'wb') as out, open(source, 'rb') as src:
+                shutil.copyfileobj(src, out, current_app.config['UPLOAD_CHUNK_BYTES'])
+                out.flush()
+                os.fsync(out.fileno())
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                os.replace(tmp, path)
+            else:
+                os.remove(tmp)
+                return path, True
+        break
+    fsync_dir(shard)
+    return path, False
+
+
+def store_file(incoming):
+    """Put a finished upload (IncomingFile / ResumableUpload) in the store and
+    return the blob path. The upload's own file is untouched, so the caller
+    can still discard() it afterwards, or retry if its transaction fails."""
+    incoming.finish()
+    path, _ = _link_into_store(incoming.path, incoming.sha256)
+    return path
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    size = 0
+    chunk_bytes = current_app.config['UPLOAD_CHUNK_BYTES']
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_bytes), b''):
+            digest.update(block)
+            size += len(block)
+    return digest.hexdigest(), size
+
+
+# ==========================================
+# Maintenance: ingest / gc / stats
+# ==========================================
+
+def ingest(conn, dry_run=False):
+    """Move every file still in the old layout into the store, repoint its
+    rows and delete the original. Commits per file; safe to re-run."""
+    from app.search import like_pattern
+
+    report = {'files': 0, 'rows': 0, 'bytes': 0, 'duplicates': 0, 'bytes_saved': 0, 'missing': []}
+    seen = set()
+    with conn.cursor() as cursor:
+        cursor.execute(GET_UNINGESTED_FILES_QUERY, (like_pattern(db_path(blob_root())) + '/%',))
+        files = cursor.fetchall()
+    conn.commit()
+
+    for stored_path, project_ids in files:
+        source = os.path.normpath(stored_path)
+        if not os.path.isfile(source):
+            report['missing'].append(stored_path)
+            continue
+        sha256, size = hash_file(source)
+        report['files'] += 1
+        report['rows'] += len(project_ids)
+        report['bytes'] += size
+
+        if dry_run:
+            duplicate = sha256 in seen or os.path.exists(blob_path(sha256))
+        else:
+            path, duplicate = _link_into_store(source, sha256)
+            with conn.cursor() as cursor:
+                cursor.execute(SET_PROJECT_BLOB_QUERY, (sha256, size, db_path(path), list(project_ids)))
+            conn.commit()
+            os.remove(source)
+        seen.add(sha256)
+        if duplicate:
+            report['duplicates'] += 1
+            report['bytes_saved'] += size
+    return report
+
+
+def collect_garbage(conn, grace_seconds=None):
+    """Delete blobs nobody has referenced for the grace period, then files in
+    the store that have no blobs row at all (left by failed transactions)."""
+    if grace_seconds is None:
+        grace_seconds = current_app.config['BLOB_GC_GRACE_HOURS'] * 3600
+    cutoff = time.time() - grace_seconds
+    removed = {'blobs': 0, 'orphans': 0, 'bytes': 0}
+
+    with conn.cursor() as cursor:
+        cursor.execute(DELETE_RELEASED_BLOBS_QUERY, (grace_seconds,))
+        released = cursor.fetchall()
+    conn.commit()
+    for sha256, size in released:
+        path = blob_path(sha256.strip())
+        try:
+            # Touched by an upload that is re-using it: its INSERT recreates the row
+            if os.path.getmtime(path) >= cutoff:
+                continue
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        removed['blobs'] += 1
+        removed['bytes'] += size
+
+    root = blob_root()
+    for dirpath, _, names in os.walk(root):
+        candidates = {}
+        for name in names:
+            path = os.path.join(dirpath, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    candidates[name] = path
+            except FileNotFoundError:
+                pass
+        if not candidates:
+            continue
+        with conn.cursor() as cursor:
+            cursor.execute(GET_KNOWN_BLOBS_QUERY, (list(candidates),))
+            known = {row[0].strip() for row in cursor.fetchall()}
+        conn.commit()
+        for name, path in candidates.items():
+            if name in known:
+                continue
+            try:
+                removed['bytes'] += os.path.getsize(path)
+                os.remove(path)
+                removed['orphans'] += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def blob_stats(cursor):
+    cursor.execute(BLOB_STATS_QUERY)
+    blobs, stored, referenced, unreferenced = cursor.fetchone()
+    return {
+        'blobs': blobs,
+        'stored_bytes': stored,
+        'referenced_bytes': referenced,
+        'bytes_saved': referenced - stored,
+        'unreferenced': unreferenced,
+    }
+
+
+def _mb(n):
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain the content-addressed project file store.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    ingest_parser = sub.add_parser('ingest', help='move files from the by_student/by_group tree into the store')
+    ingest_parser.add_argument('--dry-run', action='store_true', help='hash and report only, change nothing')
+    gc_parser = sub.add_parser('gc', help='delete unreferenced blobs and orphan files')
+    gc_parser.add_argument('--grace-hours', type=float, help='override BLOB_GC_GRACE_HOURS')
+    sub.add_parser('stats', help='show how much space deduplication saves')
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.database import get_db_connection
+
+    with create_app().app_context():
+        conn = get_db_connection()
+        try:
+            if args.command == 'ingest':
+                report = ingest(conn, dry_run=args.dry_run)
+                print(f"{'Would ingest' if args.dry_run else 'Ingested'} {report['files']} files "
+                      f"({report['rows']} submissions, {_mb(report['bytes'])})")
+                print(f"Duplicates: {report['duplicates']} files, {_mb(report['bytes_saved'])} saved")
+                for path in report['missing']:
+                    print(f"Missing on disk: {path}")
+            elif args.command == 'gc':
+                grace = args.grace_hours * 3600 if args.grace_hours is not None else None
+                removed = collect_garbage(conn, grace)
+                print(f"Removed {removed['blobs']} unreferenced blobs and {removed['orphans']} "
+                      f"orphan files ({_mb(removed['bytes'])})")
+            else:
+                with conn.cursor() as cursor:
+                    stats = blob_stats(cursor)
+                print(f"{stats['blobs']} blobs, {_mb(stats['stored_bytes'])} on disk for "
+                      f"{_mb(stats['referenced_bytes'])} of submissions "
+                      f"({_mb(stats['bytes_saved'])} saved, {stats['unreferenced']} unreferenced)")
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,366 @@
+# app/services/bulk_import.py
+"""Bulk CSV / XLSX import of students, parents and teachers.
+
+The upload is read row by row (csv module over the request stream, openpyxl in
+read-only mode for .xlsx) and handled in chunks of IMPORT_CHUNK_SIZE rows:
+
+1. validate every row (required fields, dates, duplicates inside the file),
+2. one query for emails/phones/student numbers already in the database and,
+   for students, one query linking parents by email,
+3. hash the passwords in the shared pool (app.services.passwords),
+4. one multi-row INSERT ... RETURNING into Users and one into the role table.
+
+Each chunk runs under a savepoint; if it still fails in the database the chunk
+is retried row by row so the error lands on the offending row only. Rows that
+fail are reported and skipped, everything else is committed together.
+
+The admin page does not import in the request: save_upload() keeps the file
+under UPLOAD_ROOT/imports/ and a 'bulk_import' job (app.services.jobs) runs
+import_users() on it; the job result is ImportReport.to_dict().
+"""
+import csv
+import io
+import os
+import re
+import uuid
+import zipfile
+from datetime import date, datetime
+
+from flask import current_app
+from psycopg2.extras import execute_values  #type:ignore
+from werkzeug.datastructures import FileStorage
+
+from app.queries.import_queries import (
+    FIND_EXISTING_USERS_QUERY, FIND_EXISTING_STUDENT_NUMBERS_QUERY, GET_PARENTS_BY_EMAILS_QUERY,
+    BULK_INSERT_USERS_QUERY, BULK_INSERT_USERS_TEMPLATE,
+    BULK_INSERT_STUDENTS_QUERY, BULK_INSERT_TEACHERS_QUERY, BULK_INSERT_PARENTS_QUERY,
+)
+from app.services import jobs
+from app.services.passwords import hash_passwords
+
+USER_COLUMNS = ('first_name', 'last_name', 'email', 'phone', 'password')
+
+# kind -> (RoleID, required columns, optional columns)
+IMPORT_KINDS = {
+    'students': (1, USER_COLUMNS + ('student_number', 'registration_date'), ('parent_email',)),
+    'teachers': (2, USER_COLUMNS + ('hire_date',), ()),
+    'parents': (3, USER_COLUMNS, ()),
+}
+
+DATE_COLUMNS = ('registration_date', 'hire_date')
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y')
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+MAX_LENGTHS = {'first_name': 50, 'last_name': 50, 'email': 100, 'phone': 20, 'student_number': 20}
+
+
+class ImportFileError(ValueError):
+    """The upload as a whole cannot be read (wrong type, missing columns...)."""
+
+
+class ImportReport:
+    """Outcome of one import: counts plus per-row errors and warnings."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.imported = 0
+        self.errors = []    # (row number, email, message)
+        self.warnings = []  # (row number, email, message)
+
+    @property
+    def failed(self):
+        return len({row for row, _email, _message in self.errors})
+
+    def error(self, row, message):
+        self.errors.append((row['_row'], row.get('email'), message))
+
+    def warning(self, row, message):
+        self.warnings.append((row['_row'], row.get('email'), message))
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': [{'row': r, 'email': e, 'message': m} for r, e, m in self.errors],
+            'warnings': [{'row': r, 'email': e, 'message': m} for r, e, m in self.warnings],
+        }
+
+
+# ==================================
+# Reading the upload
+# ==================================
+
+def _header_key(value):
+    return re.sub(r'[\s\-]+', '_', str(value or '').strip().lower())
+
+
+def _csv_rows(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    except UnicodeDecodeError:
+        raise ImportFileError("The CSV file must be saved as UTF-8.")
+    except csv.Error as e:
+        raise ImportFileError(f"The CSV file could not be read: {e}")
+
+
+def _xlsx_rows(stream):
+    try:
+        from openpyxl import load_workbook  #type:ignore
+    except ImportError:
+        raise ImportFileError("XLSX import needs the openpyxl package; upload a CSV instead.")
+    from openpyxl.utils.exceptions import InvalidFileException  #type:ignore
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException) as e:
+        raise ImportFileError(f"The XLSX file could not be read: {e}")
+    try:
+        for values in workbook.active.iter_rows(values_only=True):
+            yield ['' if value is None else value for value in values]
+    finally:
+        workbook.close()
+
+
+def _upload_type(filename):
+    name = (filename or '').lower()
+    for extension in ('.csv', '.xlsx'):
+        if name.endswith(extension):
+            return extension
+    raise ImportFileError("Upload a .csv or .xlsx file.")
+
+
+def iter_upload_rows(upload):
+    """Yield one dict per data row of an uploaded CSV/XLSX, keyed by the
+    normalised header ("First Name" -> first_name) plus '_row' (1-based line)."""
+    if _upload_type(upload.filename) == '.csv':
+        rows = _csv_rows(upload.stream)
+    else:
+        rows = _xlsx_rows(upload.stream)
+
+    header = None
+    for number, values in enumerate(rows, start=1):
+        if header is None:
+            header = [_header_key(value) for value in values]
+            continue
+        if not any(str(value).strip() for value in values):
+            continue
+        row = {key: value for key, value in zip(header, values) if key}
+        row['_row'] = number
+        yield row
+    if header is None:
+        raise ImportFileError("The file is empty.")
+
+
+# ==================================
+# Validation
+# ==================================
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def clean_row(kind, row):
+    """Normalised copy of ``row`` and a list of problems with it."""
+    _role_id, required, optional = IMPORT_KINDS[kind]
+    clean = {'_row': row['_row']}
+    problems = []
+    for column in required + optional:
+        value = row.get(column, '')
+        clean[column] = value if column in DATE_COLUMNS else str(value).strip()
+
+    for column in required:
+        if clean[column] in ('', None):
+            problems.append(f"{column} is required")
+    for column, limit in MAX_LENGTHS.items():
+        if len(clean.get(column) or '') > limit:
+            problems.append(f"{column} is longer than {limit} characters")
+    if clean['email'] and not EMAIL_PATTERN.match(clean['email']):
+        problems.append("email is not valid")
+    if clean.get('parent_email') and not EMAIL_PATTERN.match(clean['parent_email']):
+        problems.append("parent_email is not valid")
+    for column in DATE_COLUMNS:
+        if column in clean and clean[column] not in ('', None):
+            parsed = _parse_date(clean[column])
+            if parsed is None:
+                problems.append(f"{column} must be a date (YYYY-MM-DD)")
+            clean[column] = parsed
+    return clean, problems
+
+
+# ==================================
+# Loading
+# ==================================
+
+def _check_against_database(cursor, kind, rows, report):
+    """Drop rows whose email/phone/student number is taken; link parents."""
+    cursor.execute(FIND_EXISTING_USERS_QUERY,
+                   ([row['email'] for row in rows], [row['phone'] for row in rows]))
+    taken_emails, taken_phones = set(), set()
+    for email, phone in cursor.fetchall():
+        taken_emails.add(email)
+        taken_phones.add(phone)
+
+    taken_numbers = set()
+    parents = {}
+    if kind == 'students':
+        cursor.execute(FIND_EXISTING_STUDENT_NUMBERS_QUERY, ([row['student_number'] for row in rows],))
+        taken_numbers = {number for (number,) in cursor.fetchall()}
+        parent_emails = list({row['parent_email'] for row in rows if row['parent_email']})
+        if parent_emails:
+            cursor.execute(GET_PARENTS_BY_EMAILS_QUERY, (parent_emails,))
+            parents = dict(cursor.fetchall())
+
+    accepted = []
+    for row in rows:
+        problems = []
+        if row['email'] in taken_emails:
+            problems.append("a user with this email already exists")
+        if row['phone'] in taken_phones:
+            problems.append("a user with this phone number already exists")
+        if kind == 'students' and row['student_number'] in taken_numbers:
+            problems.append("student_number is already in use")
+        if problems:
+            report.error(row, '; '.join(problems))
+            continue
+        if kind == 'students':
+            row['parent_id'] = parents.get(row['parent_email'])
+            if row['parent_email'] and row['parent_id'] is None:
+                report.warning(row, f"no parent with email {row['parent_email']}; imported without a parent")
+        accepted.append(row)
+    return accepted
+
+
+def _insert_rows(cursor, kind, rows):
+    role_id = IMPORT_KINDS[kind][0]
+    users = execute_values(cursor, BULK_INSERT_USERS_QUERY, [
+        (row['first_name'], row['last_name'], row['email'], row['phone'], row['password_hash'], role_id)
+        for row in rows
+    ], template=BULK_INSERT_USERS_TEMPLATE, page_size=len(rows), fetch=True)
+    user_ids = {email: user_id for user_id, email in users}
+
+    if kind == 'students':
+        execute_values(cursor, BULK_INSERT_STUDENTS_QUERY, [
+            (user_ids[row['email']], row['parent_id'], row['student_number'], row['registration_date'])
+            for row in rows
+        ], page_size=len(rows))
+    elif kind == 'teachers':
+        execute_values(cursor, BULK_INSERT_TEACHERS_QUERY, [
+            (user_ids[row['email']], row['hire_date']) for row in rows
+        ], page_size=len(rows))
+    else:
+        execute_values(cursor, BULK_INSERT_PARENTS_QUERY, [
+            (user_ids[row['email']],) for row in rows
+        ], page_size=len(rows))
+
+
+def _load_chunk(cursor, kind, rows, report):
+    rows = _check_against_database(cursor, kind, rows, report)
+    if not rows:
+        return
+    for row, password_hash in zip(rows, hash_passwords([row['password'] for row in rows])):
+        row['password_hash'] = password_hash
+
+    cursor.execute("SAVEPOINT bulk_import_chunk")
+    try:
+        _insert_rows(cursor, kind, rows)
+        cursor.execute("RELEASE SAVEPOINT bulk_import_chunk")
+        report.imported += len(rows)
+        return
+    except Exception as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT bulk_import_chunk")
+        if len(rows) == 1:
+            report.error(rows[0], f"database error: {str(e).splitlines()[0]}")
+            return
+
+    # Find the bad row(s): one savepoint per row
+    for row in rows:
+        cursor.execute("SAVEPOINT bulk_import_row")
+        try:
+            _insert_rows(cursor, kind, [row])
+            cursor.execute("RELEASE SAVEPOINT bulk_import_row")
+            report.imported += 1
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT bulk_import_row")
+            report.error(row, f"database error: {str(e).splitlines()[0]}")
+
+
+def import_users(cursor, kind, upload):
+    """Import an uploaded CSV/XLSX of ``kind`` ('students', 'teachers' or
+    'parents') and return an ImportReport. Raises ImportFileError when the file
+    itself is unusable; row problems are reported, not raised."""
+    if kind not in IMPORT_KINDS:
+        raise ImportFileError(f"Unknown import type: {kind}")
+    _role_id, required, _optional = IMPORT_KINDS[kind]
+    chunk_size = current_app.config['IMPORT_CHUNK_SIZE']
+    report = ImportReport(kind)
+
+    seen = {'email': set(), 'phone': set(), 'student_number': set()}
+    chunk = []
+    checked_header = False
+    for raw in iter_upload_rows(upload):
+        if not checked_header:
+            missing = [column for column in required if column not in raw]
+            if missing:
+                raise ImportFileError(f"Missing column(s): {', '.join(missing)}")
+            checked_header = True
+
+        row, problems = clean_row(kind, raw)
+        for column, values in seen.items():
+            value = row.get(column)
+            if value and value in values:
+                problems.append(f"duplicate {column} in the file")
+        if problems:
+            report.error(row, '; '.join(problems))
+            continue
+        for column, values in seen.items():
+            if row.get(column):
+                values.add(row[column])
+
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            _load_chunk(cursor, kind, chunk, report)
+            chunk = []
+    if chunk:
+        _load_chunk(cursor, kind, chunk, report)
+    return report
+
+
+# ==================================
+# Background import
+# ==================================
+
+def save_upload(kind, upload):
+    """Keep an upload for the import job; returns its job payload."""
+    if kind not in IMPORT_KINDS:
+        raise ImportFileError(f"Unknown import type: {kind}")
+    extension = _upload_type(upload.filename)
+    directory = os.path.join(current_app.config['UPLOAD_ROOT'], 'imports')
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, uuid.uuid4().hex + extension)
+    upload.save(path)
+    return {'kind': kind, 'path': path, 'filename': upload.filename}
+
+
+@jobs.handler('bulk_import')
+def import_users_job(conn, payload, job_id):
+    try:
+        with open(payload['path'], 'rb') as stream, conn.cursor() as cursor:
+            report = import_users(cursor, payload['kind'], FileStorage(stream, filename=payload['filename']))
+    except FileNotFoundError:
+        raise jobs.JobFailed("The uploaded file is no longer available; please upload it again.")
+    except ImportFileError as e:
+        conn.rollback()
+        os.unlink(payload['path'])
+        raise jobs.JobFailed(str(e))
+    conn.commit()
+    os.unlink(payload['path'])
+    return report.to_dict()
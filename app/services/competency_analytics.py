@@ -0,0 +1,171 @@
+# app/services/competency_analytics.py
+"""Competency progress series for the student and parent progress charts.
+
+The numbers come from competency_monthly (migrations/012), a per student x
+competency x month rollup of competency_assessments (mean / min / max
+overall score, number of assessments, latest score) that triggers keep
+current as assessments are saved. get_series() reads one student's months
+with a single primary-key range scan, names the latest scores after the
+performance level they reach and caches the result in this worker process
+for COMPETENCY_PROGRESS_TTL seconds (at most COMPETENCY_PROGRESS_CACHE_SIZE
+entries, least recently used go first).
+
+Once an assessment has committed, invalidate() runs (app.database.after_commit);
+copies in other processes age out with the TTL. After bulk changes made
+behind the triggers' back (e.g. with triggers disabled), rebuild the rollup:
+
+    python -m app.services.competency_analytics rebuild
+"""
+import argparse
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from flask import current_app
+
+from app.queries.analytics_queries import (GET_COMPETENCY_SERIES_QUERY, LOCK_COMPETENCY_ASSESSMENTS_QUERY,
+                                           TRUNCATE_COMPETENCY_MONTHLY_QUERY, REBUILD_COMPETENCY_MONTHLY_QUERY)
+from app.services import reference_cache
+
+MAX_MONTHS = 60
+
+_lock = threading.Lock()
+_entries = OrderedDict()   # (student_id, months) -> (series, expires)
+
+
+def _number(value):
+    return float(value) if value is not None else None
+
+
+def month_range(months, today=None):
+    """The first days of the last ``months`` months, oldest first."""
+    today = today or date.today()
+    current = today.year * 12 + today.month - 1
+    return [date(index // 12, index % 12 + 1, 1) for index in range(current - months + 1, current + 1)]
+
+
+def clamp_months(months):
+    if not months:
+        return current_app.config['COMPETENCY_PROGRESS_MONTHS']
+    return max(1, min(MAX_MONTHS, months))
+
+
+def load(cursor, student_id, months):
+    """A student's chart series, bypassing the cache:
+
+    {'student_id', 'months': ['YYYY-MM', ...],
+     'competencies': [{'competency_id', 'competency', 'mean': [...], 'min': [...],
+                       'max': [...], 'assessments': [...], 'latest_score',
+                       'latest_level', 'latest_at'}, ...]}
+
+    mean / min / max / assessments line up with 'months' (None / 0 for a
+    month without assessments).
+    """
+    month_starts = month_range(months)
+    position = {month: index for index, month in enumerate(month_starts)}
+    cursor.execute(GET_COMPETENCY_SERIES_QUERY, (student_id, month_starts[0]))
+    rows = cursor.fetchall()
+    levels = reference_cache.performance_levels(cursor) if rows else ()
+
+    competencies = OrderedDict()
+    for (competency_id, name, month, mean_score, min_score, max_score,
+         assessments, latest_score, latest_at) in rows:
+        index = position.get(month)
+        if index is None:
+            continue  # an assessment dated in the future
+        series = competencies.get(competency_id)
+        if series is None:
+            series = competencies[competency_id] = {
+                'competency_id': competency_id,
+                'competency': name,
+                'mean': [None] * months,
+                'min': [None] * months,
+                'max': [None] * months,
+                'assessments': [0] * months,
+                'latest_score': None,
+                'latest_level': None,
+                'latest_at': None,
+            }
+        series['mean'][index] = _number(mean_score)
+        series['min'][index] = _number(min_score)
+        series['max'][index] = _number(max_score)
+        series['assessments'][index] = assessments
+        if latest_score is not None:
+            # rows come oldest month first: the last one wins
+            series['latest_score'] = _number(latest_score)
+            series['latest_level'] = reference_cache.level_name(levels, _number(latest_score))
+            series['latest_at'] = latest_at.isoformat()
+
+    return {
+        'student_id': student_id,
+        'months': [f"{month:%Y-%m}" for month in month_starts],
+        'competencies': list(competencies.values()),
+    }
+
+
+def get_series(cursor, student_id, months=None):
+    """Cached load() for the last ``months`` months (COMPETENCY_PROGRESS_MONTHS by default)."""
+    months = clamp_months(months)
+    key = (student_id, months)
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and now < entry[1]:
+            _entries.move_to_end(key)
+            return entry[0]
+
+    series = load(cursor, student_id, months)
+    config = current_app.config
+    with _lock:
+        _entries[key] = (series, now + config['COMPETENCY_PROGRESS_TTL'])
+        _entries.move_to_end(key)
+        while len(_entries) > config['COMPETENCY_PROGRESS_CACHE_SIZE']:
+            _entries.popitem(last=False)
+    return series
+
+
+def invalidate(*student_ids):
+    """Forget the cached series of these students."""
+    changed = set(student_ids)
+    with _lock:
+        for key in [key for key in _entries if key[0] in changed]:
+            del _entries[key]
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def rebuild(conn):
+    """Recompute competency_monthly from scratch; returns the row count."""
+    with conn.cursor() as cursor:
+        cursor.execute(LOCK_COMPETENCY_ASSESSMENTS_QUERY)
+        cursor.execute(TRUNCATE_COMPETENCY_MONTHLY_QUERY)
+        cursor.execute(REBUILD_COMPETENCY_MONTHLY_QUERY)
+        rows = cursor.rowcount
+    conn.commit()
+    clear()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain the monthly competency rollups.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('rebuild', help='recompute competency_monthly from competency_assessments')
+    parser.parse_args()
+
+    from app import create_app
+    from app.database import get_db_connection
+
+    with create_app().app_context():
+        conn = get_db_connection()
+        try:
+            print(f"Rebuilt competency_monthly: {rebuild(conn)} rows")
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# app/services/dashboard_stats.py
+"""Admin dashboard counters.
+
+All four counts come from one statement and are cached per worker process for
+DASHBOARD_STATS_TTL seconds. With DASHBOARD_COUNTERS=True (after
+migrations/004_entity_counters.sql) they are read from the trigger-maintained
+entity_counters table, so the cost no longer grows with the tables.
+"""
+import threading
+import time
+
+from flask import current_app
+
+from app.queries.admin_queries import DASHBOARD_COUNTS_QUERY, DASHBOARD_COUNTERS_QUERY
+
+COUNTER_NAMES = ('teachers', 'parents', 'students', 'competencies')
+
+_cache = {'counts': None, 'expires': 0.0}
+_lock = threading.Lock()
+
+
+def _load_counts(cursor):
+    if current_app.config['DASHBOARD_COUNTERS']:
+        cursor.execute(DASHBOARD_COUNTERS_QUERY, (list(COUNTER_NAMES),))
+        counts = dict(cursor.fetchall())
+        return {name: counts.get(name, 0) for name in COUNTER_NAMES}
+    cursor.execute(DASHBOARD_COUNTS_QUERY)
+    return dict(zip(COUNTER_NAMES, cursor.fetchone()))
+
+
+def get_dashboard_counts(cursor):
+    """{'teachers': n, 'parents': n, 'students': n, 'competencies': n}"""
+    now = time.monotonic()
+    with _lock:
+        if _cache['counts'] is not None and now < _cache['expires']:
+            return dict(_cache['counts'])
+
+    counts = _load_counts(cursor)
+    with _lock:
+        _cache['counts'] = counts
+        _cache['expires'] = now + current_app.config['DASHBOARD_STATS_TTL']
+    return dict(counts)
+
+
+def invalidate_dashboard_counts():
+    """Drop this process's cached counts, e.g. right after adding a teacher."""
+    with _lock:
+        _cache['counts'] = None
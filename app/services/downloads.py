@@ -0,0 +1,69 @@
+# app/services/downloads.py
+"""Serving submission files.
+
+send_stored_file() answers with:
+* a strong ETag (the file's SHA-256) when the hash is known, and 304 Not
+  Modified when the client already has that version (If-None-Match);
+* 206 Partial Content for Range requests (resumed / seeking downloads);
+* with DOWNLOAD_OFFLOAD set, only headers: the front server sends the bytes
+  ('x-sendfile' for Apache mod_xsendfile / lighttpd, 'x-accel' for nginx),
+  so the worker is free as soon as the headers are out. Files smaller than
+  DOWNLOAD_OFFLOAD_MIN_BYTES are still sent directly.
+
+nginx example for 'x-accel' (DOWNLOAD_ACCEL_PREFIX=/protected-projects/):
+
+    location /protected-projects/ {
+        internal;
+        alias /srv/cbc_edu_triad/projects/;   # UPLOAD_ROOT
+    }
+"""
+import os
+from urllib.parse import quote
+
+from flask import current_app, request
+from werkzeug.utils import send_file
+
+OFFLOAD_MODES = ('x-sendfile', 'x-accel')
+
+# Left for the front server to answer when it sends the file itself
+_RANGE_HEADERS = ('HTTP_RANGE', 'HTTP_IF_RANGE')
+
+
+def _accel_location(path):
+    """Internal nginx URI for ``path``, or None if it is outside UPLOAD_ROOT."""
+    root = os.path.abspath(current_app.config['UPLOAD_ROOT'])
+    relative = os.path.relpath(os.path.abspath(path), root)
+    if relative.startswith(os.pardir):
+        return None
+    prefix = current_app.config['DOWNLOAD_ACCEL_PREFIX'].rstrip('/') + '/'
+    return prefix + quote(relative.replace(os.sep, '/'))
+
+
+def send_stored_file(path, download_name, content_sha256=None):
+    """Response for a stored submission (may raise RequestedRangeNotSatisfiable)."""
+    # Stored hashes are CHAR(64); without one werkzeug derives a tag from mtime/size
+    etag = content_sha256.strip() if content_sha256 else True
+    mode = current_app.config['DOWNLOAD_OFFLOAD']
+    offload = (mode in OFFLOAD_MODES
+               and os.path.getsize(path) >= current_app.config['DOWNLOAD_OFFLOAD_MIN_BYTES'])
+    accel_location = _accel_location(path) if offload and mode == 'x-accel' else None
+    if offload and mode == 'x-accel' and accel_location is None:
+        offload = False
+
+    environ = request.environ
+    if offload:
+        environ = {key: value for key, value in environ.items() if key not in _RANGE_HEADERS}
+
+    response = send_file(
+        os.path.abspath(path) if offload else path,
+        environ,
+        as_attachment=True,
+        download_name=download_name,
+        etag=etag,
+        use_x_sendfile=offload,
+        response_class=current_app.response_class,
+    )
+    if accel_location and 'X-Sendfile' in response.headers:
+        del response.headers['X-Sendfile']
+        response.headers['X-Accel-Redirect'] = accel_location
+    return response
@@ -0,0 +1,176 @@
+# app/services/gradebook.py
+"""Class gradebook: students x (task, competency) overall scores.
+
+get_gradebook() builds the whole grid with two statements, whatever its size:
+GET_GRADEBOOK_COLUMNS_QUERY picks the (task, competency) columns and
+GET_GRADEBOOK_ROWS_QUERY pivots competency_assessments into one score array
+per student. The result is cached per class in this worker process for
+GRADEBOOK_CACHE_TTL seconds (at most GRADEBOOK_CACHE_SIZE classes).
+
+Once an assessment has committed, invalidate_students() runs
+(app.database.after_commit): every cached class with one of those students on
+its roster is dropped, and the teacher's session is stamped so their next
+gradebook view reloads in any worker (the same scheme as
+app.services.student_dashboard).
+
+iter_json() / iter_csv() serialize a gradebook row by row for a streamed
+response; cell() is the criteria drill-down for one student and task.
+"""
+import csv
+import io
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_request_context, session
+
+from app.queries.gradebook_queries import (GET_GRADEBOOK_CLASS_QUERY, GET_GRADEBOOK_COLUMNS_QUERY,
+                                           GET_GRADEBOOK_ROWS_QUERY, GET_GRADEBOOK_ROSTER_QUERY,
+                                           GET_GRADEBOOK_CELL_QUERY)
+
+SESSION_STAMP = 'gradebook_changed_at'
+
+_lock = threading.Lock()
+_entries = OrderedDict()   # (class_id, teacher_id) -> (book, student_ids, loaded_at, expires)
+
+
+def _number(value):
+    return float(value) if value is not None else None
+
+
+def load(cursor, class_id, teacher_id):
+    """The gradebook of a class, bypassing the cache; None unless the teacher
+    owns the class."""
+    cursor.execute(GET_GRADEBOOK_CLASS_QUERY, (class_id, teacher_id))
+    class_info = cursor.fetchone()
+    if not class_info:
+        return None
+
+    cursor.execute(GET_GRADEBOOK_COLUMNS_QUERY, (teacher_id, class_id))
+    columns = [{
+        'task_id': task_id,
+        'task': title,
+        'due_date': duedate.isoformat() if duedate else None,
+        'competency_id': competency_id,
+        'competency': competency,
+    } for task_id, title, duedate, competency_id, competency in cursor.fetchall()]
+
+    if columns:
+        cursor.execute(GET_GRADEBOOK_ROWS_QUERY, (
+            [column['task_id'] for column in columns],
+            [column['competency_id'] for column in columns],
+            class_id,
+        ))
+    else:
+        cursor.execute(GET_GRADEBOOK_ROSTER_QUERY, (class_id,))
+    students = [{
+        'student_id': student_id,
+        'name': f"{firstname} {lastname}",
+        'student_number': student_number,
+        'scores': [_number(score) for score in scores],
+    } for student_id, firstname, lastname, student_number, scores in cursor.fetchall()]
+
+    return {
+        'class_id': class_id,
+        'class_name': class_info[0],
+        'academic_year': class_info[1],
+        'columns': columns,
+        'students': students,
+    }
+
+
+def get_gradebook(cursor, class_id, teacher_id):
+    """Cached load(); None unless the teacher owns the class."""
+    key = (class_id, teacher_id)
+    changed_at = session.get(SESSION_STAMP, 0.0) if has_request_context() else 0.0
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and now < entry[3] and entry[2] >= changed_at:
+            _entries.move_to_end(key)
+            return entry[0]
+
+    loaded_at = time.time()
+    book = load(cursor, class_id, teacher_id)
+    if book is None:
+        return None
+    config = current_app.config
+    student_ids = frozenset(student['student_id'] for student in book['students'])
+    with _lock:
+        _entries[key] = (book, student_ids, loaded_at, now + config['GRADEBOOK_CACHE_TTL'])
+        _entries.move_to_end(key)
+        while len(_entries) > config['GRADEBOOK_CACHE_SIZE']:
+            _entries.popitem(last=False)
+    return book
+
+
+def invalidate_students(*student_ids):
+    """Drop the cached gradebooks of every class these students are in."""
+    changed = set(student_ids)
+    with _lock:
+        for key in [key for key, entry in _entries.items() if entry[1] & changed]:
+            del _entries[key]
+    if has_request_context() and 'teacher_id' in session:
+        session[SESSION_STAMP] = time.time()
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def iter_json(book):
+    """The gradebook as a JSON document, one student per chunk."""
+    header = {key: value for key, value in book.items() if key != 'students'}
+    yield json.dumps(header)[:-1] + ', "students": ['
+    for index, student in enumerate(book['students']):
+        yield (', ' if index else '') + json.dumps(student)
+    yield ']}\n'
+
+
+def iter_csv(book):
+    """The gradebook as CSV: one column per (task, competency)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writerow(['Student ID', 'Student Number', 'Student'] +
+                    [f"{column['task']} - {column['competency']}" for column in book['columns']])
+    yield flush()
+    for student in book['students']:
+        writer.writerow([student['student_id'], student['student_number'], student['name']] +
+                        ['' if score is None else f"{score:g}" for score in student['scores']])
+        yield flush()
+
+
+def cell(cursor, class_id, teacher_id, student_id, task_id):
+    """A student's assessments for one task with their criteria ratings:
+    [{'competency_id', 'competency', 'overall_score', 'feedback',
+    'assessed_at', 'criteria': [...]}, ...]"""
+    cursor.execute(GET_GRADEBOOK_CELL_QUERY, (student_id, task_id, teacher_id, class_id))
+    competencies = OrderedDict()
+    for (competency_id, competency, overall_score, feedback, assessed_at,
+         criteria_id, criteria_name, level, level_score, criteria_feedback) in cursor.fetchall():
+        entry = competencies.setdefault(competency_id, {
+            'competency_id': competency_id,
+            'competency': competency,
+            'overall_score': _number(overall_score),
+            'feedback': feedback,
+            'assessed_at': assessed_at.isoformat() if assessed_at else None,
+            'criteria': [],
+        })
+        if criteria_id is not None:
+            entry['criteria'].append({
+                'criteria_id': criteria_id,
+                'criteria': criteria_name,
+                'level': level,
+                'score': level_score,
+                'feedback': criteria_feedback,
+            })
+    return list(competencies.values())
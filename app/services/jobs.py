@@ -0,0 +1,301 @@
+# app/services/jobs.py
+"""Background jobs on a Postgres table (migrations/011_jobs.sql).
+
+Routes call enqueue() with their own cursor: the job is stored in the same
+transaction as whatever it works on (a report batch, an uploaded file) and
+the request returns at once. Clients poll GET /jobs/<id> for the status and
+result. A worker process started next to the web app runs the queue:
+
+    python -m app.services.jobs                  # run forever
+    python -m app.services.jobs --once           # run what is due, then exit
+    python -m app.services.jobs --concurrency 2 --kind report_batch
+
+The worker claims due jobs with FOR UPDATE SKIP LOCKED, so any number of
+workers can share the table, and runs at most JOB_CONCURRENCY of them at a
+time on threads with their own pooled connection. While a job runs its row
+gets a heartbeat every JOB_POLL_SECONDS; a job whose worker died is claimed
+again once the heartbeat is JOB_STALE_SECONDS old, or failed if that was its
+last attempt (so a job that kills its worker cannot loop). A job that raises
+is retried with exponential backoff until its max_attempts, except for
+JobFailed, which fails it at once. Between claims the worker sleeps on
+LISTEN jobs, so new work starts as soon as it is committed.
+
+Job kinds are registered with @handler('kind'); a handler gets a connection
+(it commits its own work), the payload and the job id, and returns a
+JSON-able result. A job claimed again after its worker died runs its handler
+from the start, so handlers must be safe to re-run.
+The modules in HANDLER_MODULES are imported by the worker.
+"""
+import argparse
+import importlib
+import os
+import select
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from psycopg2.extras import Json  #type:ignore
+
+from app.queries.job_queries import (
+    INSERT_JOB_QUERY, NOTIFY_JOBS_QUERY, LISTEN_JOBS_QUERY, GET_JOB_QUERY,
+    FAIL_STALE_JOBS_QUERY, CLAIM_JOBS_QUERY, JOB_HEARTBEAT_QUERY, MARK_JOB_DONE_QUERY, MARK_JOB_RETRY_QUERY,
+    MARK_JOB_FAILED_QUERY, DELETE_OLD_JOBS_QUERY, JOB_STATS_QUERY,
+)
+
+# Modules whose @handler functions the worker needs
+HANDLER_MODULES = ('app.services.report_cards', 'app.services.bulk_import')
+
+_handlers = {}
+
+
+class JobFailed(Exception):
+    """Raised by a handler when retrying cannot help; the job fails at once."""
+
+
+def handler(kind):
+    """Register the decorated function as the handler of ``kind`` jobs."""
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def load_handlers():
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+    return dict(_handlers)
+
+
+# ==================================
+# Queueing and status
+# ==================================
+
+def enqueue(cursor, kind, payload=None, created_by=None, max_attempts=None, delay=0):
+    """Store a job for the worker; it becomes visible once the caller commits."""
+    if max_attempts is None:
+        max_attempts = current_app.config['JOB_MAX_ATTEMPTS']
+    cursor.execute(INSERT_JOB_QUERY, (kind, Json(payload or {}), max_attempts, delay, created_by))
+    job_id = cursor.fetchone()[0]
+    cursor.execute(NOTIFY_JOBS_QUERY)
+    return job_id
+
+
+def get_job(cursor, job_id):
+    cursor.execute(GET_JOB_QUERY, (job_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    (job_id, kind, payload, status, attempts, max_attempts, run_after, result,
+     last_error, created_by, created_at, started_at, finished_at) = row
+    return {
+        'job_id': job_id,
+        'kind': kind,
+        'payload': payload,
+        'status': status,
+        'attempts': attempts,
+        'max_attempts': max_attempts,
+        'run_after': run_after,
+        'result': result,
+        'error': last_error,
+        'created_by': created_by,
+        'created_at': created_at,
+        'started_at': started_at,
+        'finished_at': finished_at,
+    }
+
+
+def job_status(job):
+    """The JSON clients poll (the payload may hold server paths: left out)."""
+    status = {key: job[key] for key in ('job_id', 'kind', 'status', 'attempts', 'max_attempts',
+                                        'result', 'error')}
+    for key in ('created_at', 'started_at', 'finished_at', 'run_after'):
+        status[key] = job[key].isoformat() if job[key] else None
+    return status
+
+
+def job_stats(cursor):
+    """Queue depth per kind."""
+    cursor.execute(JOB_STATS_QUERY)
+    return {kind: {
+        'queued': queued,
+        'running': running,
+        'failed': failed,
+        'oldest_queued_seconds': round(float(oldest_age), 1) if oldest_age is not None else None,
+    } for kind, queued, running, failed, oldest_age in cursor.fetchall()}
+
+
+def purge(conn, days):
+    """Delete jobs that finished more than ``days`` ago; returns the count."""
+    with conn.cursor() as cursor:
+        cursor.execute(DELETE_OLD_JOBS_QUERY, (days,))
+        deleted = cursor.rowcount
+    conn.commit()
+    return deleted
+
+
+# ==================================
+# Worker
+# ==================================
+
+def _claim(conn, worker_id, kinds, limit):
+    stale_seconds = current_app.config['JOB_STALE_SECONDS']
+    with conn.cursor() as cursor:
+        cursor.execute(FAIL_STALE_JOBS_QUERY, (kinds, stale_seconds))
+        for job_id, kind in cursor.fetchall():
+            print(f"jobs: {kind} #{job_id} failed: its worker stopped on the last attempt")
+        cursor.execute(CLAIM_JOBS_QUERY, (worker_id, kinds, stale_seconds, limit))
+        rows = cursor.fetchall()
+    conn.commit()
+    return [dict(zip(('job_id', 'kind', 'payload', 'attempts', 'max_attempts', 'created_by'), row))
+            for row in rows]
+
+
+def _heartbeat(conn, worker_id, job_ids):
+    with conn.cursor() as cursor:
+        cursor.execute(JOB_HEARTBEAT_QUERY, (job_ids, worker_id))
+    conn.commit()
+
+
+def _execute(app, worker_id, job, wake):
+    """Run one claimed job on a pool thread and record the outcome."""
+    from app.database import get_db_connection
+
+    with app.app_context():
+        started = time.monotonic()
+        conn = get_db_connection()
+        try:
+            try:
+                result = _handlers[job['kind']](conn, job['payload'], job['job_id'])
+                conn.commit()
+                outcome, error = 'done', None
+            except Exception as e:
+                conn.rollback()
+                error = (str(e) or e.__class__.__name__)[:1000]
+                final = isinstance(e, JobFailed) or job['attempts'] >= job['max_attempts']
+                outcome = 'failed' if final else 'retry'
+            with conn.cursor() as cursor:
+                if outcome == 'done':
+                    cursor.execute(MARK_JOB_DONE_QUERY, (Json(result), job['job_id'], worker_id))
+                elif outcome == 'retry':
+                    cursor.execute(MARK_JOB_RETRY_QUERY, (
+                        error, app.config['JOB_RETRY_BASE_SECONDS'], job['job_id'], worker_id))
+                else:
+                    cursor.execute(MARK_JOB_FAILED_QUERY, (error, job['job_id'], worker_id))
+            conn.commit()
+            print(f"jobs: {job['kind']} #{job['job_id']} {outcome} "
+                  f"in {time.monotonic() - started:.2f}s" + (f": {error}" if error else ""))
+        except Exception as e:
+            conn.rollback()
+            print(f"jobs: could not record {job['kind']} #{job['job_id']}: {e}")
+        finally:
+            conn.close()
+            os.write(wake, b'.')
+
+
+def run_worker(concurrency=None, once=False, kinds=None):
+    """Worker loop; needs an app context. Stops on SIGTERM / Ctrl-C after
+    the running jobs finish."""
+    from app.database import get_db_connection
+
+    app = current_app._get_current_object()
+    config = app.config
+    handlers = load_handlers()
+    kinds = list(kinds or handlers)
+    unknown = [kind for kind in kinds if kind not in handlers]
+    if unknown:
+        raise ValueError(f"No handler for job kind(s): {', '.join(unknown)}")
+    concurrency = max(1, concurrency or config['JOB_CONCURRENCY'])
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    stop = threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    # Finished jobs write to this pipe, so a freed slot is refilled at once
+    wake_read, wake_write = os.pipe()
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job')
+    running = {}
+    conn = get_db_connection()
+    listener = None
+    last_heartbeat = time.monotonic()
+    try:
+        if not once:
+            listener = get_db_connection()
+            listener.autocommit = True
+            with listener.cursor() as cursor:
+                cursor.execute(LISTEN_JOBS_QUERY)
+        print(f"jobs: worker {worker_id} running {', '.join(kinds)} (concurrency {concurrency})")
+        while not stop.is_set():
+            for job_id in [job_id for job_id, future in running.items() if future.done()]:
+                del running[job_id]
+            claimed = []
+            try:
+                if running and time.monotonic() - last_heartbeat >= config['JOB_POLL_SECONDS']:
+                    _heartbeat(conn, worker_id, list(running))
+                    last_heartbeat = time.monotonic()
+                if len(running) < concurrency:
+                    claimed = _claim(conn, worker_id, kinds, concurrency - len(running))
+            except Exception as e:
+                print(f"jobs: error polling the queue: {e}")
+                conn.rollback()
+            for job in claimed:
+                running[job['job_id']] = executor.submit(_execute, app, worker_id, job, wake_write)
+            if once and not claimed and not running:
+                break
+            if claimed and len(running) < concurrency:
+                continue  # there may be more due right now
+
+            # Sleep until a job is queued or finishes (or heartbeats fall due)
+            waiting = [wake_read] + ([listener] if listener is not None else [])
+            try:
+                ready = select.select(waiting, [], [], config['JOB_POLL_SECONDS'])[0]
+            except InterruptedError:
+                continue
+            if wake_read in ready:
+                os.read(wake_read, 1024)
+            if listener is not None and listener in ready:
+                listener.poll()
+                listener.notifies.clear()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if running:
+            print(f"jobs: waiting for {len(running)} running job(s)")
+        executor.shutdown(wait=True)
+        conn.close()
+        if listener is not None:
+            listener.close()
+        os.close(wake_read)
+        os.close(wake_write)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run background jobs from the jobs table.')
+    parser.add_argument('--once', action='store_true', help='run what is due now, then exit')
+    parser.add_argument('--concurrency', type=int, help='jobs run at the same time (default JOB_CONCURRENCY)')
+    parser.add_argument('--kind', action='append', help='only run jobs of this kind (repeatable)')
+    parser.add_argument('--purge', type=int, metavar='DAYS',
+                        help='delete jobs finished more than DAYS ago, then exit')
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.database import get_db_connection
+
+    with create_app().app_context():
+        if args.purge is not None:
+            conn = get_db_connection()
+            try:
+                print(f"Deleted {purge(conn, args.purge)} finished jobs")
+            finally:
+                conn.close()
+            return
+        try:
+            run_worker(concurrency=args.concurrency, once=args.once, kinds=args.kind)
+        except ValueError as e:
+            parser.exit(1, f"{e}\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+# app/services/outbox.py
+"""Outbound email queue (migrations/005_email_outbox.sql).
+
+Routes call queue_email() with their own cursor, so the message is stored in
+the same transaction as the token it carries and the request never waits on
+SMTP. A separate worker process sends the queue:
+
+    python -m app.services.outbox          # run forever
+    python -m app.services.outbox --once   # drain what is due, then exit
+
+The worker claims due rows in batches (FOR UPDATE SKIP LOCKED, so several
+workers can run), sends a batch over one SMTP connection and retries failures
+with exponential backoff until OUTBOX_MAX_ATTEMPTS. Between batches it sleeps
+on LISTEN email_outbox, so new mail goes out as soon as it is committed.
+
+For local testing point MAIL_SERVER/MAIL_PORT at an SMTP stand-in, e.g.
+``python -m aiosmtpd -n -l localhost:8025`` with MAIL_USE_SSL=False.
+"""
+import argparse
+import select
+import smtplib
+import time
+
+from flask import current_app
+from flask_mail import Message
+
+from app.queries.outbox_queries import (
+    INSERT_OUTBOX_EMAIL_QUERY, NOTIFY_OUTBOX_QUERY, LISTEN_OUTBOX_QUERY,
+    CLAIM_OUTBOX_BATCH_QUERY, MARK_OUTBOX_SENT_QUERY, MARK_OUTBOX_RETRY_QUERY,
+    OUTBOX_STATS_QUERY,
+)
+
+# The SMTP session itself is gone: retry this message and the rest of the batch later
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+
+def queue_email(cursor, subject, recipients, html=None, body=None, sender=None):
+    """Store a message for the worker; it is sent once the caller commits."""
+    if isinstance(recipients, str):
+        recipients = [recipients]
+    if sender is None:
+        sender = current_app.config['MAIL_USERNAME'] or current_app.config['MAIL_DEFAULT_SENDER']
+    cursor.execute(INSERT_OUTBOX_EMAIL_QUERY, (sender, list(recipients), subject, body, html))
+    email_id = cursor.fetchone()[0]
+    cursor.execute(NOTIFY_OUTBOX_QUERY)
+    return email_id
+
+
+def outbox_stats(cursor):
+    """Queue depth and send latency (seconds) over the last hour."""
+    cursor.execute(OUTBOX_STATS_QUERY)
+    pending, sending, failed, oldest_age, sent_last_hour, avg_latency, p95_latency = cursor.fetchone()
+    return {
+        'pending': pending,
+        'sending': sending,
+        'failed': failed,
+        'oldest_queued_seconds': round(float(oldest_age), 1) if oldest_age is not None else None,
+        'sent_last_hour': sent_last_hour,
+        'avg_latency_seconds': round(float(avg_latency), 2) if avg_latency is not None else None,
+        'p95_latency_seconds': round(float(p95_latency), 2) if p95_latency is not None else None,
+    }
+
+
+# ==================================
+# Worker
+# ==================================
+
+def _claim_batch(conn):
+    config = current_app.config
+    with conn.cursor() as cursor:
+        cursor.execute(CLAIM_OUTBOX_BATCH_QUERY, (config['OUTBOX_CLAIM_TIMEOUT'], config['OUTBOX_BATCH_SIZE']))
+        rows = cursor.fetchall()
+    conn.commit()
+    return rows
+
+
+def _to_message(row):
+    _id, sender, recipients, subject, body_text, body_html, _attempts = row
+    return Message(subject, sender=sender, recipients=list(recipients), body=body_text, html=body_html)
+
+
+def _send_batch(rows):
+    """Send ``rows`` over one SMTP connection -> (sent ids, {id: error})."""
+    sent, failed = [], {}
+    try:
+        with current_app.extensions['mail'].connect() as smtp:
+            for index, row in enumerate(rows):
+                try:
+                    smtp.send(_to_message(row))
+                    sent.append(row[0])
+                except CONNECTION_ERRORS as e:
+                    for pending in rows[index:]:
+                        failed[pending[0]] = f"connection lost: {e}"
+                    break
+                except Exception as e:
+                    failed[row[0]] = str(e) or e.__class__.__name__
+    except Exception as e:
+        # Could not connect / log in, or QUIT failed after the batch
+        for row in rows:
+            if row[0] not in sent:
+                failed.setdefault(row[0], f"smtp: {e}")
+    return sent, failed
+
+
+def _record_results(conn, sent, failed):
+    config = current_app.config
+    with conn.cursor() as cursor:
+        if sent:
+            cursor.execute(MARK_OUTBOX_SENT_QUERY, (sent,))
+        for email_id, error in failed.items():
+            cursor.execute(MARK_OUTBOX_RETRY_QUERY, (
+                error[:1000], config['OUTBOX_MAX_ATTEMPTS'], config['OUTBOX_RETRY_BASE_SECONDS'], email_id
+            ))
+    conn.commit()
+
+
+def process_due(conn):
+    """Send everything that is due right now; returns (sent, failed) counts."""
+    total_sent = total_failed = 0
+    while True:
+        rows = _claim_batch(conn)
+        if not rows:
+            return total_sent, total_failed
+        started = time.monotonic()
+        sent, failed = _send_batch(rows)
+        _record_results(conn, sent, failed)
+        total_sent += len(sent)
+        total_failed += len(failed)
+        print(f"outbox: sent {len(sent)}, failed {len(failed)} in {time.monotonic() - started:.2f}s")
+
+
+def run_worker(once=False):
+    """Worker loop; needs an app context."""
+    from app.database import get_db_connection
+
+    conn = get_db_connection()
+    listener = None
+    try:
+        if once:
+            process_due(conn)
+            return
+        listener = get_db_connection()
+        listener.autocommit = True
+        with listener.cursor() as cursor:
+            cursor.execute(LISTEN_OUTBOX_QUERY)
+        while True:
+            try:
+                process_due(conn)
+            except Exception as e:
+                print(f"outbox: error processing queue: {e}")
+                conn.rollback()
+            # Sleep until something is queued (or retries fall due)
+            if select.select([listener], [], [], current_app.config['OUTBOX_POLL_SECONDS'])[0]:
+                listener.poll()
+                listener.notifies.clear()
+    finally:
+        conn.close()
+        if listener is not None:
+            listener.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Send queued email from the email_outbox table.')
+    parser.add_argument('--once', action='store_true', help='send what is due now, then exit')
+    args = parser.parse_args()
+
+    from app import create_app
+    with create_app().app_context():
+        run_worker(once=args.once)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+# app/services/passwords.py
+"""Password hashing and verification in a per-process worker pool.
+
+Hashing is deliberately CPU-heavy. Running it in the web worker holds the GIL
+for the whole hash, so a burst of logins at lesson start queues up behind
+each other (and behind every other request on that worker). Here the work runs
+in a ProcessPoolExecutor of PASSWORD_HASH_WORKERS processes; the request
+thread only waits for the result.
+
+At most PASSWORD_HASH_QUEUE jobs may be pending per web worker. When the queue
+stays full for PASSWORD_HASH_QUEUE_TIMEOUT seconds, HashingBusyError is raised
+and init_app() turns it into a 503 with Retry-After instead of letting the
+backlog grow without bound.
+
+Hashes record their own method, so a changed PASSWORD_HASH_METHOD (or a new
+werkzeug default) is picked up on the user's next successful login by
+verify_and_upgrade().
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from app.queries.auth_queries import REHASH_PASSWORD_QUERY
+
+
+class HashingBusyError(RuntimeError):
+    """The hashing queue is full; the client should retry shortly."""
+
+
+# ==================================
+# Worker pool (one per web worker process)
+# ==================================
+
+_pool_lock = threading.Lock()
+_pool_state = {'pid': None, 'executor': None, 'slots': None}
+
+
+def _hash_many(passwords, method):
+    # Runs in a pool process
+    return [_generate(password, method) for password in passwords]
+
+
+def _check(pwhash, password):
+    # Runs in a pool process
+    return check_password_hash(pwhash, password)
+
+
+def _generate(password, method):
+    if method:
+        return generate_password_hash(password, method=method)
+    return generate_password_hash(password)
+
+
+def _get_pool():
+    """(executor, slots) for this process, or (None, None) when hashing inline."""
+    workers = current_app.config['PASSWORD_HASH_WORKERS']
+    if workers <= 0:
+        return None, None
+    pid = os.getpid()
+    with _pool_lock:
+        if _pool_state['pid'] != pid:
+            # A forked web worker must not reuse its parent's executor. The
+            # pool processes come from a forkserver (spawn where there is
+            # none): forking this threaded process (request threads, the
+            # reference-cache listener, pooled libpq sockets) can deadlock them
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            _pool_state['executor'] = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _pool_state['slots'] = threading.BoundedSemaphore(current_app.config['PASSWORD_HASH_QUEUE'])
+            _pool_state['pid'] = pid
+        return _pool_state['executor'], _pool_state['slots']
+
+
+def _run(fn, *args):
+    """Submit ``fn`` to the pool (or run it inline) and return a Future."""
+    executor, slots = _get_pool()
+    if executor is None:
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+    if not slots.acquire(timeout=current_app.config['PASSWORD_HASH_QUEUE_TIMEOUT']):
+        raise HashingBusyError("Too many sign-ins at once. Please try again in a moment.")
+    try:
+        future = executor.submit(fn, *args)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _future: slots.release())
+    return future
+
+
+def shutdown_pool():
+    with _pool_lock:
+        if _pool_state['executor'] is not None and _pool_state['pid'] == os.getpid():
+            _pool_state['executor'].shutdown(wait=False, cancel_futures=True)
+        _pool_state.update(pid=None, executor=None, slots=None)
+
+
+# ==================================
+# Public API
+# ==================================
+
+def hash_password(password):
+    method = current_app.config['PASSWORD_HASH_METHOD']
+    return _run(_hash_many, [password], method).result()[0]
+
+
+def hash_passwords(passwords):
+    """Hash many passwords (bulk import); batches share the pool's queue."""
+    passwords = list(passwords)
+    method = current_app.config['PASSWORD_HASH_METHOD']
+    workers = max(1, current_app.config['PASSWORD_HASH_WORKERS'])
+    batch = max(1, -(-len(passwords) // (workers * 2)))
+    jobs = [_run(_hash_many, passwords[i:i + batch], method) for i in range(0, len(passwords), batch)]
+    return [pwhash for job in jobs for pwhash in job.result()]
+
+
+def verify_password(pwhash, password):
+    if not pwhash:
+        return False
+    return _run(_check, pwhash, password).result()
+
+
+@lru_cache(maxsize=8)
+def _method_prefix(method):
+    # "pbkdf2:sha256:600000" / "scrypt:32768:8:1": the part before the salt
+    return _generate('', method).split('$', 1)[0]
+
+
+def needs_rehash(pwhash):
+    method = current_app.config['PASSWORD_HASH_METHOD']
+    return pwhash.split('$', 1)[0] != _method_prefix(method)
+
+
+def verify_and_upgrade(cursor, user_id, pwhash, password):
+    """Check ``password``; when it matches a hash made with outdated settings,
+    store a fresh hash (the caller commits). Returns whether it matched."""
+    if not verify_password(pwhash, password):
+        return False
+    if needs_rehash(pwhash):
+        try:
+            cursor.execute(REHASH_PASSWORD_QUERY, (hash_password(password), user_id, pwhash))
+        except HashingBusyError:
+            pass  # the login itself succeeded; upgrade next time
+    return True
+
+
+def init_app(app):
+    @app.errorhandler(HashingBusyError)
+    def _hashing_busy(error):
+        return str(error), 503, {'Retry-After': '2'}
@@ -0,0 +1,178 @@
+# app/services/reference_cache.py
+"""Per-process cache of reference data (competencies, criteria, performance
+levels) for the dropdowns and assessment forms.
+
+Every dataset records the version of the tables it was loaded from. Writers
+call invalidate(conn, 'criteria', ...) after committing: that bumps the
+table versions in this process and sends NOTIFY reference_data, which a
+listener thread in every other worker process turns into the same bump. An
+entry is served only while its table versions still match and it is younger
+than REFERENCE_CACHE_TTL, so a lost notification costs at most one TTL.
+
+stats() returns hit/miss/load counters per dataset (admin /reference_cache_stats).
+"""
+import os
+import select
+import threading
+import time
+
+import psycopg2  #type:ignore
+from flask import current_app
+
+from app.config import Config
+from app.queries.criteria_queries import GET_COMPETENCIES_FOR_DROPDOWN_QUERY
+from app.queries.reference_queries import (GET_CRITERIA_BY_COMPETENCY_QUERY,
+                                           GET_PERFORMANCE_LEVELS_BY_SCORE_QUERY,
+                                           NOTIFY_REFERENCE_QUERY, LISTEN_REFERENCE_QUERY)
+
+TABLES = ('competencies', 'criteria', 'performance', 'rubric')
+
+
+def _group_criteria(rows):
+    """{competencyid: ((criteriaid, criterianame, criteriadescription), ...)}"""
+    grouped = {}
+    for competency_id, *criteria in rows:
+        grouped.setdefault(competency_id, []).append(tuple(criteria))
+    return {competency_id: tuple(criteria) for competency_id, criteria in grouped.items()}
+
+
+# name -> (tables it is read from, query, rows -> cached value)
+DATASETS = {
+    'competency_options': (('competencies',), GET_COMPETENCIES_FOR_DROPDOWN_QUERY, tuple),
+    'criteria_by_competency': (('criteria',), GET_CRITERIA_BY_COMPETENCY_QUERY, _group_criteria),
+    'performance_levels': (('performance',), GET_PERFORMANCE_LEVELS_BY_SCORE_QUERY, tuple),
+}
+
+_lock = threading.Lock()
+_versions = {table: 0 for table in TABLES}
+_entries = {}   # name -> (value, versions, expires)
+_metrics = {name: {'hits': 0, 'misses': 0, 'loads': 0} for name in DATASETS}
+_invalidations = {'local': 0, 'remote': 0}
+_listener = {'pid': None, 'connected': False}
+
+
+def _table_versions(tables):
+    return tuple(_versions[table] for table in tables)
+
+
+def get(cursor, name):
+    """The cached value of dataset ``name``, loading it with ``cursor`` on a miss."""
+    _ensure_listener()
+    tables, query, build = DATASETS[name]
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(name)
+        if entry is not None and entry[1] == _table_versions(tables) and now < entry[2]:
+            _metrics[name]['hits'] += 1
+            return entry[0]
+        _metrics[name]['misses'] += 1
+        # Taken before loading: a change committed meanwhile invalidates this load
+        versions = _table_versions(tables)
+
+    cursor.execute(query)
+    value = build(cursor.fetchall())
+    with _lock:
+        _metrics[name]['loads'] += 1
+        _entries[name] = (value, versions, now + current_app.config['REFERENCE_CACHE_TTL'])
+    return value
+
+
+def competency_options(cursor):
+    """((competencyid, competencyname), ...)"""
+    return get(cursor, 'competency_options')
+
+
+def criteria_for(cursor, competency_id):
+    """((criteriaid, criterianame, criteriadescription), ...) ordered by id."""
+    return get(cursor, 'criteria_by_competency').get(competency_id, ())
+
+
+def performance_levels(cursor):
+    """((performancelevelid, levelname, scorevalue, leveldescription), ...), best first."""
+    return get(cursor, 'performance_levels')
+
+
+def level_name(levels, score):
+    """Name of the best of ``levels`` (performance_levels()) that ``score`` reaches."""
+    if score is None or not levels:
+        return None
+    for _level_id, name, score_value, _description in levels:
+        if score >= score_value:
+            return name
+    return levels[-1][1]
+
+
+def _bump(tables, source):
+    with _lock:
+        for table in tables:
+            if table in _versions:
+                _versions[table] += 1
+        _invalidations[source] += 1
+
+
+def invalidate(conn, *tables):
+    """Call after committing a change to ``tables``: drops them here and tells
+    the other worker processes. Never raises (the change itself is committed)."""
+    _bump(tables, 'local')
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(NOTIFY_REFERENCE_QUERY, (','.join(tables),))
+        conn.commit()
+    except Exception as e:
+        print(f"reference cache: could not notify other workers: {e}")
+        conn.rollback()
+
+
+# ==========================================
+# Cross-process invalidation (LISTEN)
+# ==========================================
+
+def _listen_forever():
+    kwargs = dict(host=Config.DB_HOST, database=Config.DB_NAME, user=Config.DB_USER,
+                  password=Config.DB_PASSWORD, port=Config.DB_PORT)
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(**kwargs)
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(LISTEN_REFERENCE_QUERY)
+            # Anything may have changed while we were not listening
+            _bump(TABLES, 'remote')
+            _listener['connected'] = True
+            while True:
+                if select.select([conn], [], [], 60)[0]:
+                    conn.poll()
+                    for notify in conn.notifies:
+                        _bump(notify.payload.split(','), 'remote')
+                    conn.notifies.clear()
+        except Exception as e:
+            print(f"reference cache: listener error, retrying: {e}")
+        finally:
+            _listener['connected'] = False
+            if conn is not None:
+                conn.close()
+        time.sleep(5)
+
+
+def _ensure_listener():
+    # One daemon thread per process (re-started in each forked worker)
+    pid = os.getpid()
+    if _listener['pid'] == pid or not current_app.config['REFERENCE_CACHE_LISTEN']:
+        return
+    with _lock:
+        if _listener['pid'] == pid:
+            return
+        _listener['pid'] = pid
+    threading.Thread(target=_listen_forever, name='reference-cache-listener', daemon=True).start()
+
+
+def stats():
+    with _lock:
+        return {
+            'datasets': {name: dict(counts) for name, counts in _metrics.items()},
+            'versions': dict(_versions),
+            'invalidations': dict(_invalidations),
+            'listening': _listener['connected'],
+            'ttl': current_app.config['REFERENCE_CACHE_TTL'],
+        }
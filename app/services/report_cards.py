@@ -0,0 +1,413 @@
+# app/services/report_cards.py
+"""Term report cards for a class or the whole school (migrations/010).
+
+An admin creates a batch (class or whole school, term dates, 'html' or
+'pdf'); run_batch() then works through its students in chunks of
+REPORT_CHUNK_SIZE:
+
+1. two queries aggregate the chunk's competency_assessments and
+   criteria_ratings over the term (average score, number of assessments,
+   latest feedback) and the averages are named after the performance level
+   they reach;
+2. the chunk is rendered (reports/report_card.html; PDF through the optional
+   weasyprint package) in a ProcessPoolExecutor of REPORT_WORKERS processes
+   and written to UPLOAD_ROOT/reports/<term>/;
+3. as each chunk finishes, one multi-row upsert stores its Reports rows and
+   the batch counters move on, so the admin page can poll the progress.
+
+Students and parents download the stored cards through send_report().
+
+The admin page queues a 'report_batch' job (app.services.jobs), so batches run
+in the job worker; one can also be run from the command line:
+
+    python -m app.services.report_cards generate --term "Term 1 2025" \\
+        --start 2025-01-06 --end 2025-04-04 [--class-id 3] [--format pdf]
+    python -m app.services.report_cards run <batch_id> [--force]
+"""
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from datetime import date, datetime
+
+from flask import current_app
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from psycopg2.extras import execute_values  #type:ignore
+from werkzeug.utils import secure_filename
+
+from app.queries.report_queries import (
+    INSERT_REPORT_BATCH_QUERY, GET_REPORT_BATCH_QUERY, START_REPORT_BATCH_QUERY,
+    REPORT_BATCH_PROGRESS_QUERY, FINISH_REPORT_BATCH_QUERY,
+    GET_CLASS_REPORT_STUDENTS_QUERY, GET_SCHOOL_REPORT_STUDENTS_QUERY,
+    GET_REPORT_STUDENTS_QUERY, GET_REPORT_COMPETENCIES_QUERY, GET_REPORT_CRITERIA_QUERY,
+    UPSERT_REPORTS_QUERY, UPSERT_REPORTS_TEMPLATE,
+)
+from app.services import jobs, reference_cache
+from app.services.downloads import send_stored_file
+
+FORMATS = ('html', 'pdf')
+TEMPLATE = 'reports/report_card.html'
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+
+
+class ReportError(ValueError):
+    """A batch that cannot be created or run; the message is shown to the admin."""
+
+
+# ==================================
+# Batches
+# ==================================
+
+def create_batch(cursor, term_label, term_start, term_end, report_format='html',
+                 class_id=None, created_by=None):
+    """Queue a batch (the caller commits); returns its id. Raises ReportError."""
+    term_label = (term_label or '').strip()
+    if not term_label:
+        raise ReportError("Please give the term a name.")
+    if len(term_label) > 50:
+        raise ReportError("The term name can be at most 50 characters.")
+    if not isinstance(term_start, date) or not isinstance(term_end, date):
+        raise ReportError("Please give the term's start and end dates.")
+    if term_end < term_start:
+        raise ReportError("The term cannot end before it starts.")
+    if report_format not in FORMATS:
+        raise ReportError("Unknown report format.")
+    if report_format == 'pdf' and importlib.util.find_spec('weasyprint') is None:
+        raise ReportError("PDF report cards need the weasyprint package; choose HTML instead.")
+    cursor.execute(INSERT_REPORT_BATCH_QUERY,
+                   (class_id, term_label, term_start, term_end, report_format, created_by))
+    return cursor.fetchone()[0]
+
+
+def get_batch(cursor, batch_id):
+    cursor.execute(GET_REPORT_BATCH_QUERY, (batch_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    (batch_id, class_id, class_name, teacher_id, term_label, term_start, term_end, report_format,
+     status, total, done, failed, error, created_at, started_at, finished_at) = row
+    return {
+        'batch_id': batch_id,
+        'class_id': class_id,
+        'class_name': class_name if class_id else 'Whole school',
+        'teacher_id': teacher_id,
+        'term_label': term_label,
+        'term_start': term_start,
+        'term_end': term_end,
+        'format': report_format,
+        'status': status,
+        'total': total,
+        'done': done,
+        'failed': failed,
+        'error': error,
+        'created_at': created_at,
+        'started_at': started_at,
+        'finished_at': finished_at,
+    }
+
+
+def batch_progress(batch):
+    """The JSON the admin page polls."""
+    progress = {key: batch[key] for key in ('batch_id', 'class_name', 'term_label', 'format',
+                                            'status', 'total', 'done', 'failed', 'error')}
+    progress['percent'] = round(100 * (batch['done'] + batch['failed']) / batch['total']) if batch['total'] else 0
+    for key in ('started_at', 'finished_at'):
+        progress[key] = batch[key].isoformat() if batch[key] else None
+    return progress
+
+
+# ==================================
+# Term aggregation (main process)
+# ==================================
+
+def _number(value):
+    return float(value) if value is not None else None
+
+
+def load_cards(cursor, student_ids, term_start, term_end, levels):
+    """The report card data of these students for the term, in student id order."""
+    cursor.execute(GET_REPORT_STUDENTS_QUERY, (student_ids,))
+    cards = {student_id: {
+        'student_id': student_id,
+        'name': f"{firstname} {lastname}",
+        'student_number': student_number,
+        'classes': classes or '',
+        'competencies': [],
+    } for student_id, firstname, lastname, student_number, classes in cursor.fetchall()}
+
+    cursor.execute(GET_REPORT_COMPETENCIES_QUERY, (student_ids, term_start, term_end))
+    competencies = {}
+    for student_id, competency_id, name, average, assessments, feedback in cursor.fetchall():
+        if student_id not in cards:
+            continue
+        average = _number(average)
+        competency = {
+            'name': name,
+            'average_score': average,
+            'level': reference_cache.level_name(levels, average),
+            'assessments': assessments,
+            'feedback': feedback,
+            'criteria': [],
+        }
+        competencies[(student_id, competency_id)] = competency
+        cards[student_id]['competencies'].append(competency)
+
+    cursor.execute(GET_REPORT_CRITERIA_QUERY, (student_ids, term_start, term_end))
+    for student_id, competency_id, name, average, ratings in cursor.fetchall():
+        competency = competencies.get((student_id, competency_id))
+        if competency is not None:
+            average = _number(average)
+            competency['criteria'].append({
+                'name': name,
+                'average_score': average,
+                'level': reference_cache.level_name(levels, average),
+                'ratings': ratings,
+            })
+
+    for card in cards.values():
+        scores = [c['average_score'] for c in card['competencies'] if c['average_score'] is not None]
+        card['overall_score'] = round(sum(scores) / len(scores), 1) if scores else None
+        card['overall_level'] = reference_cache.level_name(levels, card['overall_score'])
+    return [cards[student_id] for student_id in sorted(cards)]
+
+
+# ==================================
+# Rendering (pool processes)
+# ==================================
+
+_env = None
+
+
+def _environment():
+    # A plain jinja2 environment: pool processes have no Flask app
+    global _env
+    if _env is None:
+        _env = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=select_autoescape(['html']))
+    return _env
+
+
+def _write_atomic(path, data):
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+    try:
+        with os.fdopen(handle, 'wb') as output:
+            output.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def _render_cards(cards, term, out_dir, report_format):
+    """Render and store a chunk of cards: [(student_id, path, error), ...]."""
+    template = _environment().get_template(TEMPLATE)
+    if report_format == 'pdf':
+        from weasyprint import HTML  #type:ignore
+    results = []
+    for card in cards:
+        try:
+            html = template.render(card=card, term=term)
+            path = os.path.join(out_dir, f"{card['student_id']}.{report_format}")
+            if report_format == 'pdf':
+                data = HTML(string=html, base_url=TEMPLATE_DIR).write_pdf()
+            else:
+                data = html.encode('utf-8')
+            _write_atomic(path, data)
+            results.append((card['student_id'], path, None))
+        except Exception as e:
+            results.append((card['student_id'], None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+def _pool(workers):
+    """Render processes. Batches run on job-worker threads next to the
+    reference-cache listener and pooled libpq connections, and forking a
+    threaded process can deadlock the child: start them from a forkserver
+    (spawn where there is none) instead."""
+    if workers <= 0:
+        return _InlineExecutor()
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+class _InlineExecutor:
+    """REPORT_WORKERS=0: render in the calling thread."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+# ==================================
+# Running a batch
+# ==================================
+
+def report_dir(batch):
+    term = f"{batch['term_start']:%Y%m%d}-{batch['term_end']:%Y%m%d}"
+    return os.path.join(current_app.config['UPLOAD_ROOT'], 'reports', term, batch['format'])
+
+
+def download_name(term_label, report_format):
+    return f"{secure_filename(term_label or '') or 'report'}.{report_format}"
+
+
+def send_report(path, term_label, report_format):
+    """Download response for a stored card, or None when the file is gone."""
+    if not path or not os.path.exists(path):
+        return None
+    return send_stored_file(path, download_name(term_label, report_format))
+
+
+def _record(conn, batch, results):
+    """Store a finished chunk: its Reports rows and the batch counters."""
+    rows = [(student_id, batch['teacher_id'], path, batch['term_label'], batch['term_start'],
+             batch['term_end'], batch['format'], batch['batch_id'])
+            for student_id, path, error in results if error is None]
+    errors = [f"student {student_id}: {error}" for student_id, path, error in results if error is not None]
+    with conn.cursor() as cursor:
+        if rows:
+            execute_values(cursor, UPSERT_REPORTS_QUERY, rows,
+                           template=UPSERT_REPORTS_TEMPLATE, page_size=len(rows))
+        cursor.execute(REPORT_BATCH_PROGRESS_QUERY, (len(rows), len(errors), batch['batch_id']))
+    conn.commit()
+    for error in errors:
+        print(f"Report batch {batch['batch_id']}: {error}")
+    return errors
+
+
+def run_batch(conn, batch_id, job_id=None, force=False):
+    """Generate every card of a queued (or failed) batch; returns the finished
+    batch. Raises ReportError when the batch is missing, running or done.
+
+    A batch left 'running' by a dead process is picked up again by its own
+    job (``job_id``), or by any caller with ``force``."""
+    config = current_app.config
+    with conn.cursor() as cursor:
+        batch = get_batch(cursor, batch_id)
+        if batch is None:
+            raise ReportError(f"Report batch {batch_id} does not exist.")
+        if batch['class_id']:
+            cursor.execute(GET_CLASS_REPORT_STUDENTS_QUERY, (batch['class_id'],))
+        else:
+            cursor.execute(GET_SCHOOL_REPORT_STUDENTS_QUERY)
+        student_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute(START_REPORT_BATCH_QUERY, (len(student_ids), job_id, batch_id, job_id, force))
+        if cursor.fetchone() is None:
+            conn.rollback()
+            raise ReportError(f"Report batch {batch_id} is already {batch['status']}.")
+        levels = reference_cache.performance_levels(cursor)
+    conn.commit()
+
+    out_dir = report_dir(batch)
+    term = {key: batch[key] for key in ('term_label', 'term_start', 'term_end')}
+    term['generated_on'] = date.today()
+    chunk_size = max(1, config['REPORT_CHUNK_SIZE'])
+    workers = config['REPORT_WORKERS']
+    errors = []
+    executor = _pool(workers)
+    try:
+        os.makedirs(out_dir, exist_ok=True)
+        # Keep a couple of chunks per worker in flight: aggregation of the next
+        # chunk overlaps rendering, and memory stays bounded for a whole school
+        in_flight = set()
+        limit = max(1, workers) * 2
+        for start in range(0, len(student_ids), chunk_size):
+            with conn.cursor() as cursor:
+                cards = load_cards(cursor, student_ids[start:start + chunk_size],
+                                   batch['term_start'], batch['term_end'], levels)
+            conn.rollback()   # read-only; don't sit idle in a transaction
+            in_flight.add(executor.submit(_render_cards, cards, term, out_dir, batch['format']))
+            if len(in_flight) >= limit:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    errors += _record(conn, batch, future.result())
+        for future in wait(in_flight).done:
+            errors += _record(conn, batch, future.result())
+    except Exception as e:
+        conn.rollback()
+        executor.shutdown(wait=False, cancel_futures=True)
+        with conn.cursor() as cursor:
+            cursor.execute(FINISH_REPORT_BATCH_QUERY, ('failed', f"{type(e).__name__}: {e}", batch_id))
+        conn.commit()
+        raise
+    executor.shutdown()
+
+    error = None
+    if errors:
+        error = f"{len(errors)} report card(s) failed; first: {errors[0]}"
+    status = 'failed' if student_ids and len(errors) == len(student_ids) else 'done'
+    with conn.cursor() as cursor:
+        cursor.execute(FINISH_REPORT_BATCH_QUERY, (status, error, batch_id))
+        batch = get_batch(cursor, batch_id)
+    conn.commit()
+    return batch
+
+
+@jobs.handler('report_batch')
+def run_batch_job(conn, payload, job_id):
+    try:
+        batch = run_batch(conn, payload['batch_id'], job_id=job_id)
+    except ReportError as e:
+        raise jobs.JobFailed(str(e))
+    return batch_progress(batch)
+
+
+# ==================================
+# Command line
+# ==================================
+
+def _date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate term report cards.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    generate = sub.add_parser('generate', help='create a batch and run it now')
+    generate.add_argument('--term', required=True, help='term name shown on the cards')
+    generate.add_argument('--start', required=True, type=_date, help='first day of the term (YYYY-MM-DD)')
+    generate.add_argument('--end', required=True, type=_date, help='last day of the term (YYYY-MM-DD)')
+    generate.add_argument('--class-id', type=int, help='one class (default: the whole school)')
+    generate.add_argument('--format', choices=FORMATS, default='html')
+    run = sub.add_parser('run', help='run a queued batch')
+    run.add_argument('batch_id', type=int)
+    run.add_argument('--force', action='store_true',
+                     help='take over a batch left running by a process that died')
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.database import get_db_connection
+
+    with create_app().app_context():
+        conn = get_db_connection()
+        try:
+            if args.command == 'generate':
+                with conn.cursor() as cursor:
+                    batch_id = create_batch(cursor, args.term, args.start, args.end, args.format,
+                                            class_id=args.class_id)
+                conn.commit()
+            else:
+                batch_id = args.batch_id
+            batch = run_batch(conn, batch_id, force=args.command == 'run' and args.force)
+            print(f"Report batch {batch_id} {batch['status']}: {batch['done']} of {batch['total']} "
+                  f"cards written to {report_dir(batch)}, {batch['failed']} failed")
+            if batch['error']:
+                print(batch['error'])
+        except ReportError as e:
+            parser.exit(1, f"{e}\n")
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+# app/services/resumable_uploads.py
+"""Resumable, chunked uploads for large project submissions.
+
+Protocol (routes in app/routes/student_routes.py):
+
+1. POST   .../upload-project/<task_id>/resumable   {"filename", "size"}
+          -> {"upload_id", "offset": 0, "chunk_size", "upload_url"}
+2. PUT    .../resumable/<upload_id>?offset=N       raw bytes of the next chunk
+          -> {"offset": N + len(chunk)}; 409 with the real offset on a mismatch
+   GET    .../resumable/<upload_id>                -> {"offset", "size"} to resume
+3. POST   .../resumable/<upload_id>/finalize       -> stores the submission
+
+State lives on disk under UPLOAD_ROOT/.resumable/<upload_id>/: state.json
+(owner, task, name, declared size) and data.part. The offset is simply the
+size of data.part, so an interrupted chunk resumes from the last byte that
+reached disk. Nothing touches the database until finalize, which hashes the
+assembled file and hands it to the normal submission path.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import secrets
+import shutil
+import time
+
+from flask import current_app
+
+STATE_FILE = 'state.json'
+DATA_FILE = 'data.part'
+
+
+class UploadError(ValueError):
+    """Client-side protocol error; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def _root():
+    path = os.path.join(current_app.config['UPLOAD_ROOT'], '.resumable')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class ResumableUpload:
+    """One in-progress upload. Quacks like uploads.IncomingFile for blob_store.store_file()."""
+
+    def __init__(self, upload_id, state):
+        self.upload_id = upload_id
+        self.dir = os.path.join(_root(), upload_id)
+        self.path = os.path.join(self.dir, DATA_FILE)
+        self.state = state
+        self.filename = state['filename']
+        self.sha256 = None
+
+    # ----- lifecycle -----
+
+    @classmethod
+    def create(cls, student_id, task_id, filename, size):
+        if not filename:
+            raise UploadError("filename is required")
+        if not isinstance(size, int) or size <= 0:
+            raise UploadError("size must be a positive number of bytes")
+        if size > current_app.config['UPLOAD_MAX_BYTES']:
+            raise UploadError("File is too large", status=413)
+        sweep_expired()
+
+        upload_id = secrets.token_urlsafe(16)
+        state = {
+            'student_id': student_id,
+            'task_id': task_id,
+            'filename': filename,
+            'size': size,
+            'created': time.time(),
+        }
+        upload = cls(upload_id, state)
+        os.makedirs(upload.dir)
+        open(upload.path, 'wb').close()
+        upload._save_state()
+        return upload
+
+    @classmethod
+    def load(cls, upload_id, student_id):
+        """The caller's upload, or UploadError(404) for unknown / foreign ids."""
+        if not upload_id or not all(c.isalnum() or c in '-_' for c in upload_id):
+            raise UploadError("Unknown upload", status=404)
+        state_path = os.path.join(_root(), upload_id, STATE_FILE)
+        try:
+            with open(state_path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            raise UploadError("Unknown upload", status=404)
+        if state['student_id'] != student_id:
+            raise UploadError("Unknown upload", status=404)
+        return cls(upload_id, state)
+
+    def _save_state(self):
+        tmp = os.path.join(self.dir, STATE_FILE + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.dir, STATE_FILE))
+
+    # ----- chunks -----
+
+    @property
+    def size(self):
+        return self.state['size']
+
+    @property
+    def offset(self):
+        return os.path.getsize(self.path)
+
+    @property
+    def complete(self):
+        return self.offset == self.size
+
+    def write_chunk(self, offset, stream, content_length=None):
+        """Append the request body at ``offset`` (must equal the current one).
+
+        The part file is locked for the whole write, and the offset is read
+        under the lock, so two PUTs for the same offset (a client retrying
+        while its first request is still running) cannot both append.
+        """
+        chunk_bytes = current_app.config['UPLOAD_CHUNK_BYTES']
+        with open(self.path, 'r+b') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            current = os.fstat(f.fileno()).st_size
+            if offset != current:
+                raise UploadError("Offset mismatch", status=409, offset=current)
+            if content_length is not None and current + content_length > self.size:
+                raise UploadError("Chunk runs past the declared size", status=413, offset=current)
+
+            f.seek(current)
+            written = current
+            while True:
+                data = stream.read(chunk_bytes)
+                if not data:
+                    break
+                if written + len(data) > self.size:
+                    f.truncate(current)
+                    raise UploadError("Chunk runs past the declared size", status=413, offset=current)
+                f.write(data)
+                written += len(data)
+            f.flush()
+            os.fsync(f.fileno())
+        return written
+
+    # ----- finalize (store_file protocol) -----
+
+    def compute_hash(self):
+        digest = hashlib.sha256()
+        chunk_bytes = current_app.config['UPLOAD_CHUNK_BYTES']
+        with open(self.path, 'rb') as f:
+            for block in iter(lambda: f.read(chunk_bytes), b''):
+                digest.update(block)
+        self.sha256 = digest.hexdigest()
+        return self.sha256
+
+    def finish(self):
+        # Every chunk was fsynced as it was written
+        pass
+
+    def discard(self):
+        """Drop the session directory (the stored blob is a separate link)."""
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def _last_activity(path):
+    """Newest mtime of an upload's files. Chunks are appended to data.part in
+    place, which does not touch the directory's own mtime."""
+    times = [os.path.getmtime(path)]
+    for name in (DATA_FILE, STATE_FILE):
+        try:
+            times.append(os.path.getmtime(os.path.join(path, name)))
+        except FileNotFoundError:
+            pass
+    return max(times)
+
+
+def sweep_expired():
+    """Remove uploads idle for longer than RESUMABLE_UPLOAD_TTL_HOURS."""
+    cutoff = time.time() - current_app.config['RESUMABLE_UPLOAD_TTL_HOURS'] * 3600
+    root = _root()
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if _last_activity(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,77 @@
+# app/services/student_dashboard.py
+"""Student dashboard data: one statement, cached per student.
+
+get_dashboard() runs STUDENT_DASHBOARD_QUERY (name, task / project /
+competency counts and the latest three projects in one round trip) and keeps
+the result in this worker process for STUDENT_DASHBOARD_TTL seconds, for at
+most STUDENT_DASHBOARD_CACHE_SIZE students (least recently used go first).
+
+invalidate(student_id, ...) is called once the student's own upload or an
+assessment has committed. It drops the local entries and, when the student is the one
+logged in, stamps their session: the stamp travels with the cookie, so the
+next dashboard view reloads even when another worker serves it. Other
+processes' copies (e.g. after a teacher assessed) age out with the TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_request_context, session
+
+from app.queries.student_queries import STUDENT_DASHBOARD_QUERY
+
+SESSION_STAMP = 'dashboard_changed_at'
+
+_lock = threading.Lock()
+_entries = OrderedDict()   # student_id -> (data, loaded_at, expires)
+
+
+def load(cursor, student_id):
+    """Run the dashboard query, bypassing the cache."""
+    cursor.execute(STUDENT_DASHBOARD_QUERY, {'student_id': student_id})
+    rows = cursor.fetchall()
+    first = rows[0]
+    firstname, lastname = first[0], first[1]
+    return {
+        'student_name': f"{firstname} {lastname}" if firstname is not None else "Student",
+        'task_count': first[2],
+        'project_count': first[3],
+        'competencies_count': first[4],
+        'latest_projects': [tuple(row[5:8]) for row in rows if row[5] is not None],
+    }
+
+
+def get_dashboard(cursor, student_id):
+    """{'student_name', 'task_count', 'project_count', 'competencies_count',
+    'latest_projects'} for the dashboard template."""
+    changed_at = session.get(SESSION_STAMP, 0.0) if has_request_context() else 0.0
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(student_id)
+        if entry is not None and now < entry[2] and entry[1] >= changed_at:
+            _entries.move_to_end(student_id)
+            return dict(entry[0])
+
+    loaded_at = time.time()
+    data = load(cursor, student_id)
+    config = current_app.config
+    with _lock:
+        _entries[student_id] = (data, loaded_at, now + config['STUDENT_DASHBOARD_TTL'])
+        _entries.move_to_end(student_id)
+        while len(_entries) > config['STUDENT_DASHBOARD_CACHE_SIZE']:
+            _entries.popitem(last=False)
+    return dict(data)
+
+
+def invalidate(*student_ids):
+    """Forget the cached dashboards of these students."""
+    with _lock:
+        for student_id in student_ids:
+            _entries.pop(student_id, None)
+    if has_request_context() and session.get('student_id') in student_ids:
+        session[SESSION_STAMP] = time.time()
+
+
+def clear():
+    with _lock:
+        _entries.clear()
@@ -0,0 +1,45 @@
+# app/services/task_status.py
+"""Upkeep for the precomputed student task status (migrations/009).
+
+student_tasks.status follows submissions and due date changes through
+triggers; the one thing no write announces is a due date passing. sweep()
+marks those rows overdue and is meant to run shortly after midnight:
+
+    python -m app.services.task_status sweep
+
+Readers already show a Pending row past its due date as Overdue, so running
+the sweep late only delays the stored value, never what students see.
+"""
+import argparse
+
+from app.queries.assignment_queries import SWEEP_OVERDUE_QUERY
+
+
+def sweep(conn):
+    """Mark every row whose due date has passed as overdue; returns the count."""
+    with conn.cursor() as cursor:
+        cursor.execute(SWEEP_OVERDUE_QUERY)
+        updated = cursor.rowcount
+    conn.commit()
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain the precomputed student task status.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('sweep', help='mark tasks whose due date has passed as overdue')
+    parser.parse_args()
+
+    from app import create_app
+    from app.database import get_db_connection
+
+    with create_app().app_context():
+        conn = get_db_connection()
+        try:
+            print(f"Marked {sweep(conn)} student tasks overdue")
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+# app/services/uploads.py
+"""Streaming receipt of project uploads.
+
+Uploads are written to a temporary file under UPLOAD_ROOT/.incoming as the
+bytes arrive, in fixed-size chunks, while their size and SHA-256 are computed
+on the fly. Nothing is buffered in memory and no database connection is held
+while the client is sending. The size limit (UPLOAD_MAX_BYTES) is enforced
+from the Content-Length header when there is one and again on every chunk.
+
+Two ways in:
+* multipart form posts (the upload page): StreamingRequest hands Werkzeug's
+  form parser an IncomingFile instead of its spooled temporary file;
+* a raw request body (Content-Type: application/octet-stream, file name in
+  the X-File-Name header), read with receive_stream().
+
+Once the file is complete, blob_store.store_file() fsyncs it and links it
+into the content-addressed store, so the caller can open its transaction
+knowing the file is on disk.
+"""
+import hashlib
+import os
+import tempfile
+
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+
+
+def incoming_dir():
+    path = os.path.join(current_app.config['UPLOAD_ROOT'], '.incoming')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+# Allowance for multipart boundaries / other form fields around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def check_content_length(content_length, overhead=0):
+    """Refuse an oversized upload before reading any of it."""
+    if content_length is not None and content_length > current_app.config['UPLOAD_MAX_BYTES'] + overhead:
+        raise RequestEntityTooLarge()
+
+
+class IncomingFile:
+    """Writable temporary file that tracks size and SHA-256 as it is written."""
+
+    def __init__(self, filename=None, max_bytes=None):
+        fd, self.path = tempfile.mkstemp(dir=incoming_dir(), prefix='upload-')
+        self._file = os.fdopen(fd, 'w+b')
+        self._hash = hashlib.sha256()
+        self.filename = filename
+        self.size = 0
+        self.finished = False
+        self.max_bytes = max_bytes if max_bytes is not None else current_app.config['UPLOAD_MAX_BYTES']
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.discard()
+            raise RequestEntityTooLarge()
+        self._hash.update(data)
+        return self._file.write(data)
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    # Werkzeug's form parser rewinds / reads the stream it was given, and
+    # readers such as io.TextIOWrapper (CSV import) want the io protocol
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def read(self, *args):
+        return self._file.read(*args)
+
+    def readinto(self, buffer):
+        return self._file.readinto(buffer)
+
+    def readline(self, *args):
+        return self._file.readline(*args)
+
+    def tell(self):
+        return self._file.tell()
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        # Werkzeug closes request files at the end of the request: an upload
+        # that was never finished (rejected, client gone) is removed then
+        if not self.finished:
+            self.discard()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def finish(self):
+        """Flush and fsync; after this the bytes survive a crash."""
+        if not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+        self.finished = True
+
+    def discard(self):
+        self._file.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class StreamingRequest(Request):
+    """Request class whose file parts stream straight into IncomingFile."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        check_content_length(content_length)
+        return IncomingFile(filename)
+
+
+def received_file(file_storage):
+    """The IncomingFile behind a request.files entry (StreamingRequest)."""
+    stream = file_storage.stream
+    return stream if isinstance(stream, IncomingFile) else None
+
+
+def receive_stream(stream, filename, content_length=None):
+    """Copy a raw request body to an IncomingFile in UPLOAD_CHUNK_BYTES reads."""
+    check_content_length(content_length)
+    incoming = IncomingFile(filename)
+    chunk_bytes = current_app.config['UPLOAD_CHUNK_BYTES']
+    try:
+        while True:
+            chunk = stream.read(chunk_bytes)
+            if not chunk:
+                break
+            incoming.write(chunk)
+    except BaseException:
+        incoming.discard()
+        raise
+    return incoming
+
+
+def fsync_dir(path):
+    """Make a rename / link in ``path`` durable."""
+    if hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -0,0 +1,92 @@
+// static/js/progress_charts.js
+// Competency progress charts (student progress charts, parent dashboard).
+// Every .progress-charts element loads its series from data-url and draws
+// one line per competency (monthly mean score) with a latest-level summary.
+// Without Chart.js (e.g. offline) only the summary table is shown.
+(function () {
+    function summaryTable(data) {
+        var table = document.createElement('table');
+        table.className = 'progress-summary';
+        table.innerHTML = '<thead><tr><th>Competency</th><th>Latest score</th><th>Level</th>' +
+                          '<th>Assessments</th></tr></thead>';
+        var body = document.createElement('tbody');
+        data.competencies.forEach(function (competency) {
+            var row = document.createElement('tr');
+            var total = competency.assessments.reduce(function (sum, count) { return sum + count; }, 0);
+            [competency.competency,
+             competency.latest_score === null ? '–' : competency.latest_score,
+             competency.latest_level || '–',
+             total].forEach(function (value) {
+                var cell = document.createElement('td');
+                cell.textContent = value;
+                row.appendChild(cell);
+            });
+            body.appendChild(row);
+        });
+        table.appendChild(body);
+        return table;
+    }
+
+    function drawChart(container, data) {
+        var canvas = document.createElement('canvas');
+        container.appendChild(canvas);
+        new window.Chart(canvas, {
+            type: 'line',
+            data: {
+                labels: data.months,
+                datasets: data.competencies.map(function (competency) {
+                    return {
+                        label: competency.competency,
+                        data: competency.mean,
+                        spanGaps: true,
+                        tension: 0.25
+                    };
+                })
+            },
+            options: {
+                responsive: true,
+                scales: {y: {suggestedMin: 0, suggestedMax: 100, title: {display: true, text: 'Mean score'}}},
+                plugins: {
+                    tooltip: {
+                        callbacks: {
+                            afterLabel: function (item) {
+                                var competency = data.competencies[item.datasetIndex];
+                                var index = item.dataIndex;
+                                return 'min ' + competency.min[index] + ', max ' + competency.max[index] +
+                                       ' (' + competency.assessments[index] + ' assessed)';
+                            }
+                        }
+                    }
+                }
+            }
+        });
+    }
+
+    function load(container) {
+        fetch(container.dataset.url, {headers: {'Accept': 'application/json'}})
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                return response.json();
+            })
+            .then(function (data) {
+                container.textContent = '';
+                if (!data.competencies.length) {
+                    container.textContent = 'No competencies have been assessed in this period yet.';
+                    return;
+                }
+                if (window.Chart) {
+                    drawChart(container, data);
+                }
+                container.appendChild(summaryTable(data));
+            })
+            .catch(function () {
+                container.textContent = 'Progress charts could not be loaded.';
+            });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('.progress-charts').forEach(load);
+    });
+})();
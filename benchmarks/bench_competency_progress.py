@@ -0,0 +1,141 @@
+"""Progress chart series: aggregating competency_assessments + criteria_ratings
++ performance per view vs reading the competency_monthly rollup (migration 012),
+and what the rollup triggers add to saving a batch of assessments.
+
+Seeds the bench_indexes dataset, spreads the assessments over the last year
+with varied scores, applies migrations 001 and 012 and reports the median
+execution time per statement:
+
+    python -m benchmarks.bench_competency_progress --reset
+    python -m benchmarks.bench_competency_progress --skip-seed --repeat 9
+
+Like bench_indexes this truncates every CBC table, so only point it at a
+scratch database.
+"""
+import argparse
+
+from app.queries.analytics_queries import GET_COMPETENCY_SERIES_QUERY
+from app.services.competency_analytics import month_range
+from benchmarks.bench_indexes import seed, explain_ms
+from migrations.migrate import connect, read_migration
+
+MIGRATIONS = ('001_hot_lookup_indexes.sql', '012_competency_monthly.sql')
+MONTHS = 12
+
+SPREAD_ASSESSMENTS_SQL = """
+    UPDATE competency_assessments
+    SET assessed_at = NOW() - random() * INTERVAL '365 days',
+        overall_score = round((25 + random() * 75)::numeric, 2)
+"""
+
+# The chart series computed live on every view
+LIVE_SERIES_QUERY = """
+    WITH monthly AS (
+        SELECT ca.competency_id, date_trunc('month', ca.assessed_at)::date AS month,
+               AVG(ca.overall_score) AS mean_score, MIN(ca.overall_score) AS min_score,
+               MAX(ca.overall_score) AS max_score, COUNT(*) AS assessments,
+               (ARRAY_AGG(ca.assessment_id ORDER BY ca.assessed_at DESC))[1] AS latest_id
+        FROM competency_assessments ca
+        WHERE ca.student_id = %(student_id)s AND ca.assessed_at >= %(from_month)s
+        GROUP BY ca.competency_id, date_trunc('month', ca.assessed_at)::date
+    )
+    SELECT m.competency_id, c.competencyname, m.month, m.mean_score, m.min_score, m.max_score,
+           m.assessments,
+           (SELECT pl.levelname FROM criteria_ratings cr
+            JOIN performance pl ON pl.performancelevelid = cr.performance_level_id
+            WHERE cr.assessment_id = m.latest_id
+            GROUP BY pl.levelname ORDER BY COUNT(*) DESC, pl.levelname LIMIT 1) AS latest_level
+    FROM monthly m
+    JOIN competencies c ON c.competencyid = m.competency_id
+    ORDER BY c.competencyname, m.competency_id, m.month
+"""
+
+# Re-saving a class's assessments for one task, as save_assessments upserts them
+RESAVE_SQL = """
+    UPDATE competency_assessments SET overall_score = overall_score, assessed_at = NOW()
+    WHERE assessment_id = ANY(%(assessment_ids)s)
+"""
+
+
+def prepare(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(SPREAD_ASSESSMENTS_SQL)
+        for name in MIGRATIONS:
+            cursor.execute(read_migration(name))
+        cursor.execute("ANALYZE")
+    conn.commit()
+
+
+def sample(conn, batch):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT student_id FROM competency_assessments
+            GROUP BY student_id ORDER BY COUNT(*) DESC, student_id LIMIT 1
+        """)
+        student_id = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT array_agg(assessment_id) FROM (
+                SELECT assessment_id FROM competency_assessments
+                WHERE task_id = (SELECT task_id FROM competency_assessments
+                                 GROUP BY task_id ORDER BY COUNT(*) DESC LIMIT 1)
+                LIMIT %s
+            ) batch
+        """, (batch,))
+        assessment_ids = cursor.fetchone()[0] or []
+    return {'student_id': student_id, 'from_month': month_range(MONTHS)[0], 'assessment_ids': assessment_ids}
+
+
+def resave_ms(conn, params, repeat, triggers):
+    with conn.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE competency_assessments {'ENABLE' if triggers else 'DISABLE'} TRIGGER USER")
+    conn.commit()
+    try:
+        return explain_ms(conn, RESAVE_SQL, params, repeat)
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute("ALTER TABLE competency_assessments ENABLE TRIGGER USER")
+        conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the competency progress rollup on a seeded scratch database.')
+    parser.add_argument('--reset', action='store_true', help='required: truncates every CBC table before seeding')
+    parser.add_argument('--skip-seed', action='store_true', help='reuse data from a previous run')
+    parser.add_argument('--teachers', type=int, default=50)
+    parser.add_argument('--parents', type=int, default=2000)
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--tasks-per-teacher', type=int, default=200)
+    parser.add_argument('--submit-ratio', type=float, default=0.9)
+    parser.add_argument('--batch', type=int, default=40, help='assessments saved together')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if not args.reset and not args.skip_seed:
+        parser.error('this truncates all CBC tables; pass --reset to confirm (or --skip-seed)')
+
+    conn = connect()
+    try:
+        if not args.skip_seed:
+            seed(conn, args)
+            prepare(conn)
+        params = sample(conn, args.batch)
+        live = explain_ms(conn, LIVE_SERIES_QUERY, params, args.repeat)
+        rollup = explain_ms(conn, GET_COMPETENCY_SERIES_QUERY, (params['student_id'], params['from_month']),
+                            args.repeat)
+        without_triggers = resave_ms(conn, params, args.repeat, triggers=False)
+        with_triggers = resave_ms(conn, params, args.repeat, triggers=True)
+    finally:
+        conn.close()
+
+    series = f"{MONTHS}-month series for one student"
+    print(f"\n{series:44} {'ms':>10}")
+    print(f"  {'live aggregate':42} {live:10.3f}")
+    print(f"  {'competency_monthly':42} {rollup:10.3f}")
+    saved = f"saving {len(params['assessment_ids'])} assessments"
+    print(f"\n{saved:44} {'ms':>10}")
+    print(f"  {'without rollup triggers':42} {without_triggers:10.3f}")
+    print(f"  {'with rollup triggers':42} {with_triggers:10.3f}")
+
+
+if __name__ == '__main__':
+    main()
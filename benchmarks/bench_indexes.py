@@ -0,0 +1,280 @@
+"""Seed a district-scale dataset and compare dashboard query plans before/after
+migrations/001_hot_lookup_indexes.sql.
+
+Run against a SCRATCH database that already has CREATE_TABLES_SQL.sql applied.
+All CBC tables are truncated first, so --reset is required:
+
+    python -m benchmarks.bench_indexes --reset
+    python -m benchmarks.bench_indexes --reset --students 50000 --repeat 7
+
+Connection settings come from .env (DB_HOST, DB_NAME, ...), like the app.
+"""
+import argparse
+import json
+import re
+import statistics
+import time
+
+from migrations.migrate import connect, read_migration
+
+INDEX_MIGRATION = '001_hot_lookup_indexes.sql'
+
+SEED_TABLES = [
+    'criteria_ratings', 'competency_assessments', 'projects', 'taskassignments',
+    'task_competencies', 'tasks', 'groupmembers', 'studentgroups', 'class_students',
+    'classes', 'reports', 'students', 'parents', 'teachers', 'rubric', 'criteria',
+    'performance', 'competencies', 'users',
+]
+
+# One class and one group set per teacher; every task goes to one class and is
+# fanned out to per-student assignment rows like create_task does.
+SEED_SQL = """
+INSERT INTO roles (roleid, rolename) VALUES (1, 'student'), (2, 'teacher'), (3, 'parent'), (4, 'admin')
+ON CONFLICT DO NOTHING;
+
+INSERT INTO users (firstname, lastname, email, phone, passwordhash, roleid, is_active)
+SELECT 'Teacher', 'T' || i, 'teacher' || i || '@bench.local', 't' || i, 'x', 2, TRUE
+FROM generate_series(1, {teachers}) i;
+INSERT INTO teachers (userid, hiredate)
+SELECT userid, CURRENT_DATE - 365 FROM users WHERE roleid = 2 ORDER BY userid;
+
+INSERT INTO users (firstname, lastname, email, phone, passwordhash, roleid, is_active, email_token, reset_token)
+SELECT 'Parent', 'P' || i, 'parent' || i || '@bench.local', 'p' || i, 'x', 3, TRUE,
+       CASE WHEN i % 10 = 0 THEN md5('e' || i) END,
+       CASE WHEN i % 20 = 0 THEN md5('r' || i) END
+FROM generate_series(1, {parents}) i;
+INSERT INTO parents (userid) SELECT userid FROM users WHERE roleid = 3 ORDER BY userid;
+
+INSERT INTO users (firstname, lastname, email, phone, passwordhash, roleid, is_active)
+SELECT 'Student', 'S' || i, 'student' || i || '@bench.local', 's' || i, 'x', 1, TRUE
+FROM generate_series(1, {students}) i;
+INSERT INTO students (userid, parentid, studentnumber, registrationdate)
+SELECT u.userid, 1 + (row_number() OVER (ORDER BY u.userid) % {parents}), 'ADM' || u.userid, CURRENT_DATE - 200
+FROM users u WHERE u.roleid = 1;
+
+INSERT INTO classes (teacherid, classname, academicyear)
+SELECT i, 'Class ' || i, '2026' FROM generate_series(1, {teachers}) i;
+INSERT INTO class_students (classid, studentid)
+SELECT 1 + ((studentid - 1) % {teachers}), studentid FROM students;
+
+INSERT INTO studentgroups (groupname, teacherid)
+SELECT 'Group ' || i, 1 + ((i - 1) % {teachers}) FROM generate_series(1, {students} / 5) i;
+INSERT INTO groupmembers (groupid, studentid)
+SELECT 1 + ((studentid - 1) / 5), studentid FROM students WHERE studentid <= ({students} / 5) * 5;
+
+INSERT INTO competencies (competencyname, competencydescription)
+SELECT 'Competency ' || i, 'bench' FROM generate_series(1, 8) i;
+INSERT INTO criteria (competencyid, criterianame, criteriadescription)
+SELECT 1 + ((i - 1) / 4), 'Criterion ' || i, 'bench' FROM generate_series(1, 32) i;
+INSERT INTO performance (levelname, leveldescription, scorevalue)
+VALUES ('Exceeds', 'bench', 100), ('Meets', 'bench', 75), ('Approaches', 'bench', 50), ('Below', 'bench', 25);
+
+INSERT INTO tasks (teacherid, title, taskdescription, duedate)
+SELECT 1 + ((i - 1) % {teachers}), 'Task ' || i, 'bench', CURRENT_DATE + (i % 60) - 30
+FROM generate_series(1, {teachers} * {tasks_per_teacher}) i;
+INSERT INTO task_competencies (taskid, competencyid)
+SELECT taskid, 1 + (taskid % 8) FROM tasks;
+
+INSERT INTO taskassignments (taskid, classid)
+SELECT taskid, teacherid FROM tasks;
+INSERT INTO taskassignments (taskid, studentid)
+SELECT ta.taskid, cs.studentid
+FROM taskassignments ta JOIN class_students cs ON cs.classid = ta.classid;
+
+INSERT INTO projects (taskid, studentid, submitter_id, file_name, projectfilepath,
+                      is_late, file_size, file_type, submission_time, is_assessed)
+SELECT ta.taskid, ta.studentid, ta.studentid, 'task_' || ta.taskid || '.pdf',
+       'projects/by_student/' || ta.studentid || '/task_' || ta.taskid || '.pdf',
+       random() < 0.1, 100000, 'pdf', NOW() - (random() * INTERVAL '90 days'), random() < 0.5
+FROM taskassignments ta
+WHERE ta.studentid IS NOT NULL AND random() < {submit_ratio};
+
+INSERT INTO competency_assessments (student_id, task_id, competency_id, overall_score, feedback)
+SELECT p.studentid, p.taskid, tc.competencyid, 75, 'bench'
+FROM projects p JOIN task_competencies tc ON tc.taskid = p.taskid
+WHERE p.is_assessed;
+INSERT INTO criteria_ratings (assessment_id, criteria_id, performance_level_id)
+SELECT ca.assessment_id, c.criteriaid, 1 + (ca.assessment_id + c.criteriaid) % 4
+FROM competency_assessments ca JOIN criteria c ON c.competencyid = ca.competency_id;
+"""
+
+# (label, sql, params) -- params are filled from sample ids picked after seeding
+DASHBOARD_QUERIES = [
+    ('teacher.view_classes', """
+        SELECT c.classid, c.classname, COUNT(cs.studentid)
+        FROM classes c LEFT JOIN class_students cs ON c.classid = cs.classid
+        WHERE c.teacherid = %(teacher_id)s GROUP BY c.classid ORDER BY c.classname
+    """),
+    ('teacher.manage_tasks', """
+        SELECT t.taskid, COUNT(DISTINCT ta.assignmentid), COUNT(DISTINCT p.projectid),
+               STRING_AGG(DISTINCT c.competencyname, ', ')
+        FROM tasks t
+        LEFT JOIN taskassignments ta ON t.taskid = ta.taskid
+        LEFT JOIN projects p ON t.taskid = p.taskid AND p.submission_time IS NOT NULL
+        LEFT JOIN task_competencies tc ON t.taskid = tc.taskid
+        LEFT JOIN competencies c ON tc.competencyid = c.competencyid
+        WHERE t.teacherid = %(teacher_id)s
+        GROUP BY t.taskid
+    """),
+    ('teacher.view_submissions', """
+        SELECT p.projectid, t.title, p.submission_time,
+               EXISTS (SELECT 1 FROM competency_assessments ca
+                       WHERE ca.task_id = t.taskid AND ca.student_id = p.submitter_id)
+        FROM projects p JOIN tasks t ON p.taskid = t.taskid
+        WHERE t.teacherid = %(teacher_id)s AND p.submission_time IS NOT NULL
+        ORDER BY p.submission_time DESC
+    """),
+    ('student.dashboard.task_count', """
+        SELECT COUNT(DISTINCT t.taskid)
+        FROM tasks t JOIN taskassignments ta ON t.taskid = ta.taskid
+        WHERE ta.studentid = %(student_id)s
+           OR ta.classid IN (SELECT classid FROM class_students WHERE studentid = %(student_id)s)
+           OR ta.groupid IN (SELECT groupid FROM groupmembers WHERE studentid = %(student_id)s)
+    """),
+    ('student.dashboard.latest_projects', """
+        SELECT t.title, p.submission_time, p.file_type
+        FROM projects p JOIN tasks t ON p.taskid = t.taskid
+        WHERE p.studentid = %(student_id)s OR p.submitter_id = %(student_id)s
+        ORDER BY p.submission_time DESC LIMIT 3
+    """),
+    ('student.tasks', """
+        SELECT t.taskid, t.title, p.projectid
+        FROM tasks t JOIN taskassignments ta ON t.taskid = ta.taskid
+        LEFT JOIN projects p ON t.taskid = p.taskid AND p.studentid = %(student_id)s
+        WHERE ta.studentid = %(student_id)s
+    """),
+    ('student.upload_project.existing', """
+        SELECT 1 FROM projects WHERE taskid = %(task_id)s AND studentid = %(student_id)s LIMIT 1
+    """),
+    ('student.competency_results', """
+        SELECT ca.assessment_id, ca.overall_score, ca.assessed_at
+        FROM competency_assessments ca WHERE ca.student_id = %(student_id)s
+        ORDER BY ca.assessed_at DESC
+    """),
+    ('criteria_feedback.ratings', """
+        SELECT cr.criteria_id, cr.performance_level_id FROM criteria_ratings cr
+        WHERE cr.assessment_id = %(assessment_id)s ORDER BY cr.criteria_id
+    """),
+    ('parent.children', """
+        SELECT s.studentid, u.firstname FROM students s JOIN users u ON s.userid = u.userid
+        WHERE s.parentid = %(parent_id)s ORDER BY u.firstname
+    """),
+    ('auth.verify_email_token', """
+        SELECT UserID, token_expiry FROM Users WHERE email_token = %(email_token)s
+    """),
+    ('auth.reset_password_token', """
+        SELECT UserID, reset_expiry FROM Users WHERE reset_token = %(reset_token)s
+    """),
+]
+
+
+def seed(conn, args):
+    started = time.perf_counter()
+    with conn.cursor() as cursor:
+        cursor.execute(f"TRUNCATE {', '.join(SEED_TABLES)} RESTART IDENTITY CASCADE")
+        cursor.execute(SEED_SQL.format(
+            teachers=args.teachers,
+            parents=args.parents,
+            students=args.students,
+            tasks_per_teacher=args.tasks_per_teacher,
+            submit_ratio=args.submit_ratio,
+        ))
+    conn.commit()
+    print(f"seeded in {time.perf_counter() - started:.1f}s")
+
+
+def sample_params(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT
+                (SELECT teacherid FROM teachers ORDER BY teacherid OFFSET (SELECT COUNT(*) / 2 FROM teachers) LIMIT 1),
+                (SELECT studentid FROM students ORDER BY studentid OFFSET (SELECT COUNT(*) / 2 FROM students) LIMIT 1),
+                (SELECT parentid FROM students WHERE parentid IS NOT NULL LIMIT 1),
+                (SELECT email_token FROM users WHERE email_token IS NOT NULL LIMIT 1),
+                (SELECT reset_token FROM users WHERE reset_token IS NOT NULL LIMIT 1)
+        """)
+        teacher_id, student_id, parent_id, email_token, reset_token = cursor.fetchone()
+        cursor.execute("SELECT taskid FROM taskassignments WHERE studentid = %s LIMIT 1", (student_id,))
+        task_id = (cursor.fetchone() or (None,))[0]
+        cursor.execute("SELECT MAX(assessment_id) / 2 FROM competency_assessments")
+        assessment_id = cursor.fetchone()[0]
+    return {
+        'teacher_id': teacher_id, 'student_id': student_id, 'parent_id': parent_id,
+        'task_id': task_id, 'assessment_id': assessment_id,
+        'email_token': email_token, 'reset_token': reset_token,
+    }
+
+
+def index_names():
+    return re.findall(r'CREATE INDEX IF NOT EXISTS (\w+)', read_migration(INDEX_MIGRATION))
+
+
+def drop_indexes(conn):
+    with conn.cursor() as cursor:
+        for name in index_names():
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+        cursor.execute("ANALYZE")
+    conn.commit()
+
+
+def create_indexes(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(read_migration(INDEX_MIGRATION))
+        cursor.execute("ANALYZE")
+    conn.commit()
+
+
+def explain_ms(conn, sql, params, repeat):
+    """Median server-side execution time of EXPLAIN ANALYZE over `repeat` runs."""
+    timings = []
+    with conn.cursor() as cursor:
+        for _ in range(repeat):
+            cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            timings.append(plan[0]['Execution Time'])
+    conn.rollback()
+    return statistics.median(timings)
+
+
+def run_queries(conn, params, repeat):
+    return {label: explain_ms(conn, sql, params, repeat) for label, sql in DASHBOARD_QUERIES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark migration 001 on a seeded scratch database.')
+    parser.add_argument('--reset', action='store_true', help='required: truncates every CBC table before seeding')
+    parser.add_argument('--skip-seed', action='store_true', help='reuse data from a previous run')
+    parser.add_argument('--teachers', type=int, default=600)
+    parser.add_argument('--parents', type=int, default=15000)
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--tasks-per-teacher', type=int, default=20)
+    parser.add_argument('--submit-ratio', type=float, default=0.7)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if not args.reset and not args.skip_seed:
+        parser.error('this truncates all CBC tables; pass --reset to confirm (or --skip-seed)')
+
+    conn = connect()
+    try:
+        if not args.skip_seed:
+            seed(conn, args)
+        params = sample_params(conn)
+
+        drop_indexes(conn)
+        before = run_queries(conn, params, args.repeat)
+        create_indexes(conn)
+        after = run_queries(conn, params, args.repeat)
+    finally:
+        conn.close()
+
+    print(f"\n{'query':40} {'before ms':>12} {'after ms':>12} {'speedup':>9}")
+    for label, _sql in DASHBOARD_QUERIES:
+        speedup = before[label] / after[label] if after[label] else float('inf')
+        print(f"{label:40} {before[label]:12.3f} {after[label]:12.3f} {speedup:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
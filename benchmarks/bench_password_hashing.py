@@ -0,0 +1,65 @@
+"""Logins per second with password checks in the request thread vs the
+app.services.passwords process pool.
+
+No database is needed: each simulated login is one verify_password() call,
+issued from --threads concurrent "request" threads (like a threaded web
+worker during a burst of logins):
+
+    python -m benchmarks.bench_password_hashing
+    python -m benchmarks.bench_password_hashing --logins 400 --threads 16 --workers 4
+    python -m benchmarks.bench_password_hashing --method pbkdf2:sha256:600000
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import create_app
+from app.services import passwords
+
+
+def run(app, logins, threads, workers):
+    app.config['PASSWORD_HASH_WORKERS'] = workers
+    app.config['PASSWORD_HASH_QUEUE'] = max(threads, 1) * 2
+    passwords.shutdown_pool()
+
+    with app.app_context():
+        pwhash = passwords.hash_password('correct horse')
+        passwords.verify_password(pwhash, 'warm up the pool')
+
+    def login(_):
+        with app.app_context():
+            return passwords.verify_password(pwhash, 'correct horse')
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as requests:
+        ok = sum(requests.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+    passwords.shutdown_pool()
+    assert ok == logins
+    return logins / elapsed
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description='Benchmark login password checks, inline vs process pool.')
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8, help='concurrent request threads')
+    parser.add_argument('--workers', type=int, default=cores, help='pool processes for the "after" run')
+    parser.add_argument('--method', default=None, help='hash method, e.g. pbkdf2:sha256:600000 (default: werkzeug)')
+    args = parser.parse_args()
+
+    app = create_app()
+    app.config['PASSWORD_HASH_METHOD'] = args.method
+
+    before = run(app, args.logins, args.threads, 0)
+    after = run(app, args.logins, args.threads, args.workers)
+
+    print(f"\n{'mode':28} {'logins/s':>10} {'per core':>10}")
+    print(f"{'request thread (inline)':28} {before:10.1f} {before:10.1f}")
+    print(f"{f'pool ({args.workers} processes)':28} {after:10.1f} {after / min(args.workers, cores):10.1f}")
+    print(f"speedup: {after / before:.1f}x on {cores} core(s)")
+
+
+if __name__ == '__main__':
+    main()
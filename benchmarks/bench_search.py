@@ -0,0 +1,86 @@
+"""Time the admin search queries against migrations/003_user_search_trgm.sql.
+
+Seeds the same scratch dataset as bench_indexes (about 100k users by default),
+applies migration 003 and reports the median execution time of the first page
+of each search / typeahead query against the 50 ms budget:
+
+    python -m benchmarks.bench_search --reset
+    python -m benchmarks.bench_search --skip-seed --repeat 9
+
+Like bench_indexes this truncates every CBC table, so only point it at a
+scratch database.
+"""
+import argparse
+
+from app.queries.admin_queries import (
+    SEARCH_STUDENTS_QUERY, SEARCH_TEACHERS_QUERY, SEARCH_PARENTS_QUERY,
+    SEARCH_STUDENTS_PARAMS, SEARCH_TEACHERS_PARAMS, SEARCH_PARENTS_PARAMS,
+    TYPEAHEAD_USERS_QUERY, TYPEAHEAD_USERS_PARAMS,
+)
+from app.search import search_params
+from benchmarks.bench_indexes import seed, explain_ms
+from migrations.migrate import connect, read_migration
+
+SEARCH_MIGRATION = '003_user_search_trgm.sql'
+BUDGET_MS = 50
+PAGE_SIZE = 50
+
+# First page in relevance order, as app.pagination.paginate runs it
+PAGE_SQL = "SELECT * FROM ({query}) AS page_src ORDER BY distance, userid LIMIT %s"
+
+SEARCHES = [
+    ('students', SEARCH_STUDENTS_QUERY, SEARCH_STUDENTS_PARAMS, ['student4242', 'S4242', 'adm5000', 'STÜDENT77']),
+    ('teachers', SEARCH_TEACHERS_QUERY, SEARCH_TEACHERS_PARAMS, ['teacher12', 'T300']),
+    ('parents', SEARCH_PARENTS_QUERY, SEARCH_PARENTS_PARAMS, ['parent777', 'bench.local']),
+]
+
+
+def apply_search_migration(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(read_migration(SEARCH_MIGRATION))
+        cursor.execute("ANALYZE")
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the admin trigram search on a seeded scratch database.')
+    parser.add_argument('--reset', action='store_true', help='required: truncates every CBC table before seeding')
+    parser.add_argument('--skip-seed', action='store_true', help='reuse data from a previous run')
+    parser.add_argument('--teachers', type=int, default=1000)
+    parser.add_argument('--parents', type=int, default=39000)
+    parser.add_argument('--students', type=int, default=60000)
+    parser.add_argument('--tasks-per-teacher', type=int, default=2)
+    parser.add_argument('--submit-ratio', type=float, default=0.1)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if not args.reset and not args.skip_seed:
+        parser.error('this truncates all CBC tables; pass --reset to confirm (or --skip-seed)')
+
+    conn = connect()
+    try:
+        if not args.skip_seed:
+            seed(conn, args)
+        apply_search_migration(conn)
+
+        results = []
+        for kind, query, names, terms in SEARCHES:
+            for term in terms:
+                page_ms = explain_ms(conn, PAGE_SQL.format(query=query.strip()),
+                                     search_params(term, names) + (PAGE_SIZE + 1,), args.repeat)
+                role_id = {'students': 1, 'teachers': 2, 'parents': 3}[kind]
+                typeahead_ms = explain_ms(conn, TYPEAHEAD_USERS_QUERY,
+                                          search_params(term, TYPEAHEAD_USERS_PARAMS, role_id=role_id, limit=10),
+                                          args.repeat)
+                results.append((f"{kind}: {term}", page_ms, typeahead_ms))
+    finally:
+        conn.close()
+
+    print(f"\n{'search':32} {'page ms':>10} {'typeahead ms':>13}  (budget {BUDGET_MS} ms)")
+    for label, page_ms, typeahead_ms in results:
+        flag = '' if max(page_ms, typeahead_ms) <= BUDGET_MS else '  OVER'
+        print(f"{label:32} {page_ms:10.3f} {typeahead_ms:13.3f}{flag}")
+
+
+if __name__ == '__main__':
+    main()
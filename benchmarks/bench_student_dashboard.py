@@ -0,0 +1,163 @@
+"""Student dashboard latency under load: the old five queries vs the single
+STUDENT_DASHBOARD_QUERY vs the cached app.services.student_dashboard.
+
+Seeds the bench_indexes dataset, applies migrations/008_student_tasks.sql and
+then has --threads "request" threads load the dashboards of --dashboards
+distinct students, --views times each, through the app's connection pool
+(DB_POOL_MAX_SIZE caps concurrency, as in a worker). Reports p50 / p95 / max
+per dashboard view:
+
+    python -m benchmarks.bench_student_dashboard --reset
+    python -m benchmarks.bench_student_dashboard --skip-seed --dashboards 1000 --threads 64
+
+Like bench_indexes this truncates every CBC table, so only point it at a
+scratch database.
+"""
+import argparse
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import create_app
+from app.database import get_db_connection
+from app.services import student_dashboard
+from benchmarks.bench_indexes import seed
+from migrations.migrate import connect, read_migration
+
+ASSIGNMENT_MIGRATION = '008_student_tasks.sql'
+
+# The dashboard as it was before STUDENT_DASHBOARD_QUERY
+LEGACY_DASHBOARD_QUERIES = [
+    """
+        SELECT u.firstname, u.lastname
+        FROM students s JOIN users u ON s.userid = u.userid
+        WHERE s.studentid = %(student_id)s
+    """,
+    """
+        SELECT COUNT(DISTINCT t.taskid)
+        FROM tasks t
+        JOIN taskassignments ta ON t.taskid = ta.taskid
+        LEFT JOIN projects p ON t.taskid = p.taskid AND
+            (p.studentid = %(student_id)s OR p.submitter_id = %(student_id)s)
+        WHERE ta.studentid = %(student_id)s
+           OR ta.classid IN (SELECT classid FROM class_students WHERE studentid = %(student_id)s)
+           OR ta.groupid IN (SELECT groupid FROM groupmembers WHERE studentid = %(student_id)s)
+    """,
+    """
+        SELECT COUNT(*) FROM projects
+        WHERE studentid = %(student_id)s OR submitter_id = %(student_id)s
+    """,
+    """
+        SELECT t.title, p.submission_time, p.file_type
+        FROM projects p JOIN tasks t ON p.taskid = t.taskid
+        WHERE p.studentid = %(student_id)s OR p.submitter_id = %(student_id)s
+        ORDER BY p.submission_time DESC LIMIT 3
+    """,
+    """
+        SELECT COUNT(DISTINCT c.competencyid)
+        FROM task_competencies tc
+        JOIN projects p ON tc.taskid = p.taskid
+        JOIN competencies c ON tc.competencyid = c.competencyid
+        WHERE p.studentid = %(student_id)s OR p.submitter_id = %(student_id)s
+    """,
+]
+
+
+def legacy_view(cursor, student_id):
+    for sql in LEGACY_DASHBOARD_QUERIES:
+        cursor.execute(sql, {'student_id': student_id})
+        cursor.fetchall()
+
+
+def single_view(cursor, student_id):
+    student_dashboard.load(cursor, student_id)
+
+
+def cached_view(cursor, student_id):
+    student_dashboard.get_dashboard(cursor, student_id)
+
+
+def apply_assignment_migration(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(read_migration(ASSIGNMENT_MIGRATION))
+        cursor.execute("ANALYZE")
+    conn.commit()
+
+
+def sample_students(conn, count):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT studentid FROM students ORDER BY random() LIMIT %s", (count,))
+        return [row[0] for row in cursor.fetchall()]
+
+
+def run(app, view, student_ids, views, threads):
+    """Latencies (ms) of every dashboard view, pool checkout included."""
+    requests = [student_id for student_id in student_ids for _ in range(views)]
+    random.shuffle(requests)
+
+    def one(student_id):
+        with app.app_context():
+            started = time.perf_counter()
+            conn = get_db_connection()
+            try:
+                with conn.cursor() as cursor:
+                    view(cursor, student_id)
+                conn.rollback()
+            finally:
+                conn.close()
+            return (time.perf_counter() - started) * 1000
+
+    student_dashboard.clear()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(one, requests))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark student dashboard latency on a seeded scratch database.')
+    parser.add_argument('--reset', action='store_true', help='required: truncates every CBC table before seeding')
+    parser.add_argument('--skip-seed', action='store_true', help='reuse data from a previous run')
+    parser.add_argument('--teachers', type=int, default=600)
+    parser.add_argument('--parents', type=int, default=15000)
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--tasks-per-teacher', type=int, default=20)
+    parser.add_argument('--submit-ratio', type=float, default=0.7)
+    parser.add_argument('--dashboards', type=int, default=1000, help='distinct students loading their dashboard')
+    parser.add_argument('--views', type=int, default=3, help='dashboard views per student')
+    parser.add_argument('--threads', type=int, default=32, help='concurrent request threads')
+    args = parser.parse_args()
+
+    if not args.reset and not args.skip_seed:
+        parser.error('this truncates all CBC tables; pass --reset to confirm (or --skip-seed)')
+
+    conn = connect()
+    try:
+        if not args.skip_seed:
+            seed(conn, args)
+        apply_assignment_migration(conn)
+        student_ids = sample_students(conn, args.dashboards)
+    finally:
+        conn.close()
+
+    app = create_app()
+    app.config['REFERENCE_CACHE_LISTEN'] = False
+    results = [
+        ('five queries (before)', run(app, legacy_view, student_ids, args.views, args.threads)),
+        ('one query', run(app, single_view, student_ids, args.views, args.threads)),
+        (f"one query + {app.config['STUDENT_DASHBOARD_TTL']:g}s cache",
+         run(app, cached_view, student_ids, args.views, args.threads)),
+    ]
+
+    print(f"\n{len(student_ids)} students x {args.views} views, {args.threads} threads")
+    print(f"{'dashboard':28} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for label, timings in results:
+        print(f"{label:28} {statistics.median(timings):9.2f} {percentile(timings, 95):9.2f} {max(timings):9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Student task list: the old four-query listing vs one page of the
+precomputed status in student_tasks (migrations/008 and 009).
+
+Seeds the bench_indexes dataset shaped as one class of --students students
+with --tasks tasks (200 x 5,000 by default, so a million student/task rows),
+applies the two migrations and reports the median execution time per query:
+
+    python -m benchmarks.bench_student_tasks --reset
+    python -m benchmarks.bench_student_tasks --skip-seed --repeat 9
+
+Like bench_indexes this truncates every CBC table, so only point it at a
+scratch database.
+"""
+import argparse
+from datetime import date, timedelta
+
+from app.queries.assignment_queries import (GET_STUDENT_TASKS_QUERY, STUDENT_TASKS_FILTER_DUE_FROM,
+                                            STUDENT_TASKS_FILTER_DUE_TO)
+from benchmarks.bench_indexes import seed, explain_ms
+from migrations.migrate import connect, read_migration
+
+STATUS_MIGRATIONS = ('008_student_tasks.sql', '009_student_task_status.sql')
+PAGE_SIZE = 50
+
+# student_tasks as it was before migration 008
+LEGACY_TASK_QUERIES = [
+    ('verify student', "SELECT * FROM students WHERE studentid = %(student_id)s"),
+    ('class ids', "SELECT classid FROM class_students WHERE studentid = %(student_id)s"),
+    ('group ids', "SELECT groupid FROM groupmembers WHERE studentid = %(student_id)s"),
+    ('tasks + status', """
+        SELECT t.taskid, t.title, t.taskdescription, t.duedate, u.firstname, u.lastname,
+               CASE WHEN p.projectid IS NOT NULL THEN 'Submitted'
+                    WHEN t.duedate < CURRENT_DATE THEN 'Overdue'
+                    ELSE 'Pending' END,
+               p.is_late
+        FROM tasks t
+        JOIN teachers te ON t.teacherid = te.teacherid
+        JOIN users u ON te.userid = u.userid
+        JOIN taskassignments ta ON t.taskid = ta.taskid
+        LEFT JOIN projects p ON t.taskid = p.taskid AND
+            (p.studentid = %(student_id)s OR p.submitter_id = %(student_id)s OR
+             (ta.groupid IS NOT NULL AND p.groupid = ta.groupid))
+        WHERE ta.studentid = %(student_id)s OR
+              (ta.classid IS NOT NULL AND ta.classid = ANY(%(class_ids)s::int[])) OR
+              (ta.groupid IS NOT NULL AND ta.groupid = ANY(%(group_ids)s::int[]))
+        GROUP BY t.taskid, u.firstname, u.lastname, p.projectid, p.is_late
+    """),
+]
+
+# One page as app.pagination.paginate runs it
+PAGE_SQL = "SELECT * FROM ({query}) AS page_src {keyset} ORDER BY duedate, taskid LIMIT %s"
+
+
+def apply_status_migrations(conn):
+    with conn.cursor() as cursor:
+        for name in STATUS_MIGRATIONS:
+            cursor.execute(read_migration(name))
+        cursor.execute("ANALYZE")
+    conn.commit()
+
+
+def sample(conn):
+    """A student from the middle of the table, their ids and a mid-list task."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT studentid FROM students ORDER BY studentid OFFSET (SELECT COUNT(*) / 2 FROM students) LIMIT 1")
+        student_id = cursor.fetchone()[0]
+        cursor.execute("SELECT array_agg(classid) FROM class_students WHERE studentid = %s", (student_id,))
+        class_ids = cursor.fetchone()[0] or []
+        cursor.execute("SELECT array_agg(groupid) FROM groupmembers WHERE studentid = %s", (student_id,))
+        group_ids = cursor.fetchone()[0] or []
+        cursor.execute("""
+            SELECT duedate, task_id FROM student_tasks WHERE student_id = %s
+            ORDER BY duedate, task_id OFFSET (SELECT COUNT(*) / 2 FROM student_tasks WHERE student_id = %s) LIMIT 1
+        """, (student_id, student_id))
+        middle = cursor.fetchone()
+    return {'student_id': student_id, 'class_ids': class_ids, 'group_ids': group_ids}, middle
+
+
+def page_queries(student_id, middle):
+    """(label, sql, params) for the pages the new listing serves."""
+    plain = GET_STUDENT_TASKS_QUERY.format(filters='')
+    ranged = GET_STUDENT_TASKS_QUERY.format(filters=STUDENT_TASKS_FILTER_DUE_FROM + ' ' + STUDENT_TASKS_FILTER_DUE_TO)
+    today = date.today()
+    return [
+        ('first page', PAGE_SQL.format(query=plain, keyset=''), (student_id, PAGE_SIZE + 1)),
+        ('middle page (keyset)', PAGE_SQL.format(query=plain, keyset='WHERE (duedate, taskid) > (%s, %s)'),
+         (student_id, middle[0], middle[1], PAGE_SIZE + 1)),
+        ('due in the next 7 days', PAGE_SQL.format(query=ranged, keyset=''),
+         (student_id, today, today + timedelta(days=7), PAGE_SIZE + 1)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the student task list on a seeded scratch database.')
+    parser.add_argument('--reset', action='store_true', help='required: truncates every CBC table before seeding')
+    parser.add_argument('--skip-seed', action='store_true', help='reuse data from a previous run')
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--tasks', type=int, default=200)
+    parser.add_argument('--submit-ratio', type=float, default=0.5)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if not args.reset and not args.skip_seed:
+        parser.error('this truncates all CBC tables; pass --reset to confirm (or --skip-seed)')
+
+    conn = connect()
+    try:
+        if not args.skip_seed:
+            # One teacher, one class: every student gets every task
+            args.teachers, args.parents, args.tasks_per_teacher = 1, args.students, args.tasks
+            seed(conn, args)
+        apply_status_migrations(conn)
+        params, middle = sample(conn)
+
+        legacy = [(label, explain_ms(conn, sql, params, args.repeat)) for label, sql in LEGACY_TASK_QUERIES]
+        pages = [(label, explain_ms(conn, sql, page_params, args.repeat))
+                 for label, sql, page_params in page_queries(params['student_id'], middle)]
+    finally:
+        conn.close()
+
+    print(f"\n{'before: student_tasks (all rows)':36} {'ms':>10}")
+    for label, ms in legacy:
+        print(f"  {label:34} {ms:10.3f}")
+    print(f"  {'total':34} {sum(ms for _label, ms in legacy):10.3f}")
+    print(f"\n{f'after: one page of {PAGE_SIZE}':36} {'ms':>10}")
+    for label, ms in pages:
+        print(f"  {label:34} {ms:10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+-- 001: Secondary indexes for the hot lookup columns
+-- Apply with: python -m migrations.migrate
+--
+-- Foreign keys in CREATE_TABLES_SQL.sql do not create indexes on the
+-- referencing side, so every dashboard / task / submission lookup below was a
+-- sequential scan. Nullable "either-or" columns get partial indexes so the
+-- NULL rows cost nothing.
+--
+-- Already covered by existing constraints (left alone on purpose):
+--   criteria_ratings(assessment_id)        -> UNIQUE(assessment_id, criteria_id)
+--   competency_assessments(student_id, ..) -> UNIQUE(student_id, task_id, competency_id)
+--   class_students(classid), groupmembers(groupid) -> composite primary keys
+
+-- Task assignments: student_tasks / student dashboard / create_task fan-out
+CREATE INDEX IF NOT EXISTS idx_taskassignments_taskid ON taskassignments (taskid);
+CREATE INDEX IF NOT EXISTS idx_taskassignments_studentid ON taskassignments (studentid) WHERE studentid IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_taskassignments_classid ON taskassignments (classid) WHERE classid IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_taskassignments_groupid ON taskassignments (groupid) WHERE groupid IS NOT NULL;
+
+-- Projects: submission checks, teacher submissions list, student/parent project lists
+CREATE INDEX IF NOT EXISTS idx_projects_task_student ON projects (taskid, studentid);
+CREATE INDEX IF NOT EXISTS idx_projects_task_group ON projects (taskid, groupid) WHERE groupid IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_projects_taskid_submitted ON projects (taskid) WHERE submission_time IS NOT NULL;  -- manage_tasks
+CREATE INDEX IF NOT EXISTS idx_projects_studentid ON projects (studentid, submission_time DESC) WHERE studentid IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_projects_submitter ON projects (submitter_id, submission_time DESC);
+CREATE INDEX IF NOT EXISTS idx_projects_groupid ON projects (groupid) WHERE groupid IS NOT NULL;
+
+-- Assessments: competency results ordered by date
+CREATE INDEX IF NOT EXISTS idx_competency_assessments_student ON competency_assessments (student_id, assessed_at DESC);
+CREATE INDEX IF NOT EXISTS idx_competency_assessments_task ON competency_assessments (task_id, student_id);
+
+-- Membership reverse lookups (primary keys lead with classid / groupid)
+CREATE INDEX IF NOT EXISTS idx_class_students_studentid ON class_students (studentid);
+CREATE INDEX IF NOT EXISTS idx_groupmembers_studentid ON groupmembers (studentid);
+
+-- Ownership lookups
+CREATE INDEX IF NOT EXISTS idx_classes_teacherid ON classes (teacherid);
+CREATE INDEX IF NOT EXISTS idx_tasks_teacherid ON tasks (teacherid, duedate);
+CREATE INDEX IF NOT EXISTS idx_studentgroups_teacherid ON studentgroups (teacherid);
+CREATE INDEX IF NOT EXISTS idx_students_parentid ON students (parentid) WHERE parentid IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_criteria_competencyid ON criteria (competencyid);
+
+-- Email verification / password reset links
+CREATE INDEX IF NOT EXISTS idx_users_email_token ON users (email_token) WHERE email_token IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_users_reset_token ON users (reset_token) WHERE reset_token IS NOT NULL;
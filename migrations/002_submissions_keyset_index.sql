@@ -0,0 +1,5 @@
+-- 002: Keyset order for the teacher submissions list
+-- teacher.view_submissions pages through projects by (submission_time, projectid)
+-- newest first; this index lets each page stop after LIMIT rows instead of
+-- sorting a teacher's whole submission history.
+CREATE INDEX IF NOT EXISTS idx_projects_submission_keyset ON projects (submission_time DESC, projectid DESC);
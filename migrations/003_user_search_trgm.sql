@@ -0,0 +1,24 @@
+-- 003: Trigram search over users (admin search / typeahead)
+-- The admin searches used to be LIKE '%term%' OR-chains over raw columns, which
+-- cannot use a btree index and were case- and accent-sensitive. Matching now
+-- runs against one normalised text (lower-case, accents stripped) per user,
+-- backed by a pg_trgm GIN index that serves LIKE '%term%', the word-similarity
+-- operator (<%) and ranking by distance (<<->).
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() is only STABLE (it depends on search_path); pinning the dictionary
+-- makes the wrapper safe to mark IMMUTABLE so it can be used in an index.
+CREATE OR REPLACE FUNCTION search_normalize(value TEXT) RETURNS TEXT
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, value)) $$;
+
+CREATE OR REPLACE FUNCTION user_search_text(first_name TEXT, last_name TEXT, email TEXT) RETURNS TEXT
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    AS $$ SELECT search_normalize(concat_ws(' ', first_name, last_name, email)) $$;
+
+-- Queries must use the exact same expressions for these to be picked up
+CREATE INDEX IF NOT EXISTS idx_users_search_trgm
+    ON users USING gin (user_search_text(firstname, lastname, email) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_students_number_trgm
+    ON students USING gin (search_normalize(studentnumber) gin_trgm_ops);
@@ -0,0 +1,65 @@
+-- 004: Trigger-maintained row counts for the admin dashboard
+-- Enable in the app with DASHBOARD_COUNTERS=True. The dashboard then reads four
+-- primary-key rows instead of counting the tables on every view.
+--
+-- Statement-level triggers with transition tables keep bulk imports cheap
+-- (one counter update per statement, not per row). Every writer to a counted
+-- table briefly locks its counter row until commit, which is fine at the
+-- rates teachers/students/parents/competencies are created.
+CREATE TABLE IF NOT EXISTS entity_counters (
+    name VARCHAR(50) PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION entity_counter_insert() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE entity_counters SET value = value + (SELECT COUNT(*) FROM new_rows)
+    WHERE name = TG_ARGV[0];
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION entity_counter_delete() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE entity_counters SET value = value - (SELECT COUNT(*) FROM old_rows)
+    WHERE name = TG_ARGV[0];
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION entity_counter_truncate() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE entity_counters SET value = 0 WHERE name = TG_ARGV[0];
+    RETURN NULL;
+END $$;
+
+DO $$
+DECLARE
+    counted TEXT;
+BEGIN
+    FOREACH counted IN ARRAY ARRAY['teachers', 'parents', 'students', 'competencies'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', counted || '_count_insert', counted);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', counted || '_count_delete', counted);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', counted || '_count_truncate', counted);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT ON %I REFERENCING NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION entity_counter_insert(%L)',
+            counted || '_count_insert', counted, counted);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER DELETE ON %I REFERENCING OLD TABLE AS old_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION entity_counter_delete(%L)',
+            counted || '_count_delete', counted, counted);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION entity_counter_truncate(%L)',
+            counted || '_count_truncate', counted, counted);
+
+        -- Backfill under a share lock so no insert/delete slips in between
+        EXECUTE format('LOCK TABLE %I IN SHARE MODE', counted);
+        EXECUTE format(
+            'INSERT INTO entity_counters (name, value) SELECT %L, COUNT(*) FROM %I '
+            'ON CONFLICT (name) DO UPDATE SET value = EXCLUDED.value',
+            counted, counted);
+    END LOOP;
+END $$;
@@ -0,0 +1,25 @@
+-- 005: Outbound email queue
+-- Requests insert a row in the same transaction as the token it carries and
+-- return at once; `python -m app.services.outbox` sends them over one reused
+-- SMTP connection, retrying with exponential backoff.
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    sender VARCHAR(255),
+    recipients TEXT[] NOT NULL,
+    subject VARCHAR(255) NOT NULL,
+    body_text TEXT,
+    body_html TEXT,
+    status VARCHAR(10) NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'sending', 'sent', 'failed')),
+    attempts INT NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    claimed_at TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP
+);
+
+-- The worker only ever looks at due / in-flight rows
+CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox (next_attempt_at) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_email_outbox_sending ON email_outbox (claimed_at) WHERE status = 'sending';
+CREATE INDEX IF NOT EXISTS idx_email_outbox_sent_at ON email_outbox (sent_at) WHERE status = 'sent';
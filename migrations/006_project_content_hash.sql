@@ -0,0 +1,4 @@
+-- 006: Content hash of each submitted file
+-- Computed while the upload streams to disk (app/services/uploads.py); used
+-- to verify files and as the download ETag. NULL for files uploaded before.
+ALTER TABLE projects ADD COLUMN IF NOT EXISTS content_sha256 CHAR(64);
@@ -0,0 +1,99 @@
+-- 007: Content-addressed storage for submitted files
+-- Files live once per distinct SHA-256 under UPLOAD_ROOT/blobs/ab/cd/<hash>
+-- (app/services/blob_store.py); projects.content_sha256 points at the blob.
+-- refcount is the number of projects rows using a blob and is maintained by
+-- statement-level triggers, so cascaded deletes (a student or task removed)
+-- release their blobs too. Blobs at refcount 0 are removed by
+-- python -m app.services.blob_store gc after a grace period.
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 CHAR(64) PRIMARY KEY,
+    size BIGINT NOT NULL,
+    refcount INT NOT NULL DEFAULT 0 CHECK (refcount >= 0),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    released_at TIMESTAMP          -- when refcount last dropped to 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_blobs_released ON blobs (released_at) WHERE refcount = 0;
+
+CREATE OR REPLACE FUNCTION blobs_add_refs() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO blobs (sha256, size, refcount)
+    SELECT content_sha256, COALESCE(MAX(file_size), 0), COUNT(*)
+    FROM new_rows
+    WHERE content_sha256 IS NOT NULL
+    GROUP BY content_sha256
+    ON CONFLICT (sha256) DO UPDATE
+        SET refcount = blobs.refcount + EXCLUDED.refcount,
+            released_at = NULL;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION blobs_release_refs() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE blobs b
+    SET refcount = b.refcount - d.n,
+        released_at = CASE WHEN b.refcount - d.n = 0 THEN CURRENT_TIMESTAMP END
+    FROM (
+        SELECT content_sha256, COUNT(*) AS n
+        FROM old_rows
+        WHERE content_sha256 IS NOT NULL
+        GROUP BY content_sha256
+    ) d
+    WHERE b.sha256 = d.content_sha256;
+    RETURN NULL;
+END $$;
+
+-- Transition tables cannot be combined with UPDATE OF <column>, so the
+-- function only looks at rows whose hash actually changed.
+CREATE OR REPLACE FUNCTION blobs_move_refs() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO blobs (sha256, size, refcount)
+    SELECT n.content_sha256, COALESCE(MAX(n.file_size), 0), COUNT(*)
+    FROM new_rows n JOIN old_rows o ON o.projectid = n.projectid
+    WHERE n.content_sha256 IS NOT NULL
+      AND n.content_sha256 IS DISTINCT FROM o.content_sha256
+    GROUP BY n.content_sha256
+    ON CONFLICT (sha256) DO UPDATE
+        SET refcount = blobs.refcount + EXCLUDED.refcount,
+            released_at = NULL;
+
+    UPDATE blobs b
+    SET refcount = b.refcount - d.n,
+        released_at = CASE WHEN b.refcount - d.n = 0 THEN CURRENT_TIMESTAMP END
+    FROM (
+        SELECT o.content_sha256, COUNT(*) AS n
+        FROM old_rows o JOIN new_rows n ON n.projectid = o.projectid
+        WHERE o.content_sha256 IS NOT NULL
+          AND o.content_sha256 IS DISTINCT FROM n.content_sha256
+        GROUP BY o.content_sha256
+    ) d
+    WHERE b.sha256 = d.content_sha256;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS projects_blob_insert ON projects;
+DROP TRIGGER IF EXISTS projects_blob_delete ON projects;
+DROP TRIGGER IF EXISTS projects_blob_update ON projects;
+
+CREATE TRIGGER projects_blob_insert AFTER INSERT ON projects
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION blobs_add_refs();
+CREATE TRIGGER projects_blob_delete AFTER DELETE ON projects
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION blobs_release_refs();
+CREATE TRIGGER projects_blob_update AFTER UPDATE ON projects
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION blobs_move_refs();
+
+-- Backfill from hashes recorded since 006 (their files are still in the old
+-- layout until the ingest tool moves them)
+LOCK TABLE projects IN SHARE MODE;
+INSERT INTO blobs (sha256, size, refcount)
+SELECT content_sha256, COALESCE(MAX(file_size), 0), COUNT(*)
+FROM projects
+WHERE content_sha256 IS NOT NULL
+GROUP BY content_sha256
+ON CONFLICT (sha256) DO UPDATE SET refcount = EXCLUDED.refcount, released_at = NULL;
@@ -0,0 +1,128 @@
+-- 008: Materialized student -> task mapping
+-- taskassignments says who a task targets (a student, a class or a group);
+-- student_tasks resolves that to one row per (student, task), so listing a
+-- student's tasks is a primary-key range scan instead of an OR over three
+-- subqueries. sources counts the assignment paths that reach the student
+-- (direct, via a class, via a group).
+--
+-- Kept up to date by statement-level triggers on taskassignments (refresh the
+-- changed tasks) and class_students / groupmembers (refresh the changed
+-- students). Deleting a student or task cascades here.
+CREATE TABLE IF NOT EXISTS student_tasks (
+    student_id INT NOT NULL REFERENCES students(studentid) ON DELETE CASCADE,
+    task_id INT NOT NULL REFERENCES tasks(taskid) ON DELETE CASCADE,
+    sources INT NOT NULL DEFAULT 1,
+    PRIMARY KEY (student_id, task_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_student_tasks_task ON student_tasks (task_id);
+
+-- Canonical resolution of taskassignments rows to students
+CREATE OR REPLACE VIEW task_targets AS
+    SELECT ta.studentid AS student_id, ta.taskid AS task_id FROM taskassignments ta
+    WHERE ta.studentid IS NOT NULL
+    UNION ALL
+    SELECT cs.studentid, ta.taskid FROM taskassignments ta
+    JOIN class_students cs ON cs.classid = ta.classid
+    UNION ALL
+    SELECT gm.studentid, ta.taskid FROM taskassignments ta
+    JOIN groupmembers gm ON gm.groupid = ta.groupid;
+
+-- Re-resolve the rows of the given students and/or tasks from task_targets.
+-- Recomputing (rather than adding/subtracting deltas) keeps this correct when
+-- one DELETE cascades into several of the source tables at once: the
+-- AFTER triggers all run once the cascade is complete.
+CREATE OR REPLACE FUNCTION student_tasks_refresh(student_ids INT[], task_ids INT[]) RETURNS void
+    LANGUAGE sql AS $$
+    WITH fresh AS (
+        SELECT student_id, task_id, COUNT(*)::int AS sources
+        FROM task_targets
+        WHERE student_id = ANY(student_ids) OR task_id = ANY(task_ids)
+        GROUP BY student_id, task_id
+    ), removed AS (
+        DELETE FROM student_tasks st
+        WHERE (st.student_id = ANY(student_ids) OR st.task_id = ANY(task_ids))
+          AND NOT EXISTS (
+              SELECT 1 FROM fresh f WHERE f.student_id = st.student_id AND f.task_id = st.task_id
+          )
+    )
+    INSERT INTO student_tasks (student_id, task_id, sources)
+    SELECT student_id, task_id, sources FROM fresh
+    ON CONFLICT (student_id, task_id) DO UPDATE
+        SET sources = EXCLUDED.sources
+        WHERE student_tasks.sources <> EXCLUDED.sources;
+$$;
+
+-- taskassignments: refresh the tasks whose assignments changed
+CREATE OR REPLACE FUNCTION student_tasks_on_assignment() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+DECLARE
+    tasks INT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT taskid) INTO tasks FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT taskid) INTO tasks FROM old_rows;
+    ELSE
+        SELECT array_agg(DISTINCT taskid) INTO tasks
+        FROM (SELECT taskid FROM old_rows UNION SELECT taskid FROM new_rows) changed;
+    END IF;
+    IF tasks IS NOT NULL THEN
+        PERFORM student_tasks_refresh('{}', tasks);
+    END IF;
+    RETURN NULL;
+END $$;
+
+-- class_students / groupmembers: refresh the students whose membership changed
+CREATE OR REPLACE FUNCTION student_tasks_on_membership() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+DECLARE
+    students INT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT studentid) INTO students FROM new_rows;
+    ELSE
+        SELECT array_agg(DISTINCT studentid) INTO students FROM old_rows;
+    END IF;
+    IF students IS NOT NULL THEN
+        PERFORM student_tasks_refresh(students, '{}');
+    END IF;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS taskassignments_student_tasks_insert ON taskassignments;
+DROP TRIGGER IF EXISTS taskassignments_student_tasks_delete ON taskassignments;
+DROP TRIGGER IF EXISTS taskassignments_student_tasks_update ON taskassignments;
+CREATE TRIGGER taskassignments_student_tasks_insert AFTER INSERT ON taskassignments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION student_tasks_on_assignment();
+CREATE TRIGGER taskassignments_student_tasks_delete AFTER DELETE ON taskassignments
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION student_tasks_on_assignment();
+CREATE TRIGGER taskassignments_student_tasks_update AFTER UPDATE ON taskassignments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION student_tasks_on_assignment();
+
+DO $$
+DECLARE
+    membership TEXT;
+BEGIN
+    FOREACH membership IN ARRAY ARRAY['class_students', 'groupmembers'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', membership || '_student_tasks_insert', membership);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', membership || '_student_tasks_delete', membership);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT ON %I REFERENCING NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION student_tasks_on_membership()',
+            membership || '_student_tasks_insert', membership);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER DELETE ON %I REFERENCING OLD TABLE AS old_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION student_tasks_on_membership()',
+            membership || '_student_tasks_delete', membership);
+    END LOOP;
+END $$;
+
+-- Backfill; the share locks keep the sources consistent with the triggers
+LOCK TABLE taskassignments, class_students, groupmembers IN SHARE MODE;
+TRUNCATE student_tasks;
+INSERT INTO student_tasks (student_id, task_id, sources)
+SELECT student_id, task_id, COUNT(*) FROM task_targets GROUP BY student_id, task_id;
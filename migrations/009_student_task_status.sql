@@ -0,0 +1,185 @@
+-- 009: Precomputed per-student task status
+-- student_tasks (008) gains the task's due date and the project that answers
+-- it, so the student task list is one index range scan with no projects join:
+--   status = 'Late' / 'Submitted' when there is a project (by is_late),
+--            'Overdue' once the due date has passed, 'Pending' otherwise.
+--
+-- The project columns follow projects through a statement-level trigger (own,
+-- submitted-for and group projects alike); the due date follows tasks.duedate.
+-- overdue is set when the row is written and flipped at the turn of the day by
+-- python -m app.services.task_status sweep; readers also treat a Pending row
+-- past its due date as Overdue, so a late sweep is never visible.
+ALTER TABLE student_tasks
+    ADD COLUMN IF NOT EXISTS duedate DATE,
+    ADD COLUMN IF NOT EXISTS overdue BOOLEAN NOT NULL DEFAULT FALSE,
+    ADD COLUMN IF NOT EXISTS project_id INT,          -- kept in step by the projects trigger below
+    ADD COLUMN IF NOT EXISTS is_late BOOLEAN;
+
+ALTER TABLE student_tasks
+    ADD COLUMN IF NOT EXISTS status VARCHAR(10) GENERATED ALWAYS AS (
+        CASE
+            WHEN project_id IS NOT NULL AND is_late THEN 'Late'
+            WHEN project_id IS NOT NULL THEN 'Submitted'
+            WHEN overdue THEN 'Overdue'
+            ELSE 'Pending'
+        END
+    ) STORED;
+
+-- Task list pages (keyset on duedate, task_id) and due-date ranges
+CREATE INDEX IF NOT EXISTS idx_student_tasks_student_due ON student_tasks (student_id, duedate, task_id);
+-- The overdue sweep only looks at rows still waiting for their due date
+CREATE INDEX IF NOT EXISTS idx_student_tasks_not_overdue ON student_tasks (duedate) WHERE NOT overdue;
+
+-- The project that answers a task for a student: their own, one they
+-- submitted or one of their groups'; the newest if there are several.
+CREATE OR REPLACE FUNCTION student_task_project(student INT, task INT)
+    RETURNS TABLE (projectid INT, is_late BOOLEAN)
+    LANGUAGE sql STABLE AS $$
+    -- One index probe per way of answering (idx_projects_task_student,
+    -- idx_projects_submitter, idx_projects_task_group) rather than an OR
+    SELECT projectid, is_late FROM (
+        SELECT p.projectid, p.is_late, p.submission_time
+        FROM projects p WHERE p.taskid = task AND p.studentid = student
+        UNION ALL
+        SELECT p.projectid, p.is_late, p.submission_time
+        FROM projects p WHERE p.submitter_id = student AND p.taskid = task
+        UNION ALL
+        SELECT p.projectid, p.is_late, p.submission_time
+        FROM groupmembers gm
+        JOIN projects p ON p.groupid = gm.groupid AND p.taskid = task
+        WHERE gm.studentid = student
+    ) answers
+    ORDER BY submission_time DESC NULLS LAST, projectid DESC
+    LIMIT 1
+$$;
+
+-- 008's refresh, now writing the status columns as well
+CREATE OR REPLACE FUNCTION student_tasks_refresh(student_ids INT[], task_ids INT[]) RETURNS void
+    LANGUAGE sql AS $$
+    WITH fresh AS (
+        SELECT student_id, task_id, COUNT(*)::int AS sources
+        FROM task_targets
+        WHERE student_id = ANY(student_ids) OR task_id = ANY(task_ids)
+        GROUP BY student_id, task_id
+    ), removed AS (
+        DELETE FROM student_tasks st
+        WHERE (st.student_id = ANY(student_ids) OR st.task_id = ANY(task_ids))
+          AND NOT EXISTS (
+              SELECT 1 FROM fresh f WHERE f.student_id = st.student_id AND f.task_id = st.task_id
+          )
+    )
+    INSERT INTO student_tasks (student_id, task_id, sources, duedate, overdue, project_id, is_late)
+    SELECT f.student_id, f.task_id, f.sources, t.duedate, t.duedate < CURRENT_DATE, sp.projectid, sp.is_late
+    FROM fresh f
+    JOIN tasks t ON t.taskid = f.task_id
+    LEFT JOIN LATERAL student_task_project(f.student_id, f.task_id) sp ON TRUE
+    ON CONFLICT (student_id, task_id) DO UPDATE
+        SET sources = EXCLUDED.sources,
+            duedate = EXCLUDED.duedate,
+            overdue = EXCLUDED.overdue,
+            project_id = EXCLUDED.project_id,
+            is_late = EXCLUDED.is_late
+        WHERE (student_tasks.sources, student_tasks.duedate, student_tasks.overdue,
+               student_tasks.project_id, student_tasks.is_late)
+              IS DISTINCT FROM
+              (EXCLUDED.sources, EXCLUDED.duedate, EXCLUDED.overdue,
+               EXCLUDED.project_id, EXCLUDED.is_late);
+$$;
+
+-- Re-resolve the project columns for changed projects rows, given as
+-- parallel arrays of their studentid, submitter_id, groupid and taskid: every
+-- student such a row can answer for (the student, the submitter, the group's
+-- members) is looked at again for that task.
+CREATE OR REPLACE FUNCTION student_tasks_sync_projects(
+    student_ids INT[], submitter_ids INT[], group_ids INT[], task_ids INT[]
+) RETURNS void
+    LANGUAGE sql AS $$
+    WITH changed AS (
+        SELECT * FROM unnest(student_ids, submitter_ids, group_ids, task_ids)
+            AS c(studentid, submitter_id, groupid, taskid)
+    ), pairs AS (
+        SELECT studentid AS student_id, taskid AS task_id FROM changed WHERE studentid IS NOT NULL
+        UNION
+        SELECT submitter_id, taskid FROM changed WHERE submitter_id IS NOT NULL
+        UNION
+        SELECT gm.studentid, c.taskid FROM changed c JOIN groupmembers gm ON gm.groupid = c.groupid
+    )
+    UPDATE student_tasks st
+    SET project_id = sp.projectid, is_late = sp.is_late
+    FROM pairs
+    LEFT JOIN LATERAL student_task_project(pairs.student_id, pairs.task_id) sp ON TRUE
+    WHERE st.student_id = pairs.student_id
+      AND st.task_id = pairs.task_id
+      AND (st.project_id, st.is_late) IS DISTINCT FROM (sp.projectid, sp.is_late);
+$$;
+
+CREATE OR REPLACE FUNCTION student_tasks_on_project() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+DECLARE
+    students INT[];
+    submitters INT[];
+    groups INT[];
+    tasks INT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(studentid), array_agg(submitter_id), array_agg(groupid), array_agg(taskid)
+        INTO students, submitters, groups, tasks FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(studentid), array_agg(submitter_id), array_agg(groupid), array_agg(taskid)
+        INTO students, submitters, groups, tasks FROM old_rows;
+    ELSE
+        SELECT array_agg(studentid), array_agg(submitter_id), array_agg(groupid), array_agg(taskid)
+        INTO students, submitters, groups, tasks
+        FROM (
+            SELECT studentid, submitter_id, groupid, taskid FROM old_rows
+            UNION
+            SELECT studentid, submitter_id, groupid, taskid FROM new_rows
+        ) changed;
+    END IF;
+    IF tasks IS NOT NULL THEN
+        PERFORM student_tasks_sync_projects(students, submitters, groups, tasks);
+    END IF;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS projects_student_tasks_insert ON projects;
+DROP TRIGGER IF EXISTS projects_student_tasks_delete ON projects;
+DROP TRIGGER IF EXISTS projects_student_tasks_update ON projects;
+CREATE TRIGGER projects_student_tasks_insert AFTER INSERT ON projects
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION student_tasks_on_project();
+CREATE TRIGGER projects_student_tasks_delete AFTER DELETE ON projects
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION student_tasks_on_project();
+CREATE TRIGGER projects_student_tasks_update AFTER UPDATE ON projects
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION student_tasks_on_project();
+
+-- tasks: a moved due date moves every student's row
+CREATE OR REPLACE FUNCTION student_tasks_on_duedate() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE student_tasks
+    SET duedate = NEW.duedate, overdue = NEW.duedate < CURRENT_DATE
+    WHERE task_id = NEW.taskid;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS tasks_student_tasks_duedate ON tasks;
+CREATE TRIGGER tasks_student_tasks_duedate AFTER UPDATE OF duedate ON tasks
+    FOR EACH ROW WHEN (OLD.duedate IS DISTINCT FROM NEW.duedate)
+    EXECUTE FUNCTION student_tasks_on_duedate();
+
+-- Backfill the new columns
+UPDATE student_tasks st
+SET duedate = src.duedate,
+    overdue = src.duedate < CURRENT_DATE,
+    project_id = src.projectid,
+    is_late = src.is_late
+FROM (
+    SELECT s.student_id, s.task_id, t.duedate, sp.projectid, sp.is_late
+    FROM student_tasks s
+    JOIN tasks t ON t.taskid = s.task_id
+    LEFT JOIN LATERAL student_task_project(s.student_id, s.task_id) sp ON TRUE
+) src
+WHERE st.student_id = src.student_id AND st.task_id = src.task_id;
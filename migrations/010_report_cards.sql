@@ -0,0 +1,38 @@
+-- 010: Report cards (app/services/report_cards.py)
+-- A batch is one run of the report engine over a class or the whole school
+-- for one term; its counters are the progress shown on the admin reports page.
+-- Every generated card is a Reports row pointing at its file under
+-- UPLOAD_ROOT/reports/. Regenerating a term replaces the student's card.
+CREATE TABLE IF NOT EXISTS report_batches (
+    batch_id SERIAL PRIMARY KEY,
+    class_id INT REFERENCES classes(classid) ON DELETE SET NULL,   -- NULL = whole school
+    term_label VARCHAR(50) NOT NULL,
+    term_start DATE NOT NULL,
+    term_end DATE NOT NULL,
+    format VARCHAR(10) NOT NULL DEFAULT 'html' CHECK (format IN ('html', 'pdf')),
+    status VARCHAR(10) NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'done', 'failed')),
+    total INT NOT NULL DEFAULT 0,
+    done INT NOT NULL DEFAULT 0,
+    failed INT NOT NULL DEFAULT 0,
+    error TEXT,
+    created_by INT REFERENCES users(userid) ON DELETE SET NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    CHECK (term_end >= term_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_report_batches_created ON report_batches (created_at DESC);
+
+ALTER TABLE reports
+    ADD COLUMN IF NOT EXISTS term_label VARCHAR(50),
+    ADD COLUMN IF NOT EXISTS term_start DATE,
+    ADD COLUMN IF NOT EXISTS term_end DATE,
+    ADD COLUMN IF NOT EXISTS format VARCHAR(10),
+    ADD COLUMN IF NOT EXISTS batch_id INT REFERENCES report_batches(batch_id) ON DELETE SET NULL;
+
+-- One card per student, term and format (the engine upserts on this)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_reports_student_term
+    ON reports (studentid, term_start, term_end, format);
+-- Student / parent report lists, newest first
+CREATE INDEX IF NOT EXISTS idx_reports_student_date ON reports (studentid, reportdate DESC);
@@ -0,0 +1,29 @@
+-- 011: Background jobs (app/services/jobs.py)
+-- Routes enqueue a row in their own transaction and return at once;
+-- `python -m app.services.jobs` claims due rows with FOR UPDATE SKIP LOCKED
+-- (any number of workers can share the table), runs them and retries
+-- failures with exponential backoff until max_attempts.
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id BIGSERIAL PRIMARY KEY,
+    kind VARCHAR(50) NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}',
+    status VARCHAR(10) NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'done', 'failed')),
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 3,
+    run_after TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    claimed_by VARCHAR(100),           -- host:pid of the worker running it
+    heartbeat_at TIMESTAMP,            -- refreshed while running; stale rows are re-run
+    result JSONB,
+    last_error TEXT,
+    created_by INT REFERENCES users(userid) ON DELETE SET NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- The worker only ever looks at due / in-flight rows
+CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs (run_after) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_jobs_running ON jobs (heartbeat_at) WHERE status = 'running';
+-- Finished jobs are swept by age
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at) WHERE status IN ('done', 'failed');
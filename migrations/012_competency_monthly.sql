@@ -0,0 +1,127 @@
+-- 012: Monthly competency rollups for progress charts (app/services/competency_analytics.py)
+-- One row per (student, competency, month) with the mean / min / max overall
+-- score of that month's assessments, how many there were and the latest
+-- score (the chart names it after the performance level it reaches). A
+-- student's chart series is a primary-key range scan here instead of an
+-- aggregate over competency_assessments on every view.
+--
+-- Kept up to date by statement-level triggers on competency_assessments that
+-- recompute only the (student, competency, month) keys a statement touched,
+-- like student_tasks (008). Deleting a student or competency cascades here.
+CREATE TABLE IF NOT EXISTS competency_monthly (
+    student_id INT NOT NULL REFERENCES students(studentid) ON DELETE CASCADE,
+    competency_id INT NOT NULL REFERENCES competencies(competencyid) ON DELETE CASCADE,
+    month DATE NOT NULL,                    -- first day of the month
+    mean_score DECIMAL(5,2),
+    min_score DECIMAL(5,2),
+    max_score DECIMAL(5,2),
+    assessments INT NOT NULL,
+    latest_score DECIMAL(5,2),
+    latest_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (student_id, competency_id, month)
+);
+
+-- Recompute the given (student, competency, month) keys, passed as three
+-- parallel arrays; keys without assessments any more are removed.
+CREATE OR REPLACE FUNCTION competency_monthly_refresh(student_ids INT[], competency_ids INT[], months DATE[])
+    RETURNS void LANGUAGE sql AS $$
+    WITH changed AS (
+        SELECT DISTINCT student_id, competency_id, month
+        FROM unnest(student_ids, competency_ids, months) AS k(student_id, competency_id, month)
+    ), fresh AS (
+        SELECT k.student_id, k.competency_id, k.month,
+               ROUND(AVG(ca.overall_score), 2) AS mean_score,
+               MIN(ca.overall_score) AS min_score,
+               MAX(ca.overall_score) AS max_score,
+               COUNT(*)::int AS assessments,
+               (ARRAY_AGG(ca.overall_score ORDER BY ca.assessed_at DESC, ca.assessment_id DESC)
+                    FILTER (WHERE ca.overall_score IS NOT NULL))[1] AS latest_score,
+               MAX(ca.assessed_at) AS latest_at
+        FROM changed k
+        JOIN competency_assessments ca
+          ON ca.student_id = k.student_id
+         AND ca.competency_id = k.competency_id
+         AND ca.assessed_at >= k.month
+         AND ca.assessed_at < k.month + INTERVAL '1 month'
+        GROUP BY k.student_id, k.competency_id, k.month
+    ), removed AS (
+        DELETE FROM competency_monthly m
+        USING changed k
+        WHERE m.student_id = k.student_id AND m.competency_id = k.competency_id AND m.month = k.month
+          AND NOT EXISTS (
+              SELECT 1 FROM fresh f
+              WHERE f.student_id = m.student_id AND f.competency_id = m.competency_id AND f.month = m.month
+          )
+    )
+    INSERT INTO competency_monthly (student_id, competency_id, month, mean_score, min_score, max_score,
+                                    assessments, latest_score, latest_at)
+    SELECT student_id, competency_id, month, mean_score, min_score, max_score,
+           assessments, latest_score, latest_at
+    FROM fresh
+    ON CONFLICT (student_id, competency_id, month) DO UPDATE
+        SET mean_score = EXCLUDED.mean_score,
+            min_score = EXCLUDED.min_score,
+            max_score = EXCLUDED.max_score,
+            assessments = EXCLUDED.assessments,
+            latest_score = EXCLUDED.latest_score,
+            latest_at = EXCLUDED.latest_at;
+$$;
+
+-- competency_assessments: refresh the months of the rows a statement changed
+-- (an UPDATE refreshes both the old and the new month)
+CREATE OR REPLACE FUNCTION competency_monthly_on_assessment() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+DECLARE
+    students INT[];
+    competencies INT[];
+    months DATE[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(student_id), array_agg(competency_id), array_agg(month)
+        INTO students, competencies, months
+        FROM (SELECT DISTINCT student_id, competency_id, date_trunc('month', assessed_at)::date AS month
+              FROM new_rows) changed;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(student_id), array_agg(competency_id), array_agg(month)
+        INTO students, competencies, months
+        FROM (SELECT DISTINCT student_id, competency_id, date_trunc('month', assessed_at)::date AS month
+              FROM old_rows) changed;
+    ELSE
+        SELECT array_agg(student_id), array_agg(competency_id), array_agg(month)
+        INTO students, competencies, months
+        FROM (SELECT student_id, competency_id, date_trunc('month', assessed_at)::date AS month FROM old_rows
+              UNION
+              SELECT student_id, competency_id, date_trunc('month', assessed_at)::date FROM new_rows) changed;
+    END IF;
+    IF students IS NOT NULL THEN
+        PERFORM competency_monthly_refresh(students, competencies, months);
+    END IF;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS competency_assessments_monthly_insert ON competency_assessments;
+DROP TRIGGER IF EXISTS competency_assessments_monthly_delete ON competency_assessments;
+DROP TRIGGER IF EXISTS competency_assessments_monthly_update ON competency_assessments;
+CREATE TRIGGER competency_assessments_monthly_insert AFTER INSERT ON competency_assessments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION competency_monthly_on_assessment();
+CREATE TRIGGER competency_assessments_monthly_delete AFTER DELETE ON competency_assessments
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION competency_monthly_on_assessment();
+CREATE TRIGGER competency_assessments_monthly_update AFTER UPDATE ON competency_assessments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION competency_monthly_on_assessment();
+
+-- Backfill; the share lock keeps the assessments consistent with the triggers.
+-- `python -m app.services.competency_analytics rebuild` runs the same rebuild.
+LOCK TABLE competency_assessments IN SHARE MODE;
+TRUNCATE competency_monthly;
+INSERT INTO competency_monthly (student_id, competency_id, month, mean_score, min_score, max_score,
+                                assessments, latest_score, latest_at)
+SELECT student_id, competency_id, date_trunc('month', assessed_at)::date,
+       ROUND(AVG(overall_score), 2), MIN(overall_score), MAX(overall_score), COUNT(*),
+       (ARRAY_AGG(overall_score ORDER BY assessed_at DESC, assessment_id DESC)
+            FILTER (WHERE overall_score IS NOT NULL))[1],
+       MAX(assessed_at)
+FROM competency_assessments
+GROUP BY student_id, competency_id, date_trunc('month', assessed_at)::date;
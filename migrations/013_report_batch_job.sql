@@ -0,0 +1,5 @@
+-- 013: The job running a report batch (app/services/report_cards.py)
+-- When a job worker dies mid-batch and the job is claimed again, the retry
+-- takes over the batch it left 'running' (START_REPORT_BATCH_QUERY).
+ALTER TABLE report_batches
+    ADD COLUMN IF NOT EXISTS job_id BIGINT REFERENCES jobs(job_id) ON DELETE SET NULL;
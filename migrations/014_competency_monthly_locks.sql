@@ -0,0 +1,46 @@
+-- 014: Serialize competency_monthly refreshes per key (migrations/012)
+-- The refresh recomputes a (student, competency, month) from its statement's
+-- snapshot and upserts the result. Two transactions assessing the same key
+-- at once each computed it without the other's assessment, and the later
+-- upsert overwrote the earlier one. The trigger now takes a transaction-level
+-- advisory lock per key (in a fixed order, so two statements cannot
+-- deadlock) before refreshing: the second transaction waits for the first
+-- to commit, and its refresh statement then takes a new READ COMMITTED
+-- snapshot that includes the first one's rows.
+CREATE OR REPLACE FUNCTION competency_monthly_on_assessment() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+DECLARE
+    students INT[];
+    competencies INT[];
+    months DATE[];
+    lock_key INT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(student_id), array_agg(competency_id), array_agg(month)
+        INTO students, competencies, months
+        FROM (SELECT DISTINCT student_id, competency_id, date_trunc('month', assessed_at)::date AS month
+              FROM new_rows) changed;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(student_id), array_agg(competency_id), array_agg(month)
+        INTO students, competencies, months
+        FROM (SELECT DISTINCT student_id, competency_id, date_trunc('month', assessed_at)::date AS month
+              FROM old_rows) changed;
+    ELSE
+        SELECT array_agg(student_id), array_agg(competency_id), array_agg(month)
+        INTO students, competencies, months
+        FROM (SELECT student_id, competency_id, date_trunc('month', assessed_at)::date AS month FROM old_rows
+              UNION
+              SELECT student_id, competency_id, date_trunc('month', assessed_at)::date FROM new_rows) changed;
+    END IF;
+    IF students IS NOT NULL THEN
+        FOR lock_key IN
+            SELECT DISTINCT hashtext(format('competency_monthly:%s:%s:%s', k.student_id, k.competency_id, k.month))
+            FROM unnest(students, competencies, months) AS k(student_id, competency_id, month)
+            ORDER BY 1
+        LOOP
+            PERFORM pg_advisory_xact_lock(lock_key);
+        END LOOP;
+        PERFORM competency_monthly_refresh(students, competencies, months);
+    END IF;
+    RETURN NULL;
+END $$;
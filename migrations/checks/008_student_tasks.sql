@@ -0,0 +1,82 @@
+-- 008: student_tasks follows assignments to a student, a class and a group,
+-- and changes in class / group membership
+
+-- sources of a (student, task) row; 0 when there is none
+CREATE FUNCTION pg_temp.sources(student INT, task INT) RETURNS INT
+    LANGUAGE sql AS $$
+    SELECT COALESCE((SELECT sources FROM student_tasks WHERE student_id = student AND task_id = task), 0);
+$$;
+
+-- The task's rows match a fresh resolution through task_targets
+CREATE FUNCTION pg_temp.expect_resolved(task INT, what TEXT) RETURNS void
+    LANGUAGE plpgsql AS $$
+DECLARE
+    mismatches INT;
+BEGIN
+    SELECT COUNT(*) INTO mismatches FROM (
+        (SELECT student_id, sources FROM student_tasks WHERE task_id = task
+         EXCEPT
+         SELECT student_id, COUNT(*)::int FROM task_targets WHERE task_id = task GROUP BY student_id)
+        UNION ALL
+        (SELECT student_id, COUNT(*)::int FROM task_targets WHERE task_id = task GROUP BY student_id
+         EXCEPT
+         SELECT student_id, sources FROM student_tasks WHERE task_id = task)
+    ) diff;
+    PERFORM pg_temp.expect(what || ': rows differing from task_targets', mismatches, 0);
+END $$;
+
+DO $$
+DECLARE
+    teacher INT := pg_temp.check_teacher('st-t');
+    a INT := pg_temp.check_student('st-a');
+    b INT := pg_temp.check_student('st-b');
+    c INT := pg_temp.check_student('st-c');
+    task INT := pg_temp.check_task(teacher, CURRENT_DATE + 7);
+    klass INT;
+    grp INT := pg_temp.check_group(teacher, 'st');
+    direct INT;
+    by_class INT;
+BEGIN
+    INSERT INTO classes (teacherid, classname, academicyear) VALUES (teacher, 'Migration check', '-')
+    RETURNING classid INTO klass;
+    INSERT INTO class_students (classid, studentid) VALUES (klass, a), (klass, b);
+    INSERT INTO groupmembers (groupid, studentid) VALUES (grp, b), (grp, c);
+
+    -- Class fan-out
+    INSERT INTO taskassignments (taskid, classid) VALUES (task, klass) RETURNING assignmentid INTO by_class;
+    PERFORM pg_temp.expect('class assignment reaches a', pg_temp.sources(a, task), 1);
+    PERFORM pg_temp.expect('class assignment reaches b', pg_temp.sources(b, task), 1);
+    PERFORM pg_temp.expect('class assignment skips c', pg_temp.sources(c, task), 0);
+
+    -- Group fan-out on top: b is reached twice
+    INSERT INTO taskassignments (taskid, groupid) VALUES (task, grp);
+    PERFORM pg_temp.expect('class + group reach b', pg_temp.sources(b, task), 2);
+    PERFORM pg_temp.expect('group assignment reaches c', pg_temp.sources(c, task), 1);
+
+    -- Direct assignment
+    INSERT INTO taskassignments (taskid, studentid) VALUES (task, a) RETURNING assignmentid INTO direct;
+    PERFORM pg_temp.expect('class + direct reach a', pg_temp.sources(a, task), 2);
+
+    -- Leaving the group drops c; joining the class brings them back
+    DELETE FROM groupmembers WHERE groupid = grp AND studentid = c;
+    PERFORM pg_temp.expect('c left the group', pg_temp.sources(c, task), 0);
+    INSERT INTO class_students (classid, studentid) VALUES (klass, c);
+    PERFORM pg_temp.expect('c joined the class', pg_temp.sources(c, task), 1);
+
+    -- Retargeting an assignment: the direct one moves from a to c
+    UPDATE taskassignments SET studentid = c WHERE assignmentid = direct;
+    PERFORM pg_temp.expect('direct assignment moved off a', pg_temp.sources(a, task), 1);
+    PERFORM pg_temp.expect('direct assignment moved to c', pg_temp.sources(c, task), 2);
+
+    -- Removing the class assignment leaves what the group and direct ones reach
+    DELETE FROM taskassignments WHERE assignmentid = by_class;
+    PERFORM pg_temp.expect('a without the class assignment', pg_temp.sources(a, task), 0);
+    PERFORM pg_temp.expect('b through the group only', pg_temp.sources(b, task), 1);
+    PERFORM pg_temp.expect('c directly only', pg_temp.sources(c, task), 1);
+    PERFORM pg_temp.expect_resolved(task, 'after all changes');
+
+    -- Deleting the task cascades
+    DELETE FROM tasks WHERE taskid = task;
+    PERFORM pg_temp.expect('rows of a deleted task',
+                           (SELECT COUNT(*) FROM student_tasks WHERE task_id = task), 0::bigint);
+END $$;
@@ -0,0 +1,65 @@
+-- 009: student_tasks status follows projects (own, submitted-for and group
+-- projects), group membership and the task's due date
+
+CREATE FUNCTION pg_temp.status(student INT, task INT) RETURNS TEXT
+    LANGUAGE sql AS $$
+    SELECT status::text FROM student_tasks WHERE student_id = student AND task_id = task;
+$$;
+
+DO $$
+DECLARE
+    teacher INT := pg_temp.check_teacher('sts-t');
+    a INT := pg_temp.check_student('sts-a');
+    b INT := pg_temp.check_student('sts-b');
+    c INT := pg_temp.check_student('sts-c');
+    d INT := pg_temp.check_student('sts-d');
+    task INT := pg_temp.check_task(teacher, CURRENT_DATE + 1);
+    grp INT := pg_temp.check_group(teacher, 'sts');
+    own INT;
+    shared INT;
+BEGIN
+    INSERT INTO groupmembers (groupid, studentid) VALUES (grp, b), (grp, c);
+    INSERT INTO taskassignments (taskid, studentid) VALUES (task, a);
+    INSERT INTO taskassignments (taskid, groupid) VALUES (task, grp);
+    PERFORM pg_temp.expect('new assignment', pg_temp.status(a, task), 'Pending');
+    PERFORM pg_temp.expect('due date copied',
+                           (SELECT duedate FROM student_tasks WHERE student_id = b AND task_id = task),
+                           CURRENT_DATE + 1);
+
+    -- Moving the due date into the past moves every student's row
+    UPDATE tasks SET duedate = CURRENT_DATE - 1 WHERE taskid = task;
+    PERFORM pg_temp.expect('due date moved',
+                           (SELECT duedate FROM student_tasks WHERE student_id = c AND task_id = task),
+                           CURRENT_DATE - 1);
+    PERFORM pg_temp.expect('past due', pg_temp.status(a, task), 'Overdue');
+    PERFORM pg_temp.expect('past due (group)', pg_temp.status(b, task), 'Overdue');
+
+    -- An own project
+    own := pg_temp.check_project(task, a, NULL, a, FALSE);
+    PERFORM pg_temp.expect('own project', pg_temp.status(a, task), 'Submitted');
+    PERFORM pg_temp.expect('own project id',
+                           (SELECT project_id FROM student_tasks WHERE student_id = a AND task_id = task), own);
+    UPDATE projects SET is_late = TRUE WHERE projectid = own;
+    PERFORM pg_temp.expect('own project marked late', pg_temp.status(a, task), 'Late');
+
+    -- A group project answers for every member
+    shared := pg_temp.check_project(task, NULL, grp, b, TRUE);
+    PERFORM pg_temp.expect('group project (submitter)', pg_temp.status(b, task), 'Late');
+    PERFORM pg_temp.expect('group project (member)', pg_temp.status(c, task), 'Late');
+
+    -- Joining the group brings the task and the group's project; leaving drops it
+    INSERT INTO groupmembers (groupid, studentid) VALUES (grp, d);
+    PERFORM pg_temp.expect('joined a group with a project', pg_temp.status(d, task), 'Late');
+    DELETE FROM groupmembers WHERE groupid = grp AND studentid = c;
+    PERFORM pg_temp.expect('left the group', pg_temp.status(c, task), NULL::text);
+
+    -- Deleting the project reopens the task
+    DELETE FROM projects WHERE projectid = shared;
+    PERFORM pg_temp.expect('group project deleted', pg_temp.status(d, task), 'Overdue');
+    PERFORM pg_temp.expect('group project deleted (submitter)', pg_temp.status(b, task), 'Overdue');
+
+    -- Moving the due date back out clears overdue
+    UPDATE tasks SET duedate = CURRENT_DATE + 3 WHERE taskid = task;
+    PERFORM pg_temp.expect('due date moved out', pg_temp.status(b, task), 'Pending');
+    PERFORM pg_temp.expect('own project unaffected by the due date', pg_temp.status(a, task), 'Late');
+END $$;
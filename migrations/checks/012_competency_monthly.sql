@@ -0,0 +1,84 @@
+-- 012: competency_monthly follows inserts, upserts (as app.services.assessments
+-- saves them), month moves and deletes of competency_assessments
+
+-- The student's rollup matches a fresh aggregate over their assessments
+CREATE FUNCTION pg_temp.expect_rolled_up(student INT, what TEXT) RETURNS void
+    LANGUAGE plpgsql AS $$
+DECLARE
+    mismatches INT;
+BEGIN
+    WITH fresh AS (
+        SELECT student_id, competency_id, date_trunc('month', assessed_at)::date AS month,
+               ROUND(AVG(overall_score), 2) AS mean_score, MIN(overall_score) AS min_score,
+               MAX(overall_score) AS max_score, COUNT(*)::int AS assessments,
+               (ARRAY_AGG(overall_score ORDER BY assessed_at DESC, assessment_id DESC)
+                    FILTER (WHERE overall_score IS NOT NULL))[1] AS latest_score,
+               MAX(assessed_at) AS latest_at
+        FROM competency_assessments
+        WHERE student_id = student
+        GROUP BY student_id, competency_id, date_trunc('month', assessed_at)::date
+    ), rolled AS (
+        SELECT student_id, competency_id, month, mean_score, min_score, max_score,
+               assessments, latest_score, latest_at
+        FROM competency_monthly
+        WHERE student_id = student
+    )
+    SELECT COUNT(*) INTO mismatches FROM (
+        (SELECT * FROM rolled EXCEPT SELECT * FROM fresh)
+        UNION ALL
+        (SELECT * FROM fresh EXCEPT SELECT * FROM rolled)
+    ) diff;
+    PERFORM pg_temp.expect(what || ': rows differing from competency_assessments', mismatches, 0);
+END $$;
+
+DO $$
+DECLARE
+    teacher INT := pg_temp.check_teacher('cm-t');
+    a INT := pg_temp.check_student('cm-a');
+    first_task INT := pg_temp.check_task(teacher, DATE '2025-01-31');
+    second_task INT := pg_temp.check_task(teacher, DATE '2025-01-31');
+    competency INT;
+    rollup competency_monthly%ROWTYPE;
+BEGIN
+    INSERT INTO competencies (competencyname) VALUES ('Migration check') RETURNING competencyid INTO competency;
+
+    INSERT INTO competency_assessments (student_id, task_id, competency_id, overall_score, assessed_at)
+    VALUES (a, first_task, competency, 60, TIMESTAMP '2025-01-10 09:00'),
+           (a, second_task, competency, 80, TIMESTAMP '2025-01-20 09:00');
+    SELECT * INTO rollup FROM competency_monthly
+    WHERE student_id = a AND competency_id = competency AND month = DATE '2025-01-01';
+    PERFORM pg_temp.expect('January assessments', rollup.assessments, 2);
+    PERFORM pg_temp.expect('January mean', rollup.mean_score, 70.00::numeric);
+    PERFORM pg_temp.expect('January min', rollup.min_score, 60.00::numeric);
+    PERFORM pg_temp.expect('January latest', rollup.latest_score, 80.00::numeric);
+
+    -- Re-saving the second task through the upsert moves it into February
+    INSERT INTO competency_assessments (student_id, task_id, competency_id, overall_score, feedback, assessed_at)
+    VALUES (a, second_task, competency, 90, '', TIMESTAMP '2025-02-03 09:00')
+    ON CONFLICT (student_id, task_id, competency_id)
+    DO UPDATE SET overall_score = EXCLUDED.overall_score,
+                  feedback = EXCLUDED.feedback,
+                  assessed_at = EXCLUDED.assessed_at;
+    SELECT * INTO rollup FROM competency_monthly
+    WHERE student_id = a AND competency_id = competency AND month = DATE '2025-01-01';
+    PERFORM pg_temp.expect('January after the upsert', rollup.assessments, 1);
+    PERFORM pg_temp.expect('January latest after the upsert', rollup.latest_score, 60.00::numeric);
+    SELECT * INTO rollup FROM competency_monthly
+    WHERE student_id = a AND competency_id = competency AND month = DATE '2025-02-01';
+    PERFORM pg_temp.expect('February after the upsert', rollup.assessments, 1);
+    PERFORM pg_temp.expect('February latest after the upsert', rollup.latest_score, 90.00::numeric);
+
+    -- A plain score update stays in its month
+    UPDATE competency_assessments SET overall_score = 50
+    WHERE student_id = a AND task_id = first_task AND competency_id = competency;
+    PERFORM pg_temp.expect_rolled_up(a, 'after an update');
+
+    -- Deleting the month's only assessment removes its row
+    DELETE FROM competency_assessments
+    WHERE student_id = a AND task_id = first_task AND competency_id = competency;
+    PERFORM pg_temp.expect('January after the delete',
+                           (SELECT COUNT(*) FROM competency_monthly
+                            WHERE student_id = a AND competency_id = competency AND month = DATE '2025-01-01'),
+                           0::bigint);
+    PERFORM pg_temp.expect_rolled_up(a, 'after a delete');
+END $$;
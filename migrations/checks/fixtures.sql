@@ -0,0 +1,58 @@
+-- Helpers for the checks in this folder. `python -m migrations.migrate --check`
+-- runs this file and one check in the same transaction and rolls it back, so
+-- the rows made here and the pg_temp functions never outlive the check.
+
+CREATE FUNCTION pg_temp.expect(what TEXT, actual ANYELEMENT, expected ANYELEMENT) RETURNS void
+    LANGUAGE plpgsql AS $$
+BEGIN
+    IF actual IS DISTINCT FROM expected THEN
+        RAISE EXCEPTION '%: expected %, got %', what, expected, actual;
+    END IF;
+END $$;
+
+CREATE FUNCTION pg_temp.check_user(tag TEXT) RETURNS INT
+    LANGUAGE sql AS $$
+    WITH check_role AS (
+        INSERT INTO roles (rolename) VALUES ('migration check')
+        ON CONFLICT (rolename) DO UPDATE SET rolename = EXCLUDED.rolename
+        RETURNING roleid
+    )
+    INSERT INTO users (firstname, lastname, email, phone, passwordhash, roleid, is_active)
+    SELECT 'Check', tag, 'check-' || tag || '@example.invalid', 'chk-' || tag, '-', roleid, TRUE
+    FROM check_role
+    RETURNING userid;
+$$;
+
+CREATE FUNCTION pg_temp.check_teacher(tag TEXT) RETURNS INT
+    LANGUAGE sql AS $$
+    INSERT INTO teachers (userid, hiredate) VALUES (pg_temp.check_user(tag), CURRENT_DATE)
+    RETURNING teacherid;
+$$;
+
+CREATE FUNCTION pg_temp.check_student(tag TEXT) RETURNS INT
+    LANGUAGE sql AS $$
+    INSERT INTO students (userid, studentnumber, registrationdate)
+    VALUES (pg_temp.check_user(tag), 'CHK-' || tag, CURRENT_DATE)
+    RETURNING studentid;
+$$;
+
+CREATE FUNCTION pg_temp.check_task(teacher INT, due DATE) RETURNS INT
+    LANGUAGE sql AS $$
+    INSERT INTO tasks (teacherid, title, taskdescription, duedate)
+    VALUES (teacher, 'Migration check', '-', due)
+    RETURNING taskid;
+$$;
+
+CREATE FUNCTION pg_temp.check_group(teacher INT, tag TEXT) RETURNS INT
+    LANGUAGE sql AS $$
+    INSERT INTO studentgroups (groupname, teacherid) VALUES ('Migration check ' || tag, teacher)
+    RETURNING groupid;
+$$;
+
+CREATE FUNCTION pg_temp.check_project(task INT, student INT, grp INT, submitter INT, late BOOLEAN) RETURNS INT
+    LANGUAGE sql AS $$
+    INSERT INTO projects (taskid, studentid, groupid, submitter_id, file_name, projectfilepath,
+                          is_late, file_size, file_type)
+    VALUES (task, student, grp, submitter, 'check.txt', 'check.txt', late, 0, 'txt')
+    RETURNING projectid;
+$$;
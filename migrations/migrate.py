@@ -0,0 +1,139 @@
+"""Apply the numbered SQL files in this folder that the database has not seen yet.
+
+Usage (from the project root, after CREATE_TABLES_SQL.sql):
+    python -m migrations.migrate            # apply pending migrations
+    python -m migrations.migrate --list     # show applied / pending
+    python -m migrations.migrate --check    # run checks/ against the applied ones
+
+Each file runs in its own transaction and is recorded in schema_migrations.
+
+checks/NNN_*.sql exercise the triggers of migration NNN on throwaway rows
+(made with the helpers in checks/fixtures.sql) and raise on the first wrong
+result. Each check runs in a transaction that is always rolled back, so it
+can be pointed at any database the migrations were applied to.
+"""
+import argparse
+import os
+import re
+
+import psycopg2   #type:ignore
+from app.config import Config
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+CHECKS_DIR = os.path.join(MIGRATIONS_DIR, 'checks')
+MIGRATION_FILE = re.compile(r'^(\d{3})_[\w-]+\.sql$')
+
+
+def connect():
+    return psycopg2.connect(
+        host=Config.DB_HOST,
+        database=Config.DB_NAME,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        port=Config.DB_PORT
+    )
+
+
+def migration_files(directory=MIGRATIONS_DIR):
+    """[(version, filename), ...] sorted by version."""
+    files = []
+    for name in os.listdir(directory):
+        match = MIGRATION_FILE.match(name)
+        if match:
+            files.append((match.group(1), name))
+    return sorted(files)
+
+
+def read_migration(name, directory=MIGRATIONS_DIR):
+    with open(os.path.join(directory, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(10) PRIMARY KEY,
+            filename VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def migrate(conn):
+    with conn.cursor() as cursor:
+        done = applied_versions(cursor)
+    conn.commit()
+
+    applied = []
+    for version, name in migration_files():
+        if version in done:
+            continue
+        with conn.cursor() as cursor:
+            try:
+                cursor.execute(read_migration(name))
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, filename) VALUES (%s, %s)",
+                    (version, name)
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        print(f"applied {name}")
+        applied.append(name)
+    return applied
+
+
+def check(conn):
+    """Run the checks of the applied migrations; returns the failed ones."""
+    with conn.cursor() as cursor:
+        done = applied_versions(cursor)
+    conn.commit()
+
+    fixtures = read_migration('fixtures.sql', CHECKS_DIR)
+    failed = []
+    for version, name in migration_files(CHECKS_DIR):
+        if version not in done:
+            print(f"skipped {name} (migration not applied)")
+            continue
+        with conn.cursor() as cursor:
+            try:
+                cursor.execute(fixtures)
+                cursor.execute(read_migration(name, CHECKS_DIR))
+                print(f"ok      {name}")
+            except psycopg2.Error as e:
+                print(f"FAILED  {name}: {(e.pgerror or str(e)).strip()}")
+                failed.append(name)
+            finally:
+                conn.rollback()
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--list', action='store_true', help='show applied and pending migrations')
+    parser.add_argument('--check', action='store_true',
+                        help='run the trigger checks of the applied migrations (rolled back)')
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        if args.check:
+            if check(conn):
+                parser.exit(1)
+        elif args.list:
+            with conn.cursor() as cursor:
+                done = applied_versions(cursor)
+            conn.commit()
+            for version, name in migration_files():
+                print(f"{'applied' if version in done else 'pending'}  {name}")
+        elif not migrate(conn):
+            print("database is up to date")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()